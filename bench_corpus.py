@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Chunk texts from the bundled JSONL corpus (data/chunks/*.jsonl) for the
+bench_*.py scripts. Plain file reading only: no Neo4j or model imports.
+"""
+
+import json
+from pathlib import Path
+
+
+def load_chunk_texts(chunks_dir: Path, pattern: str, max_chunks: int):
+    texts = []
+    for path in sorted(chunks_dir.glob(pattern)):
+        with path.open("r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    texts.append(json.loads(line).get("text") or "")
+    return texts[:max_chunks] if max_chunks else texts
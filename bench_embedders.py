@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark the ingest embedders on CPU:
+
+- torch:     SentenceTransformer fp32 (what ingest used so far)
+- onnx-int8: dynamically quantized ONNX export (onnx_embedder.py)
+
+Chunk texts come from the bundled JSONL corpus (data/chunks/*.jsonl).
+Reports chunks/sec per backend and the cosine agreement between them
+(min / mean over all chunks, against AGREEMENT_THRESHOLD).
+Imports ingest_articles, so it needs the same .env (NEO4J_PASSWORD).
+
+Usage:
+  python bench_embedders.py --chunks-dir data/chunks --threads 4
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from bench_corpus import load_chunk_texts
+from ingest_articles import DEFAULT_EMBED_MODEL, load_embedder
+from onnx_embedder import AGREEMENT_THRESHOLD, cosine_rows
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark fp32 torch vs int8 ONNX embeddings.")
+    ap.add_argument("--chunks-dir", default="data/chunks")
+    ap.add_argument("--pattern", default="*.jsonl")
+    ap.add_argument("--max-chunks", type=int, default=0, help="Chunks to encode (0 = all).")
+    ap.add_argument("--embed-model", default=DEFAULT_EMBED_MODEL)
+    ap.add_argument("--batch-size", type=int, default=32)
+    ap.add_argument("--threads", type=int, default=None, help="Intra-op threads for both backends.")
+    args = ap.parse_args()
+
+    texts = load_chunk_texts(Path(args.chunks_dir), args.pattern, args.max_chunks)
+    print(f"Chunks: {len(texts)}")
+
+    results = {}
+    for backend in ("torch", "onnx-int8"):
+        embedder = load_embedder(args.embed_model, backend, args.threads)
+        embedder.encode(texts[:args.batch_size], normalize_embeddings=True)  # warm-up
+        t0 = time.perf_counter()
+        emb = embedder.encode(texts, batch_size=args.batch_size, normalize_embeddings=True)
+        results[backend] = (emb, time.perf_counter() - t0)
+
+    print(f"\n{'':10} {'seconds':>10} {'chunks/s':>12}")
+    for backend, (_, secs) in results.items():
+        rate = len(texts) / secs if secs else float("inf")
+        print(f"{backend:10} {secs:10.2f} {rate:12.1f}")
+    torch_s, onnx_s = results["torch"][1], results["onnx-int8"][1]
+    if onnx_s:
+        print(f"Speedup: {torch_s / onnx_s:.1f}x")
+
+    cos = cosine_rows(results["onnx-int8"][0], results["torch"][0])
+    status = "OK" if cos.min() >= AGREEMENT_THRESHOLD else "BELOW THRESHOLD"
+    print(f"Cosine agreement: min={cos.min():.4f} mean={cos.mean():.4f} "
+          f"(threshold {AGREEMENT_THRESHOLD}) {status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark mention extraction as done by ingest_articles.py.
+
+- before: full en_core_web_sm pipeline, one nlp(text) call per chunk
+- after:  NER-only pipeline (ingest_articles.NER_EXCLUDE: tok2vec, tagger,
+          parser, attribute_ruler and lemmatizer excluded)
+          through nlp.pipe(batch_size, n_process)
+
+Chunk texts come from the bundled JSONL corpus (data/chunks/*.jsonl).
+Both runs must produce the same persons/concepts; differences are reported.
+Imports ingest_articles, so it needs the same .env (NEO4J_PASSWORD).
+
+Usage:
+  python bench_ner.py --chunks-dir data/chunks --batch-size 64 --processes 2
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from bench_corpus import load_chunk_texts
+from ingest_articles import DEFAULT_NER_BATCH_SIZE, extract_mentions, extract_mentions_batch, load_nlp
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark per-chunk NER vs batched nlp.pipe.")
+    ap.add_argument("--chunks-dir", default="data/chunks")
+    ap.add_argument("--pattern", default="*.jsonl")
+    ap.add_argument("--max-chunks", type=int, default=0, help="Chunks to process (0 = all).")
+    ap.add_argument("--batch-size", type=int, default=DEFAULT_NER_BATCH_SIZE)
+    ap.add_argument("--processes", type=int, default=1)
+    args = ap.parse_args()
+
+    texts = load_chunk_texts(Path(args.chunks_dir), args.pattern, args.max_chunks)
+    print(f"Chunks: {len(texts)}")
+
+    full = load_nlp(ner_only=False)
+    t0 = time.perf_counter()
+    before = [extract_mentions(full, t) for t in texts]
+    before_s = time.perf_counter() - t0
+
+    ner = load_nlp(ner_only=True)
+    t0 = time.perf_counter()
+    after = extract_mentions_batch(ner, texts, batch_size=args.batch_size, n_process=args.processes)
+    after_s = time.perf_counter() - t0
+
+    mismatches = sum(1 for a, b in zip(before, after) if a != b)
+    n_persons = sum(len(m["persons"]) for m in after)
+
+    print(f"\nPipeline (before): {full.pipe_names}")
+    print(f"Pipeline (after):  {ner.pipe_names}  batch_size={args.batch_size} processes={args.processes}")
+    print(f"{'':8} {'seconds':>10} {'chunks/s':>12}")
+    for label, secs in (("before", before_s), ("after", after_s)):
+        rate = len(texts) / secs if secs else float("inf")
+        print(f"{label:8} {secs:10.2f} {rate:12.1f}")
+    if after_s:
+        print(f"Speedup: {before_s / after_s:.1f}x")
+    print(f"Person mentions: {n_persons}   chunks with differing mentions: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark the Aho-Corasick place matcher against the per-name regex loop
+used by link_chunks_to_places.py (--matcher regex).
+
+- Place names come from Neo4j, exactly as the linker loads them.
+- Chunk texts come from the bundled JSONL corpus (data/chunks/*.jsonl).
+- Both matchers run over the same chunks; any difference in hits is reported.
+
+Usage:
+  python bench_place_matcher.py --chunks-dir data/chunks --max-chunks 200
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from neo4j import GraphDatabase
+
+from bench_corpus import load_chunk_texts
+from link_chunks_to_places import (
+    NEO4J_URI, NEO4J_USER, NEO4J_PASS, NEO4J_DB,
+    compile_pattern, fetch_place_names, find_hits_regex,
+)
+from name_matcher import NameMatcher
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark Aho-Corasick vs regex place matching.")
+    ap.add_argument("--chunks-dir", default="data/chunks")
+    ap.add_argument("--pattern", default="*.jsonl")
+    ap.add_argument("--max-chunks", type=int, default=200,
+                    help="Chunks to scan (the regex loop is slow; 0 = all).")
+    ap.add_argument("--max-names", type=int, default=0,
+                    help="Only use the first N place names (0 = all).")
+    args = ap.parse_args()
+
+    if not NEO4J_PASS:
+        raise SystemExit("Set NEO4J_PASSWORD (or .env).")
+
+    texts = load_chunk_texts(Path(args.chunks_dir), args.pattern, args.max_chunks)
+    print(f"Chunks: {len(texts)}")
+
+    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS))
+    try:
+        with driver.session(database=NEO4J_DB) as sess:
+            t0 = time.perf_counter()
+            names = fetch_place_names(sess)
+            print(f"Fetched {len(names)} place names in {time.perf_counter() - t0:.2f}s")
+    finally:
+        driver.close()
+    if args.max_names:
+        names = names[:args.max_names]
+
+    t0 = time.perf_counter()
+    place_entries = [(pid, name, compile_pattern(name)) for pid, name in names]
+    regex_build = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    matcher = NameMatcher(names)
+    aho_build = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    regex_hits = [find_hits_regex(place_entries, t) for t in texts]
+    regex_scan = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    aho_hits = [matcher.find(t) for t in texts]
+    aho_scan = time.perf_counter() - t0
+
+    mismatches = sum(1 for a, b in zip(regex_hits, aho_hits) if a != b)
+    n_hits = sum(len(h) for h in aho_hits)
+
+    print(f"\nNames: {len(names)}   chunks: {len(texts)}   hits: {n_hits}")
+    print(f"{'':8} {'build s':>10} {'scan s':>10} {'chunks/s':>12}")
+    for label, build, scan in (("regex", regex_build, regex_scan),
+                               ("aho", aho_build, aho_scan)):
+        rate = len(texts) / scan if scan else float("inf")
+        print(f"{label:8} {build:10.2f} {scan:10.3f} {rate:12.1f}")
+    if aho_scan:
+        print(f"Scan speedup: {regex_scan / aho_scan:.1f}x  (aho backend: {matcher.backend})")
+    print(f"Chunks with differing hits: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Persistent token -> chunkId inverted index for incremental place linking.
+
+Tokens follow the linker's matching rules (see name_matcher.py):
+  - maximal runs of [A-Za-z0-9_] chars (after case folding), and
+  - every other letter/digit as a single-character token (Greek, Hebrew, ...),
+    because the regex boundaries are ASCII-only and a non-Latin name can
+    match in the middle of a longer non-Latin word.
+
+name_key(name) picks a token that is guaranteed to be present in every
+chunk where the name matches, so index.candidates(name) is a superset of
+the chunks the full scan would link, usually a very small one.
+
+The index also keeps a snapshot of the place names used for the last
+link run, so the next run can tell which places were added or changed.
+"""
+
+import hashlib
+import os
+import pickle
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from name_matcher import WORD_CHARS, fold
+
+# Bump when tokenization or the pickled layout changes.
+INDEX_VERSION = 1
+
+
+def iter_tokens(folded: str) -> Iterable[str]:
+    run_start = None
+    for i, ch in enumerate(folded):
+        if ch in WORD_CHARS:
+            if run_start is None:
+                run_start = i
+            continue
+        if run_start is not None:
+            yield folded[run_start:i]
+            run_start = None
+        if ch.isalnum():
+            yield ch
+    if run_start is not None:
+        yield folded[run_start:]
+
+
+def chunk_tokens(text: str) -> Set[str]:
+    return set(iter_tokens(fold(text or "")))
+
+
+def name_key(name: str) -> Optional[str]:
+    """
+    First ASCII-word token of the name, else its first other letter/digit.
+    None if the name has neither (such names need a full scan).
+    """
+    folded = fold(name)
+    first_char = None
+    for tok in iter_tokens(folded):
+        if tok[0] in WORD_CHARS:
+            return tok
+        if first_char is None:
+            first_char = tok
+    return first_char
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1((text or "").encode("utf-8")).hexdigest()
+
+
+class ChunkTokenIndex:
+    def __init__(self):
+        self.chunk_hash: Dict[str, str] = {}
+        self.chunk_tokens: Dict[str, frozenset] = {}
+        self.postings: Dict[str, Set[str]] = {}
+        # pid -> names (in linker order) as of the last link run
+        self.places: Dict[str, List[str]] = {}
+
+    def _remove_chunk(self, cid: str) -> None:
+        for tok in self.chunk_tokens.pop(cid, ()):
+            cids = self.postings.get(tok)
+            if cids is not None:
+                cids.discard(cid)
+                if not cids:
+                    del self.postings[tok]
+        self.chunk_hash.pop(cid, None)
+
+    def _add_chunk(self, cid: str, text: str) -> None:
+        toks = frozenset(chunk_tokens(text))
+        self.chunk_tokens[cid] = toks
+        self.chunk_hash[cid] = text_hash(text)
+        for tok in toks:
+            self.postings.setdefault(tok, set()).add(cid)
+
+    def update_chunks(self, records: Iterable[Tuple[str, str]]) -> Tuple[List[str], List[str]]:
+        """
+        Sync the index with the current (cid, text) set.
+        Returns (new_or_changed_cids, removed_cids).
+        """
+        seen = set()
+        changed = []
+        for cid, text in records:
+            seen.add(cid)
+            if self.chunk_hash.get(cid) == text_hash(text):
+                continue
+            self._remove_chunk(cid)
+            self._add_chunk(cid, text)
+            changed.append(cid)
+        removed = [cid for cid in self.chunk_hash if cid not in seen]
+        for cid in removed:
+            self._remove_chunk(cid)
+        return changed, removed
+
+    def candidates(self, name: str) -> Set[str]:
+        key = name_key(name)
+        if key is None:
+            return set(self.chunk_hash)
+        return set(self.postings.get(key, ()))
+
+    def set_places(self, pairs: Iterable[Tuple[str, str]]) -> None:
+        places: Dict[str, List[str]] = {}
+        for pid, name in pairs:
+            places.setdefault(pid, []).append(name)
+        self.places = places
+
+    def diff_places(self, pairs: Iterable[Tuple[str, str]]):
+        """
+        Compare current (pid, name) pairs with the snapshot.
+        Returns (added_pids, changed_pids, removed_pids).
+        """
+        current: Dict[str, List[str]] = {}
+        for pid, name in pairs:
+            current.setdefault(pid, []).append(name)
+        added = [pid for pid in current if pid not in self.places]
+        changed = [pid for pid, names in current.items()
+                   if pid in self.places and self.places[pid] != names]
+        removed = [pid for pid in self.places if pid not in current]
+        return added, changed, removed
+
+    # ---------- persistence ----------
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with tmp.open("wb") as f:
+            pickle.dump({"version": INDEX_VERSION}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["ChunkTokenIndex"]:
+        if not path.exists():
+            return None
+        try:
+            with path.open("rb") as f:
+                header = pickle.load(f)
+                if not isinstance(header, dict) or header.get("version") != INDEX_VERSION:
+                    return None
+                index = pickle.load(f)
+        except Exception as e:
+            print(f"[WARN] Ignoring unreadable chunk index {path}: {e}")
+            return None
+        return index if isinstance(index, cls) else None
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Dictionary-based mention extraction for ingest (--mentions dictionary).
+
+Instead of running the statistical NER and later deleting every Person that
+is not an author (clean_persons_keep_authors.py), match only names we already
+know:
+
+- Persons: author names and aliases from the meta files and from the graph
+  (Person nodes with an :AUTHORED edge). Aliases map back to the canonical name.
+- Concepts: the ingest CONCEPT_ALLOWLIST.
+
+Matching uses spaCy PhraseMatchers (a token trie) on a blank English
+tokenizer, so no model is loaded. Persons match on exact token text,
+concepts case-insensitively on whole tokens (the NER mode's concept check
+is a plain substring test).
+
+extract(text) returns the same {"persons": [...], "concepts": [...]} dicts
+as ingest_articles.extract_mentions().
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+
+import spacy
+from spacy.matcher import PhraseMatcher
+
+CYPHER_AUTHOR_PERSONS = """
+MATCH (p:Person)-[:AUTHORED]->(:Article)
+RETURN DISTINCT p.name AS name, p.aliases AS aliases,
+       p.orcid AS orcid, p.wikidataId AS wikidataId,
+       p.birth AS birth, p.death AS death
+"""
+
+
+def fetch_author_persons(session) -> List[Dict[str, Any]]:
+    """Person rows (name, aliases, ...) for every author already in the graph."""
+    return [dict(r) for r in session.run(CYPHER_AUTHOR_PERSONS) if r["name"]]
+
+
+class DictionaryMentionMatcher:
+    def __init__(self, persons: Iterable[Dict[str, Any]], concepts: Iterable[str]):
+        self.nlp = spacy.blank("en")
+        self.person_matcher = PhraseMatcher(self.nlp.vocab, attr="ORTH")
+        self.concept_matcher = PhraseMatcher(self.nlp.vocab, attr="LOWER")
+
+        # canonical name -> full Person row; the first row seen for a name wins
+        self.persons: Dict[str, Dict[str, Any]] = {}
+        for p in persons:
+            name = (p.get("name") or "").strip()
+            if len(name) < 2 or name in self.persons:
+                continue
+            self.persons[name] = p
+            surface = {name} | {(a or "").strip() for a in (p.get("aliases") or [])}
+            surface = sorted(s for s in surface if len(s) >= 2)
+            self.person_matcher.add(name, list(self.nlp.tokenizer.pipe(surface)))
+
+        self.concepts = sorted(set(concepts))
+        for c in self.concepts:
+            self.concept_matcher.add(c, [self.nlp.make_doc(c)])
+
+    def __repr__(self) -> str:
+        return f"DictionaryMentionMatcher(persons={len(self.persons)}, concepts={len(self.concepts)})"
+
+    def _mentions(self, doc) -> Dict[str, List[str]]:
+        strings = self.nlp.vocab.strings
+        persons = {strings[match_id] for match_id, _, _ in self.person_matcher(doc)}
+        concepts = {strings[match_id] for match_id, _, _ in self.concept_matcher(doc)}
+        return {"persons": sorted(persons), "concepts": sorted(concepts)}
+
+    def extract(self, text: str) -> Dict[str, List[str]]:
+        return self._mentions(self.nlp.make_doc(text))
+
+    def extract_batch(self, texts: List[str], batch_size: int = 256) -> List[Dict[str, List[str]]]:
+        return [self._mentions(doc) for doc in self.nlp.tokenizer.pipe(texts, batch_size=batch_size)]
+
+    def person_row(self, name: str) -> Optional[Dict[str, Any]]:
+        """Known Person row for a canonical name, so mention MERGEs keep aliases/orcid."""
+        return self.persons.get(name)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Persistent chunk-embedding store for ingest.
+
+Vectors are keyed by (model key, hash of the normalized text), where
+normalization is Unicode NFC plus whitespace collapsing. Re-ingesting an
+unchanged corpus (e.g. after a schema or metadata change) then only reads
+float32 blobs from disk; the model runs only for new or edited chunks.
+
+Storage is one SQLite file (WAL) under the cache directory, which several
+ingest processes can share safely.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_EMBED_CACHE_DIR = Path(".cache") / "embeddings"
+
+
+def text_key(text: str) -> str:
+    norm = " ".join(unicodedata.normalize("NFC", text or "").split())
+    return hashlib.sha256(norm.encode("utf-8")).hexdigest()
+
+
+def format_report(model_key: str, hits: int, misses: int) -> str:
+    """Hit/miss summary line; also used for totals summed over worker processes."""
+    total = hits + misses
+    ratio = hits / total if total else 0.0
+    return f"[embed-cache] {model_key}: hits={hits} misses={misses} hit_ratio={ratio:.1%}"
+
+
+class EmbeddingCache:
+    def __init__(self, cache_dir=DEFAULT_EMBED_CACHE_DIR, model_key: str = ""):
+        self.dir = Path(cache_dir)
+        self.model_key = model_key
+        self.hits = 0
+        self.misses = 0
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.dir / "embeddings.sqlite"),
+                                     check_same_thread=False, timeout=60)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                vec BLOB NOT NULL,
+                PRIMARY KEY (model, hash)
+            ) WITHOUT ROWID
+        """)
+        self._conn.commit()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for key in keys:
+                row = self._conn.execute(
+                    "SELECT dim, vec FROM embeddings WHERE model = ? AND hash = ?",
+                    (self.model_key, key),
+                ).fetchone()
+                if row is not None:
+                    found[key] = np.frombuffer(row[1], dtype=np.float32, count=row[0])
+        return found
+
+    def put_many(self, items: Iterable[Tuple[str, np.ndarray]]) -> None:
+        rows = []
+        for key, vec in items:
+            vec = np.asarray(vec, dtype=np.float32).ravel()
+            rows.append((self.model_key, key, int(vec.shape[0]), vec.tobytes()))
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, hash, dim, vec) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def encode(self, embedder, texts: Sequence[str], **encode_kwargs) -> np.ndarray:
+        """
+        embedder.encode(texts, **encode_kwargs) with cached rows filled in from disk;
+        only the (deduplicated) misses are sent to the model.
+        """
+        keys = [text_key(t) for t in texts]
+        found = self.get_many(set(keys))
+        todo: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in todo:
+                todo[key] = text
+        n_hits = sum(1 for k in keys if k in found)
+        self.hits += n_hits
+        self.misses += len(keys) - n_hits
+
+        if todo:
+            vecs = embedder.encode(list(todo.values()), **encode_kwargs)
+            fresh = {k: np.asarray(v, dtype=np.float32) for k, v in zip(todo, vecs)}
+            self.put_many(fresh.items())
+            found.update(fresh)
+
+        rows: List[np.ndarray] = [found[k] for k in keys]
+        return np.vstack(rows) if rows else np.zeros((0, 0), dtype=np.float32)
+
+    def report(self) -> str:
+        return format_report(self.model_key, self.hits, self.misses)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Idempotent schema bootstrap for the GraphRAG database.
+
+ensure_schema(driver, database) creates whatever is missing of:
+
+- uniqueness constraints: Article.articleId, Chunk.chunkId, Place.pleiadesId,
+  WikidataEntity.qid (the ones listed in the README), plus Person.name and
+  Concept.name, which concurrent ingest workers MERGE on
+- a range index on Article.title
+- text indexes for substring lookups: Article.title, Place.title
+- the 'chunkText' full-text index on Chunk.text
+
+then waits for the indexes it created to come online and logs what it
+created. A constraint blocked by duplicate values is reported and left out.
+ensure_indexes() does the same for an explicit list (e.g. the vector index of
+the read-only eval retriever).
+All statements use IF NOT EXISTS, so calling it at every script start is cheap.
+
+Usage:
+  python graph_schema.py
+"""
+
+import os
+from typing import List, Tuple
+
+from dotenv import load_dotenv
+from neo4j import GraphDatabase
+from neo4j.exceptions import Neo4jError
+
+load_dotenv()
+
+NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
+NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
+NEO4J_PASS = os.getenv("NEO4J_PASSWORD") or os.getenv("NEO4J_PASS")
+NEO4J_DB = os.getenv("NEO4J_DATABASE", "graphrag")
+
+INDEX_WAIT_SECONDS = int(os.getenv("NEO4J_INDEX_WAIT", "300"))
+
+# (name, statement); names match the README so existing databases are recognised
+CONSTRAINTS: List[Tuple[str, str]] = [
+    ("article_id", "CREATE CONSTRAINT article_id IF NOT EXISTS "
+                   "FOR (a:Article) REQUIRE a.articleId IS UNIQUE"),
+    ("chunk_id", "CREATE CONSTRAINT chunk_id IF NOT EXISTS "
+                 "FOR (c:Chunk) REQUIRE c.chunkId IS UNIQUE"),
+    ("place_pid", "CREATE CONSTRAINT place_pid IF NOT EXISTS "
+                  "FOR (p:Place) REQUIRE p.pleiadesId IS UNIQUE"),
+    ("wd_qid", "CREATE CONSTRAINT wd_qid IF NOT EXISTS "
+               "FOR (w:WikidataEntity) REQUIRE w.qid IS UNIQUE"),
+    ("person_name_unique", "CREATE CONSTRAINT person_name_unique IF NOT EXISTS "
+                           "FOR (p:Person) REQUIRE p.name IS UNIQUE"),
+    ("concept_name_unique", "CREATE CONSTRAINT concept_name_unique IF NOT EXISTS "
+                            "FOR (k:Concept) REQUIRE k.name IS UNIQUE"),
+]
+
+# (label, property) keys that must be unique before several processes MERGE
+# on them, or two of them can create the same node
+# (ingest_all_from_meta.py --jobs refuses to start when one is missing)
+PARALLEL_INGEST_KEYS = (("Person", "name"), ("Concept", "name"))
+UNIQUE_CONSTRAINT_TYPES = {"UNIQUENESS", "NODE_PROPERTY_UNIQUENESS", "NODE_KEY"}
+
+INDEXES: List[Tuple[str, str]] = [
+    ("article_title", "CREATE INDEX article_title IF NOT EXISTS FOR (a:Article) ON (a.title)"),
+    ("article_title_text", "CREATE TEXT INDEX article_title_text IF NOT EXISTS "
+                           "FOR (a:Article) ON (a.title)"),
+    ("place_title_text", "CREATE TEXT INDEX place_title_text IF NOT EXISTS "
+                         "FOR (p:Place) ON (p.title)"),
+    ("chunkText", "CREATE FULLTEXT INDEX chunkText IF NOT EXISTS "
+                  "FOR (c:Chunk) ON EACH [c.text]"),
+]
+
+
+def _names(session, show: str) -> set:
+    return {r["name"] for r in session.run(f"{show} YIELD name")}
+
+
+def ensure_indexes(driver, database: str, statements: List[Tuple[str, str]],
+                   wait_seconds: int = INDEX_WAIT_SECONDS) -> List[str]:
+    """
+    Run the (name, statement) pairs whose name doesn't exist yet, wait for the
+    indexes just created (and only those) to be ONLINE, and return their names.
+    A statement that fails (e.g. duplicate values block a constraint) is
+    reported and skipped; whatever already exists is left as it is.
+    """
+    created = []
+    with driver.session(database=database) as session:
+        before = _names(session, "SHOW CONSTRAINTS") | _names(session, "SHOW INDEXES")
+        for name, stmt in statements:
+            if name in before:
+                continue
+            try:
+                session.run(stmt).consume()
+            except Neo4jError as e:
+                print(f"[schema] could not create {name}: {e.message}")
+                continue
+            created.append(name)
+        indexes = _names(session, "SHOW INDEXES")
+        after = _names(session, "SHOW CONSTRAINTS") | indexes
+        # an equivalent index under another name makes IF NOT EXISTS a no-op
+        created = [n for n in created if n in after]
+        for name in created:
+            if name in indexes:  # constraints are backed by an index of the same name
+                session.run("CALL db.awaitIndex($name, $timeout)",
+                            name=name, timeout=wait_seconds).consume()
+    if created:
+        print(f"[schema] created: {', '.join(created)}")
+    return created
+
+
+def ensure_schema(driver, database: str = NEO4J_DB, wait_seconds: int = INDEX_WAIT_SECONDS,
+                  extra: List[Tuple[str, str]] = ()) -> List[str]:
+    """
+    Create missing constraints/indexes (plus any `extra` (name, statement) pairs),
+    wait for new indexes to be ONLINE, and return the names that were created.
+    The job itself still runs when a statement fails.
+    """
+    created = ensure_indexes(driver, database, CONSTRAINTS + INDEXES + list(extra), wait_seconds)
+    if not created:
+        print("[schema] all constraints and indexes present")
+    return created
+
+
+def missing_unique_keys(driver, database: str, keys) -> List[Tuple[str, str]]:
+    """The (label, property) pairs from `keys` not covered by a uniqueness/node-key constraint."""
+    with driver.session(database=database) as session:
+        covered = {
+            (r["labelsOrTypes"][0], r["properties"][0])
+            for r in session.run("SHOW CONSTRAINTS YIELD type, labelsOrTypes, properties")
+            if r["type"] in UNIQUE_CONSTRAINT_TYPES
+            and len(r["labelsOrTypes"] or []) == 1 and len(r["properties"] or []) == 1
+        }
+    return [k for k in keys if tuple(k) not in covered]
+
+
+def main():
+    if not NEO4J_PASS:
+        raise SystemExit("Set NEO4J_PASSWORD (or NEO4J_PASS) before running.")
+    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS))
+    try:
+        ensure_schema(driver, NEO4J_DB)
+    finally:
+        driver.close()
+
+
+if __name__ == "__main__":
+    main()
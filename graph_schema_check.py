@@ -1,7 +1,10 @@
 import os
+import sys
 from dotenv import load_dotenv
 from langchain_community.graphs import Neo4jGraph
 
+from schema_snapshot import load_schema_snapshot
+
 # Load .env
 load_dotenv()
 
@@ -16,10 +19,13 @@ kg = Neo4jGraph(
     url=NEO4J_URI,
     username=NEO4J_USERNAME,
     password=NEO4J_PASSWORD,
-    database=NEO4J_DATABASE
+    database=NEO4J_DATABASE,
+    refresh_schema=False,
 )
 
-# Print schema
-kg.refresh_schema()
+# Print schema (cached snapshot unless the graph changed; --refresh forces introspection)
+snapshot = load_schema_snapshot(kg, refresh="--refresh" in sys.argv[1:])
 print("=== GRAPH SCHEMA ===")
 print(kg.schema)
+print("\n=== COMPACT SCHEMA (Cypher prompt) ===")
+print(snapshot["compact"])
@@ -5,16 +5,23 @@ import json
 import re
 import csv
 import shutil
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, as_completed
 from dotenv import load_dotenv
 from openai import OpenAI
 
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_core.documents import Document
+from langchain_openai import ChatOpenAI
 
-from langchain_community.vectorstores import Chroma
 from langchain_community.graphs import Neo4jGraph
 from langchain_core.prompts import PromptTemplate
 
+from http_utils import TokenBucket
+from question_linker import PathStats, QuestionLinker
+from schema_snapshot import load_schema_snapshot
+from llm_cache import DEFAULT_LLM_CACHE_MODE, LLM_CACHE_MODES, CachedChatModel, LLMCache
+
 # ============================================================
 # ENV + GLOBAL CONFIG
 # ============================================================
@@ -22,12 +29,21 @@ from langchain_core.prompts import PromptTemplate
 load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# Point at any chat-completions compatible server (e.g. a local fake for testing)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+# Requests per minute shared by all OpenAI calls (Cypher generation, answer, grading),
+# and how many of them may go out back to back after an idle spell (1 = evenly spaced)
+OPENAI_RPM = float(os.getenv("OPENAI_RPM", "60"))
+OPENAI_BURST = float(os.getenv("OPENAI_BURST", "1"))
 
 # Neo4j config
 NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
 NEO4J_USERNAME = os.getenv("NEO4J_USERNAME") or os.getenv("NEO4J_USER", "neo4j")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD") or os.getenv("NEO4J_PASS")
 NEO4J_DATABASE = os.getenv("NEO4J_DATABASE", "graphrag")
+# Queries per second shared by all Neo4j reads (graph context, entity templates,
+# vector search); 0 = unlimited, concurrency is then bounded by --concurrency only
+NEO4J_QPS = float(os.getenv("NEO4J_QPS", "0"))
 
 # Paths
 CHUNKS_PATH = "chunks_isaw_papers_all.txt"
@@ -35,6 +51,16 @@ QA_PATH = "ground_truth.txt"  # must contain a JSON list of {instruction, output
 
 PERSIST_DIR = "./docs/chroma_hybrid"
 
+# Vector side of the hybrid retrieval:
+#   neo4j  -> vector index on Chunk.textEmbedding, question embedded locally (MiniLM)
+#   chroma -> OpenAI embeddings + Chroma store at PERSIST_DIR
+VECTOR_RETRIEVER = os.getenv("VECTOR_RETRIEVER", "neo4j").lower()
+
+# Graph and vector context are fetched in parallel; each has its own deadline (seconds).
+# A branch that misses it contributes no context, the other one is still used.
+GRAPH_CONTEXT_TIMEOUT = float(os.getenv("GRAPH_CONTEXT_TIMEOUT", "60"))
+VECTOR_CONTEXT_TIMEOUT = float(os.getenv("VECTOR_CONTEXT_TIMEOUT", "20"))
+
 # Progress + outputs
 RESULTS_JSON = "hybrid_results_ground_truth.json"
 RESULTS_CSV = "hybrid_results_ground_truth.csv"
@@ -43,8 +69,59 @@ RESULTS_CSV = "hybrid_results_ground_truth.csv"
 BATCH_SIZE = 206   # set to 10 / 50 / whatever
 
 
+# Per-thread BranchClock of the retrieval branch (graph / vector) running on it, if any
+_branch = threading.local()
+
+
+class BranchClock:
+    """Work time of one retrieval branch; time spent blocked in a rate limiter is not counted."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.start = time.monotonic()
+        self.waited = 0.0
+        self.blocked_since = None
+        self.abandoned = False
+
+    def worked(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            blocked = now - self.blocked_since if self.blocked_since is not None else 0.0
+            return now - self.start - self.waited - blocked
+
+    def block(self) -> None:
+        with self._lock:
+            self.blocked_since = time.monotonic()
+
+    def unblock(self) -> None:
+        with self._lock:
+            self.waited += time.monotonic() - self.blocked_since
+            self.blocked_since = None
+
+
+class ClockedLimiter:
+    """TokenBucket whose waits are booked on the calling retrieval branch's clock."""
+
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+
+    def acquire(self) -> None:
+        clock = getattr(_branch, "clock", None)
+        if clock is None:
+            self.bucket.acquire()
+            return
+        if clock.abandoned:
+            # the caller already gave up on this branch: don't spend a token or a paid call
+            raise TimeoutError("retrieval branch abandoned after its timeout")
+        clock.block()
+        try:
+            self.bucket.acquire()
+        finally:
+            clock.unblock()
+
+
 # ============================================================
-# LOAD CHUNKS AND BUILD / LOAD VECTORSTORE (Chroma)
+# VECTOR RETRIEVER (Neo4j vector index, or Chroma built / loaded once)
 # ============================================================
 
 def extract_quoted_title(question: str) -> str | None:
@@ -67,50 +144,68 @@ def extract_source(chunk: str) -> str:
     return "Unknown"
 
 
-# Embeddings
-embedding = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
+def build_vector_context(api_key: str, limiter=None):
+    """question -> vector context string, for the VECTOR_RETRIEVER backend."""
+    if VECTOR_RETRIEVER == "neo4j":
+        from neo4j import GraphDatabase
+        from neo4j_vector_retriever import Neo4jVectorRetriever
 
-# Either load existing Chroma or build it once
-if os.path.exists(PERSIST_DIR):
-    print(f"Using existing Chroma index at {PERSIST_DIR}")
-    vectordb = Chroma(
-        embedding_function=embedding,
-        persist_directory=PERSIST_DIR,
-    )
-else:
-    print(f"Building new Chroma index at {PERSIST_DIR}")
-    documents = []
-    with open(CHUNKS_PATH, "r", encoding="utf-8") as f:
-        content = f.read()
-        chunks = json.loads(content)
-        for chunk in chunks:
-            source = extract_source(chunk)
-            documents.append(Document(page_content=chunk, metadata={"source": source}))
-
-    os.makedirs(os.path.dirname(PERSIST_DIR), exist_ok=True)
-    vectordb = Chroma.from_documents(
-        documents=documents,
-        embedding=embedding,
-        persist_directory=PERSIST_DIR,
-    )
+        print("Using Neo4j vector index chunk_embedding for vector retrieval")
+        vector_driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USERNAME, NEO4J_PASSWORD))
+        neo4j_retriever = Neo4jVectorRetriever(vector_driver, NEO4J_DATABASE, k=8, limiter=limiter)
+        return neo4j_retriever.get_context
 
-retriever = vectordb.as_retriever(search_kwargs={"k": 8})
+    if VECTOR_RETRIEVER != "chroma":
+        raise ValueError(f"VECTOR_RETRIEVER must be 'neo4j' or 'chroma', got {VECTOR_RETRIEVER!r}")
 
+    from langchain_openai import OpenAIEmbeddings
+    from langchain_core.documents import Document
+    from langchain_community.vectorstores import Chroma
 
-# ============================================================
-# GRAPH SETUP (Neo4j + Cypher generator)
-# ============================================================
+    # Embeddings
+    embedding = OpenAIEmbeddings(openai_api_key=api_key)
+
+    # Either load existing Chroma or build it once
+    if os.path.exists(PERSIST_DIR):
+        print(f"Using existing Chroma index at {PERSIST_DIR}")
+        vectordb = Chroma(
+            embedding_function=embedding,
+            persist_directory=PERSIST_DIR,
+        )
+    else:
+        print(f"Building new Chroma index at {PERSIST_DIR}")
+        documents = []
+        with open(CHUNKS_PATH, "r", encoding="utf-8") as f:
+            content = f.read()
+            chunks = json.loads(content)
+            for chunk in chunks:
+                source = extract_source(chunk)
+                documents.append(Document(page_content=chunk, metadata={"source": source}))
+
+        os.makedirs(os.path.dirname(PERSIST_DIR), exist_ok=True)
+        vectordb = Chroma.from_documents(
+            documents=documents,
+            embedding=embedding,
+            persist_directory=PERSIST_DIR,
+        )
+
+    retriever = vectordb.as_retriever(search_kwargs={"k": 8})
+
+    def get_vector_context(question: str, max_docs: int = 8) -> str:
+        docs = retriever.invoke(question)
+        if not isinstance(docs, list):
+            return ""
+        docs = docs[:max_docs]
+        return "\n\n".join(
+            d.page_content for d in docs if isinstance(d.page_content, str)
+        )
+
+    return get_vector_context
 
-kg = Neo4jGraph(
-    url=NEO4J_URI,
-    username=NEO4J_USERNAME,
-    password=NEO4J_PASSWORD,
-    database=NEO4J_DATABASE,
-)
 
-kg.refresh_schema()
-print("=== GRAPH SCHEMA (from Neo4j) ===")
-print(kg.schema)
+# ============================================================
+# GRAPH RETRIEVAL (Neo4j + Cypher generator)
+# ============================================================
 
 CYPHER_GENERATION_TEMPLATE = """Task: Generate a Cypher statement to query a graph database.
 
@@ -166,7 +261,6 @@ cypher_prompt = PromptTemplate(
     template=CYPHER_GENERATION_TEMPLATE,
 )
 
-cypher_llm = ChatOpenAI(model_name="gpt-4", temperature=0)
 
 def clean_cypher(cypher: str) -> str:
     """
@@ -185,239 +279,439 @@ def clean_cypher(cypher: str) -> str:
     return "\n".join(lines)
 
 
-def generate_cypher(question: str) -> str:
-    return cypher_llm.invoke(
-        cypher_prompt.format(schema=kg.schema, question=question)
-    ).content.strip()
-
-def get_graph_context(question: str, max_chunks: int = 10) -> str:
-    """Generate Cypher, clean it, run it; if nothing comes back, fall back to article-title lookup."""
-    rows = []
-
-    # 1) Try LLM-generated Cypher
-    try:
-        raw_cypher = generate_cypher(question)
-        cypher = clean_cypher(raw_cypher)
-
-        print("\n[Cypher generated]")
-        print(cypher)
-
-        rows = kg.query(cypher)
-    except Exception as e:
-        print(f"[Graph error] {e}")
+class GraphContext:
+    """Graph side of the hybrid retrieval over a Neo4jGraph `kg`."""
+
+    def __init__(self, kg, cypher_llm, prompt_schema: str, limiter=None, linking: bool = True):
+        self.kg = kg
+        self.cypher_llm = cypher_llm
+        self.prompt_schema = prompt_schema
+        self.limiter = limiter
+        # Deterministic entity linking in front of the LLM Cypher generator
+        # (linking=False sends every question to the LLM, as before)
+        self.path_stats = PathStats()
+        self.question_linker = QuestionLinker.from_graph(self.query) if linking else None
+
+    def query(self, cypher: str, params: dict = None):
+        """kg.query() behind the Neo4j rate limiter."""
+        if self.limiter is not None:
+            self.limiter.acquire()
+        return self.kg.query(cypher, params or {})
+
+    def generate_cypher(self, question: str) -> str:
+        return self.cypher_llm.invoke(
+            cypher_prompt.format(schema=self.prompt_schema, question=question)
+        ).content.strip()
+
+    def get_context(self, question: str, max_chunks: int = 10) -> str:
+        """Entity-linked templates first; otherwise generate Cypher, clean it, run it,
+        and if nothing comes back, fall back to Concept-linked rows, then article-title lookup."""
+        question_linker = self.question_linker
         rows = []
+        path = "none"
+        concept_links = None
+        start = time.perf_counter()
 
-    # 2) Fallback: if nothing returned AND question has quoted article title, query directly by title
-    if not rows:
-        title = extract_quoted_title(question)
-        if title:
-            print(f"[Fallback: querying by article title {title!r}]")
+        # 0) Entity-linked templates: no LLM call when the question names a known
+        #    article, author, person or place (Concepts alone only back up the LLM)
+        if question_linker is not None:
             try:
-                rows = kg.query(
-                    """
-                    MATCH (a:Article)
-                    WHERE a.title CONTAINS $title
-                    MATCH (a)-[:HAS_CHUNK]->(c:Chunk)
-                    RETURN a.title AS article_title, c.text AS text_chunk
-                    LIMIT 20
-                    """,
-                    {"title": title},
-                )
+                linked = question_linker.link(question)
+                if linked:
+                    print(f"[Linked entities] {linked}")
+                    if question_linker.preempts_llm(linked):
+                        rows = question_linker.fetch_rows(linked, limit=20)
+                    else:
+                        concept_links = linked
             except Exception as e:
-                print(f"[Fallback graph error] {e}")
+                print(f"[Linker error] {e}")
                 rows = []
+            if rows:
+                path = "linked"
 
-    # 3) Build context string
-    texts = []
-    for row in rows[:max_chunks]:
-        if isinstance(row, dict):
-            # Support both our fallback shape and whatever the LLM produced
-            chunk = (
-                row.get("text_chunk")
-                or row.get("c.text")
-                or row.get("text")
-            )
-            article_title = (
-                row.get("article_title")
-                or row.get("a.title")
-            )
-
-            if isinstance(chunk, str) and chunk.strip():
-                if isinstance(article_title, str) and article_title.strip():
-                    texts.append(f"[{article_title.strip()}]\n{chunk.strip()}")
-                else:
-                    texts.append(chunk.strip())
-        else:
-            texts.append(str(row))
-
-    return "\n\n".join(texts)
-
-
-def get_vector_context(question: str, max_docs: int = 8) -> str:
-    docs = retriever.invoke(question)
-    if not isinstance(docs, list):
-        return ""
-    docs = docs[:max_docs]
-    return "\n\n".join(
-        d.page_content for d in docs if isinstance(d.page_content, str)
-    )
-
-
-# ============================================================
-# LOAD GROUND TRUTH + RESUME LOGIC
-# ============================================================
-
-with open(QA_PATH, "r", encoding="utf-8") as f:
-    all_data = json.load(f)
-
-if not isinstance(all_data, list):
-    raise ValueError("ground_truth must be a JSON list of {instruction, output} objects.")
+        # 1) Try LLM-generated Cypher
+        if not rows:
+            try:
+                raw_cypher = self.generate_cypher(question)
+                cypher = clean_cypher(raw_cypher)
 
-total_questions = len(all_data)
+                print("\n[Cypher generated]")
+                print(cypher)
 
-# Load existing results if any
-if os.path.exists(RESULTS_JSON):
-    with open(RESULTS_JSON, "r", encoding="utf-8") as f:
-        results = json.load(f)
-    print(f"Loaded {len(results)} existing results from {RESULTS_JSON}")
-else:
-    results = []
+                rows = self.query(cypher)
+            except Exception as e:
+                print(f"[Graph error] {e}")
+                rows = []
+            if rows:
+                path = "llm"
 
-start_index = len(results)
-if start_index >= total_questions:
-    print("All questions already processed. Nothing to do.")
-    exit(0)
+        # 1b) Concept-only links, now that the LLM found nothing
+        if not rows and concept_links:
+            try:
+                rows = question_linker.fetch_rows(concept_links, limit=20)
+            except Exception as e:
+                print(f"[Linker error] {e}")
+                rows = []
+            if rows:
+                path = "linked"
+
+        # 2) Fallback: if nothing returned AND question has quoted article title, query directly by title
+        if not rows:
+            title = extract_quoted_title(question)
+            if title:
+                print(f"[Fallback: querying by article title {title!r}]")
+                try:
+                    rows = self.query(
+                        """
+                        MATCH (a:Article)
+                        WHERE a.title CONTAINS $title
+                        MATCH (a)-[:HAS_CHUNK]->(c:Chunk)
+                        RETURN a.title AS article_title, c.text AS text_chunk
+                        LIMIT 20
+                        """,
+                        {"title": title},
+                    )
+                except Exception as e:
+                    print(f"[Fallback graph error] {e}")
+                    rows = []
+                if rows:
+                    path = "title"
+
+        self.path_stats.record(path, time.perf_counter() - start)
+
+        # 3) Build context string
+        texts = []
+        for row in rows[:max_chunks]:
+            if isinstance(row, dict):
+                # Support both our fallback shape and whatever the LLM produced
+                chunk = (
+                    row.get("text_chunk")
+                    or row.get("c.text")
+                    or row.get("text")
+                )
+                article_title = (
+                    row.get("article_title")
+                    or row.get("a.title")
+                )
 
-end_index = min(start_index + BATCH_SIZE, total_questions)
-batch = all_data[start_index:end_index]
+                if isinstance(chunk, str) and chunk.strip():
+                    if isinstance(article_title, str) and article_title.strip():
+                        texts.append(f"[{article_title.strip()}]\n{chunk.strip()}")
+                    else:
+                        texts.append(chunk.strip())
+            else:
+                texts.append(str(row))
 
-print(f"Processing questions {start_index} to {end_index - 1} (batch size {len(batch)})")
+        return "\n\n".join(texts)
 
 
 # ============================================================
 # ANSWER LLM + GRADER
 # ============================================================
 
-answer_llm = ChatOpenAI(model_name="gpt-4", temperature=0.2)
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
-
-
-def answer_with_hybrid(question: str) -> str:
-    graph_ctx = get_graph_context(question)
-    vec_ctx = get_vector_context(question)
-
-    context = ""
-    if graph_ctx:
-        context += "GRAPH CONTEXT:\n" + graph_ctx + "\n\n"
-    if vec_ctx:
-        context += "VECTOR CONTEXT:\n" + vec_ctx + "\n\n"
-
-    if not context:
-        return "I don't have enough information in the provided corpus to answer this."
-
-    prompt = (
-        "You are an expert on the ancient world and the ISAW Papers corpus.\n"
-        "Use ONLY the information in the context below to answer the question.\n"
-        "If the context is insufficient, say you don't know.\n\n"
-        f"{context}"
-        f"Question: {question}\n\n"
-        "Answer in a concise paragraph, citing authors/papers if mentioned in the context."
-    )
-
-    resp = answer_llm.invoke(prompt)
-    return resp.content.strip()
+def _run_branch(clock: BranchClock, fn, question: str) -> str:
+    _branch.clock = clock
+    try:
+        return fn(question)
+    finally:
+        _branch.clock = None
 
 
-def evaluate_reference_guided_grading(question, correct_answer, model_answer):
-    evaluation_prompt = (
-        "Evaluate the following model answer compared to the correct answer.\n"
-        "Provide a numeric score from 1 (completely inaccurate) to 10 (completely accurate).\n"
-        "Return only the number.\n\n"
-        f"Question: {question}\n\n"
-        f"Correct Answer: {correct_answer}\n\n"
-        f"Model Answer: {model_answer}\n\n"
-        "Score (1-10):"
-    )
-    response = openai_client.chat.completions.create(
-        model="gpt-4-turbo",
-        messages=[{"role": "user", "content": evaluation_prompt}],
-        temperature=0,
-        max_tokens=10,
-    )
-    raw_output = response.choices[0].message.content.strip()
-    match = re.search(r"\b([1-9]|10)\b", raw_output)
-    if match:
-        return int(match.group(1))
-    else:
-        print(f"Unexpected score format: '{raw_output}'")
-        return 0
+def _context_before(future, clock: BranchClock, timeout: float, name: str) -> str:
+    try:
+        while True:
+            remaining = timeout - clock.worked()
+            if remaining <= 0:
+                raise FutureTimeout()
+            try:
+                return future.result(timeout=remaining)
+            except FutureTimeout:
+                continue  # time blocked in a rate limiter meanwhile does not count
+    except FutureTimeout:
+        # the call keeps running in its thread; its result is simply not used
+        clock.abandoned = True
+        print(f"[{name} context timed out]")
+    except Exception as e:
+        print(f"[{name} context error] {e}")
+    return ""
 
 
-# ============================================================
-# EVAL LOOP (HYBRID, BATCHED + RESUMABLE)
-# ============================================================
-
-tp_hybrid = 0
-fp_hybrid = 0
-scores_hybrid = []
+class HybridEvaluator:
+    """
+    Answers a question from graph + vector context and grades the answer.
+    `graph_context` / `vector_context` map a question to a context string;
+    every chat call goes through `llm_cache` (and its rate limiter).
+    """
 
-for offset, qa_pair in enumerate(batch):
-    idx = start_index + offset
-    question = qa_pair["instruction"]
-    correct_answer = qa_pair["output"]
+    def __init__(self, llm_cache: LLMCache, graph_context, vector_context, concurrency: int = 1,
+                 api_key: str = OPENAI_API_KEY, base_url: str = OPENAI_BASE_URL):
+        self.llm_cache = llm_cache
+        self.graph_context = graph_context
+        self.vector_context = vector_context
+        self.answer_llm = CachedChatModel(
+            ChatOpenAI(model_name="gpt-4", temperature=0.2, api_key=api_key, base_url=base_url),
+            llm_cache,
+        )
+        self.openai_client = OpenAI(api_key=api_key, base_url=base_url)
+        # Graph and vector retrieval for one question run side by side on this pool;
+        # spare workers absorb calls that outlive their timeout
+        self.retrieval_pool = ThreadPoolExecutor(max_workers=4 * max(1, concurrency),
+                                                 thread_name_prefix="retrieval")
+
+    def get_contexts(self, question: str):
+        """
+        (graph_ctx, vector_ctx), retrieved concurrently with separate timeouts.
+        Each timeout covers the branch's own work: waiting for a rate-limiter token
+        (shared with the other --concurrency workers) is not charged to it.
+        """
+        graph_clock, vector_clock = BranchClock(), BranchClock()
+        graph_future = self.retrieval_pool.submit(_run_branch, graph_clock, self.graph_context, question)
+        vector_future = self.retrieval_pool.submit(_run_branch, vector_clock, self.vector_context, question)
+        vec_ctx = _context_before(vector_future, vector_clock, VECTOR_CONTEXT_TIMEOUT, "Vector")
+        graph_ctx = _context_before(graph_future, graph_clock, GRAPH_CONTEXT_TIMEOUT, "Graph")
+        return graph_ctx, vec_ctx
+
+    def answer_with_hybrid(self, question: str) -> str:
+        graph_ctx, vec_ctx = self.get_contexts(question)
+
+        context = ""
+        if graph_ctx:
+            context += "GRAPH CONTEXT:\n" + graph_ctx + "\n\n"
+        if vec_ctx:
+            context += "VECTOR CONTEXT:\n" + vec_ctx + "\n\n"
+
+        if not context:
+            return "I don't have enough information in the provided corpus to answer this."
+
+        prompt = (
+            "You are an expert on the ancient world and the ISAW Papers corpus.\n"
+            "Use ONLY the information in the context below to answer the question.\n"
+            "If the context is insufficient, say you don't know.\n\n"
+            f"{context}"
+            f"Question: {question}\n\n"
+            "Answer in a concise paragraph, citing authors/papers if mentioned in the context."
+        )
+
+        resp = self.answer_llm.invoke(prompt)
+        return resp.content.strip()
+
+    def evaluate_reference_guided_grading(self, question, correct_answer, model_answer):
+        evaluation_prompt = (
+            "Evaluate the following model answer compared to the correct answer.\n"
+            "Provide a numeric score from 1 (completely inaccurate) to 10 (completely accurate).\n"
+            "Return only the number.\n\n"
+            f"Question: {question}\n\n"
+            f"Correct Answer: {correct_answer}\n\n"
+            f"Model Answer: {model_answer}\n\n"
+            "Score (1-10):"
+        )
+        raw_output = self.llm_cache.chat_completion(
+            self.openai_client,
+            model="gpt-4-turbo",
+            messages=[{"role": "user", "content": evaluation_prompt}],
+            temperature=0,
+            max_tokens=10,
+        ).strip()
+        match = re.search(r"\b([1-9]|10)\b", raw_output)
+        if match:
+            return int(match.group(1))
+        else:
+            print(f"Unexpected score format: '{raw_output}'")
+            return 0
 
-    print(f"\n=== [{idx+1}/{total_questions}] Question ===")
-    print(question)
+    def evaluate_question(self, qa_pair: dict, idx: int, total_questions: int) -> dict:
+        question = qa_pair["instruction"]
+        correct_answer = qa_pair["output"]
 
-    hybrid_answer = answer_with_hybrid(question)
-    print("\n[Hybrid answer]")
-    print(hybrid_answer)
+        print(f"\n=== [{idx+1}/{total_questions}] Question ===")
+        print(question)
 
-    score = evaluate_reference_guided_grading(question, correct_answer, hybrid_answer)
-    scores_hybrid.append(score)
-    if score > 5:
-        tp_hybrid += 1
-    else:
-        fp_hybrid += 1
+        hybrid_answer = self.answer_with_hybrid(question)
+        print(f"\n[Hybrid answer {idx+1}]")
+        print(hybrid_answer)
 
-    results.append(
-        {
+        score = self.evaluate_reference_guided_grading(question, correct_answer, hybrid_answer)
+        return {
             "index": idx,
             "question": question,
             "correct_answer": correct_answer,
             "hybrid_answer": hybrid_answer,
             "score_hybrid": score,
         }
-    )
 
-# Save updated JSON results (full list, not just this batch)
-with open(RESULTS_JSON, "w", encoding="utf-8") as f:
-    json.dump(results, f, ensure_ascii=False, indent=2)
-print(f"\nUpdated results saved to {RESULTS_JSON}")
+    def close(self) -> None:
+        self.retrieval_pool.shutdown(wait=False, cancel_futures=True)
 
 
 # ============================================================
-# METRICS FOR THIS BATCH ONLY
+# EVAL LOOP (HYBRID, BATCHED + RESUMABLE, OPTIONALLY CONCURRENT)
 # ============================================================
 
+def save_results(results: list, results_json: str = RESULTS_JSON) -> None:
+    """Write all results so far, ordered by question index (atomic replace)."""
+    results.sort(key=lambda r: r["index"])
+    tmp_path = results_json + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, results_json)
+
+
 def ratio(tp, fp):
     return tp / (tp + fp) if (tp + fp) > 0 else 0.0
 
 
-acceptability_ratio = ratio(tp_hybrid, fp_hybrid)
-avg_score = sum(scores_hybrid) / len(scores_hybrid) if scores_hybrid else 0.0
+def run_eval(evaluator: HybridEvaluator, all_data: list, batch_size: int = BATCH_SIZE,
+             concurrency: int = 1, results_json: str = RESULTS_JSON,
+             results_csv: str = RESULTS_CSV) -> list:
+    """
+    Evaluate up to `batch_size` questions of `all_data` that have no result in
+    `results_json` yet, and return the records of this batch.
+    """
+    total_questions = len(all_data)
+
+    # Load existing results if any; resume by the set of finished indices, so
+    # questions that failed (or finished out of order) in an earlier run are redone
+    if os.path.exists(results_json):
+        with open(results_json, "r", encoding="utf-8") as f:
+            results = json.load(f)
+        print(f"Loaded {len(results)} existing results from {results_json}")
+    else:
+        results = []
+
+    done_indices = {r["index"] for r in results}
+    pending = [i for i in range(total_questions) if i not in done_indices]
+    if not pending:
+        print("All questions already processed. Nothing to do.")
+        return []
+
+    batch = pending[:batch_size]
+
+    print(f"Processing {len(batch)} questions ({batch[0]} .. {batch[-1]}), concurrency {concurrency}")
+
+    tp_hybrid = 0
+    fp_hybrid = 0
+    scores_hybrid = []
+    batch_records = []
+
+    # Results are collected and saved on the calling thread only. Each finished
+    # question is saved right away, so an interrupted run loses at most the questions
+    # still in flight; a failed question is logged and left for the next run.
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = {pool.submit(evaluator.evaluate_question, all_data[idx], idx, total_questions): idx
+                   for idx in batch}
+        for fut in as_completed(futures):
+            idx = futures[fut]
+            try:
+                record = fut.result()
+            except Exception as e:
+                print(f"[Question {idx+1} failed] {e}")
+                continue
+
+            score = record["score_hybrid"]
+            scores_hybrid.append(score)
+            if score > 5:
+                tp_hybrid += 1
+            else:
+                fp_hybrid += 1
+
+            results.append(record)
+            batch_records.append(record)
+            save_results(results, results_json)
+
+    print(f"\nUpdated results saved to {results_json}")
+
+    # ============================================================
+    # METRICS FOR THIS BATCH ONLY
+    # ============================================================
+
+    acceptability_ratio = ratio(tp_hybrid, fp_hybrid)
+    avg_score = sum(scores_hybrid) / len(scores_hybrid) if scores_hybrid else 0.0
+
+    print("\n--- HYBRID (graph + vector) Batch Evaluation Summary ---")
+    print(
+        f"Batch size: {len(batch)}, evaluated: {len(scores_hybrid)}, "
+        f"Avg score: {avg_score:.2f}, "
+        f"acceptability_ratio (>5): {acceptability_ratio:.2f}"
+    )
 
-print("\n--- HYBRID (graph + vector) Batch Evaluation Summary ---")
-print(
-    f"Batch size: {len(batch)}, "
-    f"Avg score: {avg_score:.2f}, "
-    f"acceptability_ratio (>5): {acceptability_ratio:.2f}"
-)
+    # Also (re)write CSV with all results so far
+    if results:
+        with open(results_csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=results[0].keys())
+            writer.writeheader()
+            writer.writerows(results)
+
+        print(f"CSV with all results so far saved to {results_csv}")
+
+    batch_records.sort(key=lambda r: r["index"])
+    return batch_records
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Hybrid (graph + vector) GraphRAG evaluation on the ground-truth set.")
+    ap.add_argument("--concurrency", type=int, default=int(os.getenv("EVAL_CONCURRENCY", "1")),
+                    help="Questions evaluated in parallel (default 1 = sequential).")
+    ap.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                    help="How many not-yet-evaluated questions to process in this run.")
+    ap.add_argument("--llm-cache-mode", choices=LLM_CACHE_MODES, default=DEFAULT_LLM_CACHE_MODE,
+                    help="LLM response cache: off, read-write (default), replay-only, record.")
+    args = ap.parse_args()
+
+    # One bucket per provider, shared by all workers
+    openai_limiter = ClockedLimiter(TokenBucket(OPENAI_RPM / 60.0, capacity=OPENAI_BURST))
+    neo4j_limiter = ClockedLimiter(TokenBucket(NEO4J_QPS)) if NEO4J_QPS > 0 else None
+
+    # Cypher generation, answering and grading are cached by (endpoint, model, temperature, prompt hash);
+    # only calls that actually reach the API take a rate-limiter token
+    llm_cache = LLMCache(mode=args.llm_cache_mode, limiter=openai_limiter, endpoint=OPENAI_BASE_URL)
+    api_key = OPENAI_API_KEY
+    if llm_cache.mode == "replay-only" and not api_key:
+        api_key = "replay-only"  # clients must be constructible; no request is sent
+
+    with open(QA_PATH, "r", encoding="utf-8") as f:
+        all_data = json.load(f)
+
+    if not isinstance(all_data, list):
+        raise ValueError("ground_truth must be a JSON list of {instruction, output} objects.")
+
+    vector_context = build_vector_context(api_key, limiter=neo4j_limiter)
+
+    kg = Neo4jGraph(
+        url=NEO4J_URI,
+        username=NEO4J_USERNAME,
+        password=NEO4J_PASSWORD,
+        database=NEO4J_DATABASE,
+        refresh_schema=False,
+        timeout=GRAPH_CONTEXT_TIMEOUT,  # transaction timeout: a runaway generated query can't pin a worker
+    )
+
+    # Schema comes from .cache/graph_schema.json unless the graph fingerprint changed;
+    # the Cypher prompt gets the compact form (SCHEMA_PROMPT=full for kg.schema)
+    schema_snapshot = load_schema_snapshot(kg)
+    prompt_schema = kg.schema if os.getenv("SCHEMA_PROMPT", "compact") == "full" else schema_snapshot["compact"]
+    print("=== GRAPH SCHEMA (prompt) ===")
+    print(prompt_schema)
+
+    cypher_llm = CachedChatModel(
+        ChatOpenAI(model_name="gpt-4", temperature=0, api_key=api_key,
+                   base_url=OPENAI_BASE_URL, timeout=GRAPH_CONTEXT_TIMEOUT),
+        llm_cache,
+    )
+    # QUESTION_LINKING=0 sends every question to the LLM Cypher generator
+    graph = GraphContext(kg, cypher_llm, prompt_schema, limiter=neo4j_limiter,
+                         linking=os.getenv("QUESTION_LINKING", "1") != "0")
+
+    evaluator = HybridEvaluator(llm_cache, graph.get_context, vector_context,
+                                concurrency=args.concurrency, api_key=api_key)
+    try:
+        run_eval(evaluator, all_data, batch_size=args.batch_size, concurrency=args.concurrency)
+    finally:
+        evaluator.close()
+
+    print(graph.path_stats.report())
+    print(llm_cache.report())
+    llm_cache.close()
 
-# Also (re)write CSV with all results so far
-with open(RESULTS_CSV, "w", newline="", encoding="utf-8") as f:
-    writer = csv.DictWriter(f, fieldnames=results[0].keys())
-    writer.writeheader()
-    writer.writerows(results)
 
-print(f"CSV with all results so far saved to {RESULTS_CSV}")
+if __name__ == "__main__":
+    main()
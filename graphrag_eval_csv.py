@@ -5,16 +5,20 @@ import json
 import re
 import csv
 import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from dotenv import load_dotenv
 from openai import OpenAI
 
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_core.documents import Document
+from langchain_openai import ChatOpenAI
 
-from langchain_community.vectorstores import Chroma
 from langchain_community.graphs import Neo4jGraph
 from langchain_core.prompts import PromptTemplate
 
+from question_linker import PathStats, QuestionLinker
+from schema_snapshot import load_schema_snapshot
+from llm_cache import CachedChatModel, LLMCache
+
 # ============================================================
 # ENV + GLOBAL CONFIG
 # ============================================================
@@ -38,6 +42,22 @@ QA_PATH = "failed_qa.csv"
 
 PERSIST_DIR = "./docs/chroma_hybrid"
 
+# Vector side of the hybrid retrieval:
+#   neo4j  -> vector index on Chunk.textEmbedding, question embedded locally (MiniLM)
+#   chroma -> OpenAI embeddings + Chroma store at PERSIST_DIR
+VECTOR_RETRIEVER = os.getenv("VECTOR_RETRIEVER", "neo4j").lower()
+
+# Graph and vector context are fetched in parallel; each has its own deadline (seconds).
+# A branch that misses it contributes no context, the other one is still used.
+GRAPH_CONTEXT_TIMEOUT = float(os.getenv("GRAPH_CONTEXT_TIMEOUT", "60"))
+VECTOR_CONTEXT_TIMEOUT = float(os.getenv("VECTOR_CONTEXT_TIMEOUT", "20"))
+
+# Cypher generation, answering and grading are cached by (endpoint, model, temperature, prompt hash);
+# mode from LLM_CACHE_MODE: off, read-write (default), replay-only, record
+llm_cache = LLMCache()
+if llm_cache.mode == "replay-only" and not OPENAI_API_KEY:
+    OPENAI_API_KEY = "replay-only"  # clients must be constructible; no request is sent
+
 # Progress + outputs
 RESULTS_JSON = "hybrid_results_ground_truth_failed.json"
 RESULTS_CSV = "hybrid_results_ground_truth_failed.csv"
@@ -47,7 +67,7 @@ BATCH_SIZE = 100   # no longer used for resume, but keep if you want to reintrod
 
 
 # ============================================================
-# LOAD CHUNKS AND BUILD / LOAD VECTORSTORE (Chroma)
+# VECTOR RETRIEVER (Neo4j vector index, or Chroma built / loaded once)
 # ============================================================
 
 def extract_quoted_title(question: str) -> str | None:
@@ -70,34 +90,48 @@ def extract_source(chunk: str) -> str:
     return "Unknown"
 
 
-# Embeddings
-embedding = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
-
-# Either load existing Chroma or build it once
-if os.path.exists(PERSIST_DIR):
-    print(f"Using existing Chroma index at {PERSIST_DIR}")
-    vectordb = Chroma(
-        embedding_function=embedding,
-        persist_directory=PERSIST_DIR,
-    )
+if VECTOR_RETRIEVER == "neo4j":
+    from neo4j import GraphDatabase
+    from neo4j_vector_retriever import Neo4jVectorRetriever
+
+    print("Using Neo4j vector index chunk_embedding for vector retrieval")
+    vector_driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USERNAME, NEO4J_PASSWORD))
+    neo4j_retriever = Neo4jVectorRetriever(vector_driver, NEO4J_DATABASE, k=8)
+elif VECTOR_RETRIEVER == "chroma":
+    from langchain_openai import OpenAIEmbeddings
+    from langchain_core.documents import Document
+    from langchain_community.vectorstores import Chroma
+
+    # Embeddings
+    embedding = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
+
+    # Either load existing Chroma or build it once
+    if os.path.exists(PERSIST_DIR):
+        print(f"Using existing Chroma index at {PERSIST_DIR}")
+        vectordb = Chroma(
+            embedding_function=embedding,
+            persist_directory=PERSIST_DIR,
+        )
+    else:
+        print(f"Building new Chroma index at {PERSIST_DIR}")
+        documents = []
+        with open(CHUNKS_PATH, "r", encoding="utf-8") as f:
+            content = f.read()
+            chunks = json.loads(content)
+            for chunk in chunks:
+                source = extract_source(chunk)
+                documents.append(Document(page_content=chunk, metadata={"source": source}))
+
+        os.makedirs(os.path.dirname(PERSIST_DIR), exist_ok=True)
+        vectordb = Chroma.from_documents(
+            documents=documents,
+            embedding=embedding,
+            persist_directory=PERSIST_DIR,
+        )
+
+    retriever = vectordb.as_retriever(search_kwargs={"k": 8})
 else:
-    print(f"Building new Chroma index at {PERSIST_DIR}")
-    documents = []
-    with open(CHUNKS_PATH, "r", encoding="utf-8") as f:
-        content = f.read()
-        chunks = json.loads(content)
-        for chunk in chunks:
-            source = extract_source(chunk)
-            documents.append(Document(page_content=chunk, metadata={"source": source}))
-
-    os.makedirs(os.path.dirname(PERSIST_DIR), exist_ok=True)
-    vectordb = Chroma.from_documents(
-        documents=documents,
-        embedding=embedding,
-        persist_directory=PERSIST_DIR,
-    )
-
-retriever = vectordb.as_retriever(search_kwargs={"k": 8})
+    raise ValueError(f"VECTOR_RETRIEVER must be 'neo4j' or 'chroma', got {VECTOR_RETRIEVER!r}")
 
 
 # ============================================================
@@ -109,11 +143,21 @@ kg = Neo4jGraph(
     username=NEO4J_USERNAME,
     password=NEO4J_PASSWORD,
     database=NEO4J_DATABASE,
+    refresh_schema=False,
+    timeout=GRAPH_CONTEXT_TIMEOUT,  # transaction timeout: a runaway generated query can't pin a worker
 )
 
-kg.refresh_schema()
-print("=== GRAPH SCHEMA (from Neo4j) ===")
-print(kg.schema)
+# Schema comes from .cache/graph_schema.json unless the graph fingerprint changed;
+# the Cypher prompt gets the compact form (SCHEMA_PROMPT=full for kg.schema)
+schema_snapshot = load_schema_snapshot(kg)
+PROMPT_SCHEMA = kg.schema if os.getenv("SCHEMA_PROMPT", "compact") == "full" else schema_snapshot["compact"]
+print("=== GRAPH SCHEMA (prompt) ===")
+print(PROMPT_SCHEMA)
+
+# Deterministic entity linking in front of the LLM Cypher generator
+# (QUESTION_LINKING=0 sends every question to the LLM, as before)
+graph_path_stats = PathStats()
+question_linker = QuestionLinker.from_graph(kg.query) if os.getenv("QUESTION_LINKING", "1") != "0" else None
 
 CYPHER_GENERATION_TEMPLATE = """Task: Generate a Cypher statement to query a graph database.
 
@@ -169,7 +213,10 @@ cypher_prompt = PromptTemplate(
     template=CYPHER_GENERATION_TEMPLATE,
 )
 
-cypher_llm = ChatOpenAI(model_name="gpt-4", temperature=0)
+cypher_llm = CachedChatModel(
+    ChatOpenAI(model_name="gpt-4", temperature=0, api_key=OPENAI_API_KEY, timeout=GRAPH_CONTEXT_TIMEOUT),
+    llm_cache,
+)
 
 def strip_c_text_filters(cypher: str) -> str:
     """
@@ -206,12 +253,16 @@ def clean_cypher(cypher: str) -> str:
 
 def generate_cypher(question: str) -> str:
     return cypher_llm.invoke(
-        cypher_prompt.format(schema=kg.schema, question=question)
+        cypher_prompt.format(schema=PROMPT_SCHEMA, question=question)
     ).content.strip()
 
 def get_graph_context(question: str, max_chunks: int = 10) -> str:
-    """Generate Cypher, clean it, run it; prioritize direct article-title lookup."""
+    """Direct article-title lookup, then entity-linked templates, then LLM-generated Cypher,
+    then Concept-linked rows."""
     rows = []
+    path = "none"
+    concept_links = None
+    start = time.perf_counter()
 
     # 0) Try direct article-title lookup first if there is a quoted title
     title = extract_quoted_title(question)
@@ -231,8 +282,27 @@ def get_graph_context(question: str, max_chunks: int = 10) -> str:
         except Exception as e:
             print(f"[Title-mode graph error] {e}")
             rows = []
+        if rows:
+            path = "title"
+
+    # 1) Entity-linked templates: no LLM call when the question names a known
+    #    article, author, person or place (Concepts alone only back up the LLM)
+    if not rows and question_linker is not None:
+        try:
+            linked = question_linker.link(question)
+            if linked:
+                print(f"[Linked entities] {linked}")
+                if question_linker.preempts_llm(linked):
+                    rows = question_linker.fetch_rows(linked, limit=20)
+                else:
+                    concept_links = linked
+        except Exception as e:
+            print(f"[Linker error] {e}")
+            rows = []
+        if rows:
+            path = "linked"
 
-    # 1) If title-mode failed, try LLM-generated Cypher
+    # 2) If title mode and linking found nothing, try LLM-generated Cypher
     if not rows:
         try:
             raw_cypher = generate_cypher(question)
@@ -246,8 +316,22 @@ def get_graph_context(question: str, max_chunks: int = 10) -> str:
         except Exception as e:
             print(f"[Graph error] {e}")
             rows = []
+        if rows:
+            path = "llm"
 
-    # 2) Build context string
+    # 3) Concept-only links, now that the LLM found nothing
+    if not rows and concept_links:
+        try:
+            rows = question_linker.fetch_rows(concept_links, limit=20)
+        except Exception as e:
+            print(f"[Linker error] {e}")
+            rows = []
+        if rows:
+            path = "linked"
+
+    graph_path_stats.record(path, time.perf_counter() - start)
+
+    # 4) Build context string
     texts = []
     for row in rows[:max_chunks]:
         if isinstance(row, dict):
@@ -281,6 +365,9 @@ def get_vector_context(question: str, max_docs: int = 8) -> str:
     else:
         query = question
 
+    if VECTOR_RETRIEVER == "neo4j":
+        return neo4j_retriever.get_context(query, max_docs)
+
     docs = retriever.invoke(query)
     if not isinstance(docs, list):
         return ""
@@ -354,13 +441,41 @@ print(f"Processing questions {start_index} to {end_index - 1} (batch size {len(b
 # ANSWER LLM + GRADER
 # ============================================================
 
-answer_llm = ChatOpenAI(model_name="gpt-4", temperature=0.2)
+answer_llm = CachedChatModel(
+    ChatOpenAI(model_name="gpt-4", temperature=0.2, api_key=OPENAI_API_KEY),
+    llm_cache,
+)
 openai_client = OpenAI(api_key=OPENAI_API_KEY)
 
 
+# Graph and vector retrieval for one question run side by side on this pool;
+# spare workers absorb calls that outlive their timeout
+retrieval_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="retrieval")
+
+
+def _context_before(future, deadline: float, name: str) -> str:
+    try:
+        return future.result(timeout=max(0.0, deadline - time.monotonic()))
+    except FutureTimeout:
+        # the call keeps running in its thread; its result is simply not used
+        print(f"[{name} context timed out]")
+    except Exception as e:
+        print(f"[{name} context error] {e}")
+    return ""
+
+
+def get_contexts(question: str):
+    """(graph_ctx, vector_ctx), retrieved concurrently with separate timeouts."""
+    start = time.monotonic()
+    graph_future = retrieval_pool.submit(get_graph_context, question)
+    vector_future = retrieval_pool.submit(get_vector_context, question)
+    vec_ctx = _context_before(vector_future, start + VECTOR_CONTEXT_TIMEOUT, "Vector")
+    graph_ctx = _context_before(graph_future, start + GRAPH_CONTEXT_TIMEOUT, "Graph")
+    return graph_ctx, vec_ctx
+
+
 def answer_with_hybrid(question: str) -> str:
-    graph_ctx = get_graph_context(question)
-    vec_ctx = get_vector_context(question)
+    graph_ctx, vec_ctx = get_contexts(question)
 
     context = ""
     if graph_ctx:
@@ -394,13 +509,13 @@ def evaluate_reference_guided_grading(question, correct_answer, model_answer):
         f"Model Answer: {model_answer}\n\n"
         "Score (1-10):"
     )
-    response = openai_client.chat.completions.create(
+    raw_output = llm_cache.chat_completion(
+        openai_client,
         model="gpt-4-turbo",
         messages=[{"role": "user", "content": evaluation_prompt}],
         temperature=0,
         max_tokens=10,
-    )
-    raw_output = response.choices[0].message.content.strip()
+    ).strip()
     match = re.search(r"\b([1-9]|10)\b", raw_output)
     if match:
         return int(match.group(1))
@@ -480,3 +595,6 @@ if results:
     print(f"CSV with all results for this run saved to {RESULTS_CSV}")
 else:
     print("No results to write to CSV.")
+
+print(graph_path_stats.report())
+print(llm_cache.report())
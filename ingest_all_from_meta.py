@@ -16,12 +16,19 @@ Usage (from project root):
       --chunks-dir data/chunks \
       --embed-model sentence-transformers/all-MiniLM-L6-v2
 
+Parallel (one article per task, models loaded once per worker process):
+
+  python ingest_all_from_meta.py --jobs 4 --batch-size 1000
+
 Env vars (same as before):
   NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD/NEO4J_PASS, NEO4J_DATABASE
 """
 
 import argparse
+import multiprocessing as mp
+import multiprocessing.util
 import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -38,10 +45,19 @@ from ingest_articles import (
     NEO4J_PASS,
     NEO4J_DATABASE,
     DEFAULT_EMBED_MODEL,
+    EMBED_BACKENDS,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_NER_BATCH_SIZE,
+    build_dictionary_matcher,
+    collect_known_persons,
+    embed_cache_key,
+    load_embedder,
+    load_nlp,
 )
+from embedding_cache import DEFAULT_EMBED_CACHE_DIR, EmbeddingCache, format_report
+from graph_schema import PARALLEL_INGEST_KEYS, ensure_schema, missing_unique_keys
 
-from sentence_transformers import SentenceTransformer
-import spacy
+from neo4j import GraphDatabase
 from tqdm import tqdm
 
 
@@ -64,6 +80,267 @@ def find_chunks_file(chunks_dir: Path, article_id: str) -> Path | None:
     return matches[0]
 
 
+def locate_article(meta_path: Path, chunks_dir: Path):
+    """
+    Load the meta of one article and find its chunks file, without reading it.
+    Returns (status, meta, chunks_path); status is "ok", "skip" or "no_chunks"
+    (the reason has already been printed).
+    """
+    try:
+        meta = load_meta(meta_path)
+    except Exception as e:
+        print(f"[SKIP] Failed to load meta {meta_path.name}: {e}")
+        return "skip", None, None
+
+    article_id = meta.get("articleId")
+    if not article_id:
+        print(f"[SKIP] {meta_path.name}: no 'articleId' in meta.")
+        return "skip", meta, None
+
+    chunks_path = find_chunks_file(chunks_dir, article_id)
+    if not chunks_path:
+        print(f"[SKIP] {article_id}: no chunks JSONL found in {chunks_dir}")
+        return "no_chunks", meta, None
+
+    return "ok", meta, chunks_path
+
+
+def chunks_problem(chunks, article_id: str, chunks_path: Path) -> str | None:
+    """Why `chunks` cannot be ingested as `article_id`, or None when they can."""
+    ids = {c.get("articleId") for c in chunks}
+    ids.discard(None)
+    if len(ids) != 1:
+        return f"{chunks_path.name}: expected exactly 1 articleId in chunks, found {ids}"
+
+    chunks_article_id = ids.pop()
+    if chunks_article_id != article_id:
+        return f"Meta/chunks mismatch: meta articleId={article_id}, chunks articleId={chunks_article_id}"
+    return None
+
+
+def check_article(meta_path: Path, chunks_dir: Path):
+    """
+    Load and validate one article.
+    Returns (status, meta, chunks_path, chunks); status is "ok", "skip",
+    "no_chunks" or "bad_chunks" (the reason has already been printed).
+    """
+    status, meta, chunks_path = locate_article(meta_path, chunks_dir)
+    if status != "ok":
+        return status, meta, chunks_path, None
+
+    try:
+        chunks = read_jsonl(chunks_path)
+    except Exception as e:
+        print(f"[SKIP] Failed to read chunks {chunks_path.name}: {e}")
+        return "bad_chunks", meta, chunks_path, None
+
+    problem = chunks_problem(chunks, meta["articleId"], chunks_path)
+    if problem:
+        print(f"[SKIP] {problem}")
+        return "bad_chunks", meta, chunks_path, None
+
+    return "ok", meta, chunks_path, chunks
+
+
+def load_models(args, persons):
+    embedder = load_embedder(args.embed_model, args.embed_backend, args.embed_threads)
+    embed_cache = None if args.no_embed_cache else EmbeddingCache(
+        args.embed_cache, embed_cache_key(args.embed_model, args.embed_backend))
+    if args.mentions == "ner":
+        nlp = load_nlp()
+    else:
+        nlp = build_dictionary_matcher(persons=persons)
+    return embedder, embed_cache, nlp
+
+
+def print_summary(ingested, skipped_no_chunks, skipped_bad_chunks):
+    print(f"Ingested OK:           {ingested}")
+    print(f"Skipped (no chunks):   {skipped_no_chunks}")
+    print(f"Skipped (bad chunks):  {skipped_bad_chunks}")
+
+
+def run_serial(args, meta_files, chunks_dir: Path, persons) -> None:
+    print("Loading embedder and mention extractor...")
+    embedder, embed_cache, nlp = load_models(args, persons)
+
+    ingested = 0
+    skipped_no_chunks = 0
+    skipped_bad_chunks = 0
+
+    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS))
+    try:
+        for meta_path in tqdm(meta_files, desc="Articles", unit="article"):
+            status, meta, chunks_path, chunks = check_article(meta_path, chunks_dir)
+            if status == "no_chunks":
+                skipped_no_chunks += 1
+            elif status == "bad_chunks":
+                skipped_bad_chunks += 1
+            if status != "ok":
+                continue
+
+            article_id = meta["articleId"]
+            print(f"\n=== Ingesting {article_id} from {chunks_path.name} ===")
+            try:
+                ingest(
+                    NEO4J_URI,
+                    NEO4J_USER,
+                    NEO4J_PASS,
+                    NEO4J_DATABASE,
+                    chunks,
+                    meta,
+                    embedder,
+                    nlp,
+                    bulk=args.bulk,
+                    batch_size=args.batch_size,
+                    ner_batch_size=args.ner_batch_size,
+                    ner_processes=args.ner_processes,
+                    embed_cache=embed_cache,
+                    driver=driver,
+                )
+                ingested += 1
+                print(f"=== Done {article_id} ===")
+            except Exception as e:
+                print(f"[ERROR] Ingest failed for {article_id}: {e}")
+                skipped_bad_chunks += 1
+    finally:
+        driver.close()
+
+    print("\nAll done.")
+    if embed_cache is not None:
+        print(embed_cache.report())
+    print_summary(ingested, skipped_no_chunks, skipped_bad_chunks)
+
+
+# ---------- --jobs N: one article per task, models loaded once per worker ----------
+
+_WORKER = {}
+
+
+def _init_worker(args, persons) -> None:
+    embedder, embed_cache, nlp = load_models(args, persons)
+    _WORKER.update(
+        args=args,
+        embedder=embedder,
+        embed_cache=embed_cache,
+        nlp=nlp,
+        # one driver (connection pool) per worker, reused for all its articles
+        driver=GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS)),
+    )
+    # ProcessPoolExecutor has no per-worker teardown hook; multiprocessing runs
+    # Finalize callbacks when the worker process exits
+    mp.util.Finalize(None, _close_worker, exitpriority=10)
+
+
+def _close_worker() -> None:
+    if _WORKER.get("embed_cache") is not None:
+        _WORKER["embed_cache"].close()
+    if _WORKER.get("driver") is not None:
+        _WORKER["driver"].close()
+
+
+def _ingest_job(meta: dict, chunks_path: str):
+    """
+    Read, validate and ingest one article in a worker (the only full read of its
+    chunks file); returns (articleId, status, chunk count, error or None,
+    embed-cache (hits, misses) for this article), status "ok", "bad_chunks" or "error".
+    """
+    args = _WORKER["args"]
+    embed_cache = _WORKER["embed_cache"]
+    before = (embed_cache.hits, embed_cache.misses) if embed_cache is not None else (0, 0)
+    article_id = meta["articleId"]
+    chunks_path = Path(chunks_path)
+    try:
+        chunks = read_jsonl(chunks_path)
+    except Exception as e:
+        return article_id, "bad_chunks", 0, f"Failed to read chunks {chunks_path.name}: {e}", (0, 0)
+    problem = chunks_problem(chunks, article_id, chunks_path)
+    if problem:
+        return article_id, "bad_chunks", 0, problem, (0, 0)
+    try:
+        ingest(
+            NEO4J_URI,
+            NEO4J_USER,
+            NEO4J_PASS,
+            NEO4J_DATABASE,
+            chunks,
+            meta,
+            _WORKER["embedder"],
+            _WORKER["nlp"],
+            bulk=True,
+            batch_size=args.batch_size,
+            ner_batch_size=args.ner_batch_size,
+            ner_processes=1,
+            embed_cache=_WORKER["embed_cache"],
+            driver=_WORKER["driver"],
+            progress=False,
+        )
+    except Exception as e:
+        return article_id, "error", 0, f"{type(e).__name__}: {e}", _cache_delta(embed_cache, before)
+    return article_id, "ok", len(chunks), None, _cache_delta(embed_cache, before)
+
+
+def _cache_delta(embed_cache, before):
+    if embed_cache is None:
+        return 0, 0
+    return embed_cache.hits - before[0], embed_cache.misses - before[1]
+
+
+def run_parallel(args, meta_files, chunks_dir: Path, persons) -> None:
+    """
+    Fan whole articles out to `args.jobs` worker processes. Workers always use
+    the bulk path (managed transactions that retry deadlocks and other
+    transient errors). Concurrent MERGEs on shared Person/Concept names only
+    stay duplicate-free because main() has checked that those names carry
+    uniqueness constraints. The parent only checks the meta and that a chunks
+    file exists; each worker reads and validates its chunks file once.
+    """
+    skipped_no_chunks = 0
+    skipped_bad_chunks = 0
+    jobs = []
+    for meta_path in meta_files:
+        status, meta, chunks_path = locate_article(meta_path, chunks_dir)
+        if status == "ok":
+            jobs.append((meta, str(chunks_path)))
+        elif status == "no_chunks":
+            skipped_no_chunks += 1
+
+    if not args.bulk:
+        print("[INFO] --jobs uses the bulk write path (managed transactions with retries).")
+    print(f"Ingesting {len(jobs)} articles with {args.jobs} worker processes...")
+
+    ingested = 0
+    n_chunks = 0
+    cache_hits = 0
+    cache_misses = 0
+    # spawn: forking a process that may already hold torch/driver threads is unsafe
+    ctx = mp.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=args.jobs, mp_context=ctx,
+                             initializer=_init_worker, initargs=(args, persons)) as pool:
+        futures = [pool.submit(_ingest_job, m, c) for m, c in jobs]
+        with tqdm(total=len(futures), desc="Articles", unit="article") as bar:
+            for fut in as_completed(futures):
+                article_id, status, n, err, (hits, misses) = fut.result()
+                cache_hits += hits
+                cache_misses += misses
+                if status == "bad_chunks":
+                    tqdm.write(f"[SKIP] {err}")
+                    skipped_bad_chunks += 1
+                elif err:
+                    tqdm.write(f"[ERROR] Ingest failed for {article_id}: {err}")
+                    skipped_bad_chunks += 1
+                else:
+                    ingested += 1
+                    n_chunks += n
+                bar.set_postfix(chunks=n_chunks)
+                bar.update(1)
+
+    print("\nAll done.")
+    if not args.no_embed_cache:
+        print(format_report(embed_cache_key(args.embed_model, args.embed_backend),
+                            cache_hits, cache_misses))
+    print_summary(ingested, skipped_no_chunks, skipped_bad_chunks)
+
+
 def main():
     if not NEO4J_PASS:
         raise SystemExit(
@@ -88,6 +365,64 @@ def main():
         default=DEFAULT_EMBED_MODEL,
         help="SentenceTransformer model name.",
     )
+    ap.add_argument(
+        "--embed-backend",
+        choices=EMBED_BACKENDS,
+        default="torch",
+        help="torch: fp32 SentenceTransformer; onnx-int8: quantized ONNX on CPU.",
+    )
+    ap.add_argument(
+        "--embed-threads",
+        type=int,
+        default=None,
+        help="Intra-op CPU threads for the embedder (default: library default).",
+    )
+    ap.add_argument(
+        "--bulk",
+        action="store_true",
+        help="Write with batched UNWIND transactions (see ingest_articles.py --bulk).",
+    )
+    ap.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help="Rows per UNWIND transaction in --bulk mode.",
+    )
+    ap.add_argument(
+        "--ner-batch-size",
+        type=int,
+        default=DEFAULT_NER_BATCH_SIZE,
+        help="Texts per nlp.pipe batch for mention extraction (--bulk).",
+    )
+    ap.add_argument(
+        "--ner-processes",
+        type=int,
+        default=1,
+        help="spaCy worker processes for mention extraction (--bulk).",
+    )
+    ap.add_argument(
+        "--mentions",
+        choices=["ner", "dictionary"],
+        default="ner",
+        help="ner: spaCy PERSON entities; dictionary: only known authors/aliases "
+             "and CONCEPT_ALLOWLIST (see ingest_articles.py).",
+    )
+    ap.add_argument(
+        "--embed-cache",
+        default=str(DEFAULT_EMBED_CACHE_DIR),
+        help="Directory of the persistent embedding cache.",
+    )
+    ap.add_argument(
+        "--no-embed-cache",
+        action="store_true",
+        help="Encode every chunk, ignoring the embedding cache.",
+    )
+    ap.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Ingest N articles in parallel worker processes (implies --bulk).",
+    )
 
     args = ap.parse_args()
 
@@ -102,96 +437,39 @@ def main():
     print(f"Meta dir:   {meta_dir}")
     print(f"Chunks dir: {chunks_dir}")
     print(f"Neo4j DB:   {NEO4J_URI} / {NEO4J_DATABASE}")
-    print(f"Embedder:   {args.embed_model}")
-
-    print("Loading embedder...")
-    embedder = SentenceTransformer(args.embed_model)
-
-    print("Loading spaCy model...")
-    try:
-        nlp = spacy.load("en_core_web_sm")
-    except OSError:
-        import subprocess, sys
+    print(f"Embedder:   {args.embed_model} ({args.embed_backend})")
 
-        subprocess.check_call(
-            [sys.executable, "-m", "spacy", "download", "en_core_web_sm"]
+    with GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS)) as driver:
+        ensure_schema(driver, NEO4J_DATABASE)
+        missing = missing_unique_keys(driver, NEO4J_DATABASE, PARALLEL_INGEST_KEYS) if args.jobs > 1 else []
+    if missing:
+        keys = ", ".join(f"{label}.{prop}" for label, prop in missing)
+        raise SystemExit(
+            f"--jobs {args.jobs} needs uniqueness constraints on {keys} (concurrent MERGEs would "
+            "create duplicate nodes). Remove duplicate names and re-run graph_schema.py, or use --jobs 1."
         )
-        nlp = spacy.load("en_core_web_sm")
 
     meta_files = sorted(meta_dir.glob("*.meta.json"))
     if not meta_files:
         raise SystemExit(f"No *.meta.json files found in {meta_dir}")
 
-    print(f"Found {len(meta_files)} meta files. Starting ingest...\n")
-
-    ingested = 0
-    skipped_no_chunks = 0
-    skipped_bad_chunks = 0
+    persons = None
+    if args.mentions == "dictionary":
+        print("Collecting known persons for the mention dictionary...")
+        metas = []
+        for meta_path in meta_files:
+            try:
+                metas.append(load_meta(meta_path))
+            except Exception:
+                pass  # reported again (and skipped) when the article is checked
+        persons = collect_known_persons(metas)
 
-    for meta_path in tqdm(meta_files, desc="Articles", unit="article"):
-        try:
-            meta = load_meta(meta_path)
-        except Exception as e:
-            print(f"[SKIP] Failed to load meta {meta_path.name}: {e}")
-            continue
-
-        article_id = meta.get("articleId")
-        if not article_id:
-            print(f"[SKIP] {meta_path.name}: no 'articleId' in meta.")
-            continue
-
-        chunks_path = find_chunks_file(chunks_dir, article_id)
-        if not chunks_path:
-            print(f"[SKIP] {article_id}: no chunks JSONL found in {chunks_dir}")
-            skipped_no_chunks += 1
-            continue
-
-        try:
-            chunks = read_jsonl(chunks_path)
-        except Exception as e:
-            print(f"[SKIP] Failed to read chunks {chunks_path.name}: {e}")
-            skipped_bad_chunks += 1
-            continue
-
-        ids = {c.get("articleId") for c in chunks}
-        ids.discard(None)
-        if len(ids) != 1:
-            print(
-                f"[SKIP] {chunks_path.name}: expected exactly 1 articleId in chunks, found {ids}"
-            )
-            skipped_bad_chunks += 1
-            continue
-
-        chunks_article_id = ids.pop()
-        if chunks_article_id != article_id:
-            print(
-                f"[SKIP] Meta/chunks mismatch: meta articleId={article_id}, chunks articleId={chunks_article_id}"
-            )
-            skipped_bad_chunks += 1
-            continue
-
-        print(f"\n=== Ingesting {article_id} from {chunks_path.name} ===")
-        try:
-            ingest(
-                NEO4J_URI,
-                NEO4J_USER,
-                NEO4J_PASS,
-                NEO4J_DATABASE,
-                chunks,
-                meta,
-                embedder,
-                nlp,
-            )
-            ingested += 1
-            print(f"=== Done {article_id} ===")
-        except Exception as e:
-            print(f"[ERROR] Ingest failed for {article_id}: {e}")
-            skipped_bad_chunks += 1
+    print(f"Found {len(meta_files)} meta files. Starting ingest...\n")
 
-    print("\nAll done.")
-    print(f"Ingested OK:           {ingested}")
-    print(f"Skipped (no chunks):   {skipped_no_chunks}")
-    print(f"Skipped (bad chunks):  {skipped_bad_chunks}")
+    if args.jobs > 1:
+        run_parallel(args, meta_files, chunks_dir, persons)
+    else:
+        run_serial(args, meta_files, chunks_dir, persons)
 
 
 if __name__ == "__main__":
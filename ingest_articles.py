@@ -30,8 +30,10 @@ Assumptions:
 import argparse
 import json
 import os
+import queue
+import threading
 from pathlib import Path
-from typing import List, Dict, Any, Tuple, Iterable
+from typing import List, Dict, Any, Tuple, Iterable, Iterator, Optional
 
 # Load .env BEFORE anything uses env vars
 try:
@@ -46,6 +48,11 @@ from tqdm import tqdm
 import spacy
 from sentence_transformers import SentenceTransformer
 
+from dictionary_mentions import DictionaryMentionMatcher, fetch_author_persons
+from embedding_cache import DEFAULT_EMBED_CACHE_DIR, EmbeddingCache
+from graph_schema import ensure_schema
+from onnx_embedder import OnnxEmbedder
+
 # -----------------------------
 # Secrets & connection from env
 # -----------------------------
@@ -60,23 +67,39 @@ if not NEO4J_PASS:
     )
 
 DEFAULT_EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+EMBED_BACKENDS = ["torch", "onnx-int8"]
 CONCEPT_ALLOWLIST = {"Terms", "Exaltations", "Triplicities", "Houses", "Decans"}
 
+# Rows per UNWIND transaction in --bulk mode
+DEFAULT_BATCH_SIZE = 500
+
+# --streaming: batches buffered between two pipeline stages
+STREAM_QUEUE_SIZE = 2
+
+# Mention extraction only reads doc.ents; these components don't feed the NER
+# in en_core_web_sm (its ner has its own tok2vec; the shared tok2vec only feeds
+# tagger and parser), so skipping them leaves the entities unchanged.
+SPACY_MODEL = "en_core_web_sm"
+NER_EXCLUDE = ["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer"]
+DEFAULT_NER_BATCH_SIZE = 64
+
 
 # ---------- I/O helpers ----------
 
-def read_jsonl(path: Path) -> List[Dict[str, Any]]:
-    rows = []
+def iter_jsonl(path: Path) -> Iterator[Dict[str, Any]]:
     with path.open("r", encoding="utf-8") as f:
         for line_no, line in enumerate(f, start=1):
             line = line.strip()
             if not line:
                 continue
             try:
-                rows.append(json.loads(line))
+                yield json.loads(line)
             except json.JSONDecodeError as e:
                 raise ValueError(f"Bad JSON on line {line_no} in {path}: {e}") from e
-    return rows
+
+
+def read_jsonl(path: Path) -> List[Dict[str, Any]]:
+    return list(iter_jsonl(path))
 
 
 def load_meta(path: Path) -> Dict[str, Any]:
@@ -88,8 +111,18 @@ def build_next_pairs(chunks: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
     return [(s[i]["chunkId"], s[i + 1]["chunkId"]) for i in range(len(s) - 1)]
 
 
-def extract_mentions(nlp, text: str) -> Dict[str, List[str]]:
-    doc = nlp(text)
+def load_nlp(model: str = SPACY_MODEL, ner_only: bool = True):
+    """Load the spaCy model (downloading it once if missing), NER-only by default."""
+    exclude = NER_EXCLUDE if ner_only else []
+    try:
+        return spacy.load(model, exclude=exclude)
+    except OSError:
+        import subprocess, sys
+        subprocess.check_call([sys.executable, "-m", "spacy", "download", model])
+        return spacy.load(model, exclude=exclude)
+
+
+def mentions_from_doc(doc, text: str) -> Dict[str, List[str]]:
     persons = sorted({
         ent.text.strip()
         for ent in doc.ents
@@ -99,6 +132,59 @@ def extract_mentions(nlp, text: str) -> Dict[str, List[str]]:
     return {"persons": persons, "concepts": concepts}
 
 
+def extract_mentions(nlp, text: str) -> Dict[str, List[str]]:
+    if isinstance(nlp, DictionaryMentionMatcher):
+        return nlp.extract(text)
+    return mentions_from_doc(nlp(text), text)
+
+
+def extract_mentions_batch(nlp, texts: List[str],
+                           batch_size: int = DEFAULT_NER_BATCH_SIZE,
+                           n_process: int = 1,
+                           desc: str = "Extracting mentions",
+                           progress: bool = True) -> List[Dict[str, List[str]]]:
+    """extract_mentions() for many texts through nlp.pipe (same results, in order)."""
+    if isinstance(nlp, DictionaryMentionMatcher):
+        return nlp.extract_batch(texts)
+    docs = nlp.pipe(texts, batch_size=batch_size, n_process=n_process)
+    return [
+        mentions_from_doc(doc, text)
+        for doc, text in tqdm(zip(docs, texts), total=len(texts), desc=desc, disable=not progress)
+    ]
+
+
+def collect_known_persons(metas: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Authors (and aliases) from the given meta files, then authors already in the graph."""
+    persons = [a for meta in metas for a in iter_authors(meta)]
+    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS))
+    with driver.session(database=NEO4J_DATABASE) as session:
+        persons.extend(fetch_author_persons(session))
+    driver.close()
+    return persons
+
+
+def build_dictionary_matcher(metas: Iterable[Dict[str, Any]] = (),
+                             persons: Optional[List[Dict[str, Any]]] = None) -> DictionaryMentionMatcher:
+    """
+    --mentions dictionary: known persons = collect_known_persons(metas) unless
+    given; concepts = CONCEPT_ALLOWLIST.
+    """
+    if persons is None:
+        persons = collect_known_persons(metas)
+    matcher = DictionaryMentionMatcher(persons, CONCEPT_ALLOWLIST)
+    print(f"Mention dictionary: {len(matcher.persons)} persons, {len(matcher.concepts)} concepts")
+    return matcher
+
+
+def mention_person_row(nlp, name: str) -> Dict[str, Any]:
+    """Row for MERGEing a mentioned Person; dictionary mode keeps the known attributes."""
+    if isinstance(nlp, DictionaryMentionMatcher):
+        row = nlp.person_row(name)
+        if row is not None:
+            return row
+    return {"name": name}
+
+
 # ---------- Cypher ----------
 
 CYPHER_MERGE_ARTICLE = """
@@ -148,124 +234,533 @@ MERGE (c)-[:MENTIONS]->(k)
 """
 
 
+# Bulk (UNWIND) variants: one statement per entity type, fed with lists of rows.
+
+CYPHER_BULK_MERGE_PERSON = """
+UNWIND $rows AS row
+MERGE (p:Person {name: row.name})
+ON CREATE SET p.aliases = COALESCE(row.aliases, []),
+              p.orcid = row.orcid, p.wikidataId = row.wikidataId,
+              p.birth = row.birth, p.death = row.death
+"""
+
+CYPHER_BULK_REL_AUTHORED = """
+UNWIND $rows AS row
+MATCH (p:Person {name: row.name}), (a:Article {articleId: $articleId})
+MERGE (p)-[r:AUTHORED]->(a)
+ON CREATE SET r.`order` = row.order, r.role = row.role, r.corresponding = row.corresponding
+"""
+
+CYPHER_BULK_MERGE_CHUNK = """
+UNWIND $rows AS row
+MERGE (c:Chunk {chunkId: row.chunkId})
+SET c.seq = row.seq, c.text = row.text, c.textEmbedding = row.embedding
+WITH c
+MATCH (a:Article {articleId: $articleId})
+MERGE (a)-[:HAS_CHUNK]->(c)
+MERGE (c)-[:PART_OF]->(a)
+"""
+
+CYPHER_BULK_MERGE_CONCEPT = """
+UNWIND $rows AS row
+MERGE (k:Concept {name: row.name})
+"""
+
+CYPHER_BULK_REL_MENTIONS_PERSON = """
+UNWIND $rows AS row
+MATCH (c:Chunk {chunkId: row.chunkId}), (p:Person {name: row.name})
+MERGE (c)-[:MENTIONS]->(p)
+"""
+
+CYPHER_BULK_REL_MENTIONS_CONCEPT = """
+UNWIND $rows AS row
+MATCH (c:Chunk {chunkId: row.chunkId}), (k:Concept {name: row.name})
+MERGE (c)-[:MENTIONS]->(k)
+"""
+
+CYPHER_BULK_REL_NEXT = """
+UNWIND $rows AS row
+MATCH (c1:Chunk {chunkId: row.c1}), (c2:Chunk {chunkId: row.c2})
+MERGE (c1)-[:NEXT]->(c2)
+"""
+
+
 # ---------- Core ingest ----------
 
+def iter_authors(meta: Dict[str, Any]) -> Iterable[Dict[str, Any]]:
+    """
+    Yield normalized author dicts from meta["authors"].
+    Accepts a list of dicts OR a list of plain name strings.
+    """
+    article_id = meta.get("articleId")
+    raw_authors = meta.get("authors") or []
+    for idx, a_raw in enumerate(raw_authors, start=1):
+        if isinstance(a_raw, str):
+            # Simple format: "Alexander Jones"
+            a = {
+                "name": a_raw,
+                "order": idx,
+                "role": "author",
+                "corresponding": False,
+            }
+        elif isinstance(a_raw, dict):
+            a = a_raw
+        else:
+            print(f"[WARN] Unsupported author entry in meta for {article_id}: {a_raw!r}")
+            continue
+
+        name = (a.get("name") or "").strip()
+        if not name:
+            print(f"[WARN] Author entry without name in meta for {article_id}: {a!r}")
+            continue
+
+        yield {
+            "name": name,
+            "aliases": a.get("aliases"),
+            "orcid": a.get("orcid"),
+            "wikidataId": a.get("wikidataId"),
+            "birth": a.get("birth"),
+            "death": a.get("death"),
+            "order": a.get("order", idx),
+            "role": a.get("role", "author"),
+            "corresponding": bool(a.get("corresponding", False)),
+        }
+
+
+def load_embedder(model_name: str, backend: str = "torch", threads: Optional[int] = None):
+    """SentenceTransformer (fp32 PyTorch) or the int8 ONNX CPU embedder; same encode() call."""
+    if backend == "onnx-int8":
+        return OnnxEmbedder(model_name, threads=threads)
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+    return SentenceTransformer(model_name)
+
+
+def embed_cache_key(model_name: str, backend: str = "torch") -> str:
+    # int8 vectors are close to, not equal to, the fp32 ones: keep them apart
+    return model_name if backend == "torch" else f"{model_name}|{backend}"
+
+
+def encode_chunks(embedder, chunks: List[Dict[str, Any]], embed_cache=None, progress: bool = True):
+    texts = [c["text"] for c in chunks]
+    if embed_cache is None:
+        return embedder.encode(
+            texts,
+            show_progress_bar=progress,
+            normalize_embeddings=True,
+        )
+    hits, misses = embed_cache.hits, embed_cache.misses
+    embeddings = embed_cache.encode(
+        embedder,
+        texts,
+        show_progress_bar=progress,
+        normalize_embeddings=True,
+    )
+    if progress:
+        print(f"Embedding cache: {embed_cache.hits - hits} hits, "
+              f"{embed_cache.misses - misses} encoded")
+    return embeddings
+
+
 def ingest(uri, user, password, database,
            chunks: List[Dict[str, Any]],
            meta: Dict[str, Any],
            embedder,
-           nlp) -> None:
-    driver = GraphDatabase.driver(uri, auth=(user, password))
+           nlp,
+           bulk: bool = False,
+           batch_size: int = DEFAULT_BATCH_SIZE,
+           ner_batch_size: int = DEFAULT_NER_BATCH_SIZE,
+           ner_processes: int = 1,
+           embed_cache=None,
+           driver=None,
+           progress: bool = True) -> None:
+    """
+    Write one article (Article, authors, Chunks, mentions, NEXT chain).
+
+    bulk=False issues one auto-commit statement per node/edge (original behaviour).
+    bulk=True gathers each entity type into row lists and writes them with
+    UNWIND statements, `batch_size` rows per transaction. Both create the same graph.
+    In bulk mode mentions are extracted as one nlp.pipe stage
+    (ner_batch_size docs per batch, ner_processes worker processes).
+    With an EmbeddingCache only chunks whose text is not cached are encoded.
+
+    Pass an open `driver` to reuse its connection pool across articles (it is
+    left open); otherwise one is created from uri/user/password and closed.
+    progress=False silences the per-article bars (used by parallel workers).
+    """
+    own_driver = driver is None
+    if own_driver:
+        driver = GraphDatabase.driver(uri, auth=(user, password))
+
+    try:
+        with driver.session(database=database) as session:
+            if bulk:
+                _ingest_bulk(session, chunks, meta, embedder, nlp, batch_size,
+                             ner_batch_size, ner_processes, embed_cache, progress)
+            else:
+                _ingest_per_row(session, chunks, meta, embedder, nlp, embed_cache)
+    finally:
+        if own_driver:
+            driver.close()
+
+
+def _ingest_per_row(session, chunks, meta, embedder, nlp, embed_cache=None) -> None:
     article_id = meta["articleId"]
 
-    with driver.session(database=database) as session:
-        # Article
+    # Article
+    session.run(
+        CYPHER_MERGE_ARTICLE,
+        articleId=article_id,
+        title=meta.get("title"),
+        year=meta.get("year"),
+        journal=meta.get("journal"),
+        url=meta.get("url"),
+    )
+
+    # Authors
+    for a in iter_authors(meta):
         session.run(
-            CYPHER_MERGE_ARTICLE,
+            CYPHER_MERGE_PERSON,
+            name=a["name"],
+            aliases=a["aliases"],
+            orcid=a["orcid"],
+            wikidataId=a["wikidataId"],
+            birth=a["birth"],
+            death=a["death"],
+        )
+        session.run(
+            CYPHER_REL_AUTHORED,
+            name=a["name"],
             articleId=article_id,
-            title=meta.get("title"),
-            year=meta.get("year"),
-            journal=meta.get("journal"),
-            url=meta.get("url"),
+            order=a["order"],
+            role=a["role"],
+            corresponding=a["corresponding"],
         )
 
-        # Authors (accept list of dicts OR list of strings)
-        raw_authors = meta.get("authors") or []
-        for idx, a_raw in enumerate(raw_authors, start=1):
-            if isinstance(a_raw, str):
-                # Simple format: "Alexander Jones"
-                a = {
-                    "name": a_raw,
-                    "order": idx,
-                    "role": "author",
-                    "corresponding": False,
-                }
-            elif isinstance(a_raw, dict):
-                a = a_raw
-            else:
-                print(f"[WARN] Unsupported author entry in meta for {article_id}: {a_raw!r}")
-                continue
+    # Chunks + embeddings + mentions
+    embeddings = encode_chunks(embedder, chunks, embed_cache)
 
-            name = (a.get("name") or "").strip()
-            if not name:
-                print(f"[WARN] Author entry without name in meta for {article_id}: {a!r}")
-                continue
+    for c, emb in tqdm(
+        zip(chunks, embeddings),
+        total=len(chunks),
+        desc=f"Inserting chunks for {article_id}",
+    ):
+        session.run(
+            CYPHER_MERGE_CHUNK,
+            chunkId=c["chunkId"],
+            seq=c["seq"],
+            text=c["text"],
+            embedding=[float(x) for x in emb],
+        )
+        session.run(
+            CYPHER_REL_HAS_CHUNK,
+            articleId=article_id,
+            chunkId=c["chunkId"],
+        )
 
+        m = extract_mentions(nlp, c["text"])
+        for person_name in m["persons"]:
+            p = mention_person_row(nlp, person_name)
             session.run(
                 CYPHER_MERGE_PERSON,
-                name=name,
-                aliases=a.get("aliases"),
-                orcid=a.get("orcid"),
-                wikidataId=a.get("wikidataId"),
-                birth=a.get("birth"),
-                death=a.get("death"),
-            )
-            session.run(
-                CYPHER_REL_AUTHORED,
-                name=name,
-                articleId=article_id,
-                order=a.get("order", idx),
-                role=a.get("role", "author"),
-                corresponding=bool(a.get("corresponding", False)),
+                name=person_name,
+                aliases=p.get("aliases"),
+                orcid=p.get("orcid"),
+                wikidataId=p.get("wikidataId"),
+                birth=p.get("birth"),
+                death=p.get("death"),
             )
-
-
-        # Chunks + embeddings + mentions
-        texts = [c["text"] for c in chunks]
-        embeddings = embedder.encode(
-            texts,
-            show_progress_bar=True,
-            normalize_embeddings=True,
-        )
-
-        for c, emb in tqdm(
-            zip(chunks, embeddings),
-            total=len(chunks),
-            desc=f"Inserting chunks for {article_id}",
-        ):
             session.run(
-                CYPHER_MERGE_CHUNK,
+                CYPHER_REL_MENTIONS_PERSON,
                 chunkId=c["chunkId"],
-                seq=c["seq"],
-                text=c["text"],
-                embedding=[float(x) for x in emb],
+                name=person_name,
             )
+
+        for concept_name in m["concepts"]:
+            session.run(CYPHER_MERGE_CONCEPT, name=concept_name)
             session.run(
-                CYPHER_REL_HAS_CHUNK,
-                articleId=article_id,
+                CYPHER_REL_MENTIONS_CONCEPT,
                 chunkId=c["chunkId"],
+                name=concept_name,
             )
 
-            m = extract_mentions(nlp, c["text"])
-            for person_name in m["persons"]:
-                session.run(
-                    CYPHER_MERGE_PERSON,
-                    name=person_name,
-                    aliases=None,
-                    orcid=None,
-                    wikidataId=None,
-                    birth=None,
-                    death=None,
-                )
-                session.run(
-                    CYPHER_REL_MENTIONS_PERSON,
-                    chunkId=c["chunkId"],
-                    name=person_name,
-                )
-
-            for concept_name in m["concepts"]:
-                session.run(CYPHER_MERGE_CONCEPT, name=concept_name)
-                session.run(
-                    CYPHER_REL_MENTIONS_CONCEPT,
-                    chunkId=c["chunkId"],
-                    name=concept_name,
-                )
-
-        # NEXT chain
-        for c1, c2 in build_next_pairs(chunks):
-            session.run(CYPHER_REL_NEXT, c1=c1, c2=c2)
+    # NEXT chain
+    for c1, c2 in build_next_pairs(chunks):
+        session.run(CYPHER_REL_NEXT, c1=c1, c2=c2)
 
-    driver.close()
+
+def _merge_article(tx, meta: Dict[str, Any]) -> None:
+    tx.run(
+        CYPHER_MERGE_ARTICLE,
+        articleId=meta["articleId"],
+        title=meta.get("title"),
+        year=meta.get("year"),
+        journal=meta.get("journal"),
+        url=meta.get("url"),
+    ).consume()
+
+
+def _write_rows(tx, cypher: str, rows: List[Dict[str, Any]], params: Dict[str, Any]) -> None:
+    tx.run(cypher, rows=rows, **params).consume()
+
+
+def write_batched(session, cypher: str, rows: List[Dict[str, Any]],
+                  batch_size: int, **params) -> None:
+    """Run an UNWIND $rows statement in managed write transactions of `batch_size` rows."""
+    for i in range(0, len(rows), batch_size):
+        session.execute_write(_write_rows, cypher, rows[i:i + batch_size], params)
+
+
+def _ingest_bulk(session, chunks, meta, embedder, nlp, batch_size: int,
+                 ner_batch_size: int = DEFAULT_NER_BATCH_SIZE, ner_processes: int = 1,
+                 embed_cache=None, progress: bool = True) -> None:
+    article_id = meta["articleId"]
+
+    session.execute_write(_merge_article, meta)
+
+    authors = list(iter_authors(meta))
+    write_batched(session, CYPHER_BULK_MERGE_PERSON, authors, batch_size)
+    write_batched(session, CYPHER_BULK_REL_AUTHORED, authors, batch_size,
+                  articleId=article_id)
+
+    embeddings = encode_chunks(embedder, chunks, embed_cache, progress)
+    chunk_rows = [
+        {
+            "chunkId": c["chunkId"],
+            "seq": c["seq"],
+            "text": c["text"],
+            "embedding": [float(x) for x in emb],
+        }
+        for c, emb in zip(chunks, embeddings)
+    ]
+
+    person_names = set()
+    concept_names = set()
+    person_mentions = []
+    concept_mentions = []
+    mentions = extract_mentions_batch(
+        nlp, [c["text"] for c in chunks],
+        batch_size=ner_batch_size, n_process=ner_processes,
+        desc=f"Extracting mentions for {article_id}",
+        progress=progress,
+    )
+    for c, m in zip(chunks, mentions):
+        for name in m["persons"]:
+            person_names.add(name)
+            person_mentions.append({"chunkId": c["chunkId"], "name": name})
+        for name in m["concepts"]:
+            concept_names.add(name)
+            concept_mentions.append({"chunkId": c["chunkId"], "name": name})
+
+    if progress:
+        print(
+            f"Writing {article_id}: {len(chunk_rows)} chunks, "
+            f"{len(person_mentions)} person / {len(concept_mentions)} concept mentions "
+            f"(batch size {batch_size})"
+        )
+    write_batched(session, CYPHER_BULK_MERGE_CHUNK, chunk_rows, batch_size,
+                  articleId=article_id)
+    write_batched(session, CYPHER_BULK_MERGE_PERSON,
+                  [mention_person_row(nlp, n) for n in sorted(person_names)], batch_size)
+    write_batched(session, CYPHER_BULK_MERGE_CONCEPT,
+                  [{"name": n} for n in sorted(concept_names)], batch_size)
+    write_batched(session, CYPHER_BULK_REL_MENTIONS_PERSON, person_mentions, batch_size)
+    write_batched(session, CYPHER_BULK_REL_MENTIONS_CONCEPT, concept_mentions, batch_size)
+
+    next_rows = [{"c1": c1, "c2": c2} for c1, c2 in build_next_pairs(chunks)]
+    write_batched(session, CYPHER_BULK_REL_NEXT, next_rows, batch_size)
+
+
+# ---------- Streaming ingest ----------
+
+_END = object()
+
+
+class _Pipeline:
+    """
+    Threads joined by bounded queues. The first error stops every stage and is
+    re-raised by raise_error(); a full queue blocks its producer (backpressure).
+    """
+
+    def __init__(self):
+        self.stop = threading.Event()
+        self.errors: List[BaseException] = []
+        self.threads: List[threading.Thread] = []
+
+    def put(self, q: "queue.Queue", item) -> bool:
+        while not self.stop.is_set():
+            try:
+                q.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(self, q: "queue.Queue"):
+        while not self.stop.is_set():
+            try:
+                return q.get(timeout=0.2)
+            except queue.Empty:
+                continue
+        return _END
+
+    def fail(self, e: BaseException) -> None:
+        self.errors.append(e)
+        self.stop.set()
+
+    def start(self, name: str, target, *args) -> None:
+        def run():
+            try:
+                target(*args)
+            except BaseException as e:
+                self.fail(e)
+        t = threading.Thread(target=run, name=name, daemon=True)
+        t.start()
+        self.threads.append(t)
+
+    def stage(self, name: str, fn, q_in: "queue.Queue", q_out: "queue.Queue") -> None:
+        def loop():
+            while True:
+                item = self.get(q_in)
+                if item is _END:
+                    break
+                if not self.put(q_out, fn(item)):
+                    return
+            self.put(q_out, _END)
+        self.start(name, loop)
+
+    def join(self) -> None:
+        for t in self.threads:
+            t.join()
+
+    def raise_error(self) -> None:
+        if self.errors:
+            raise self.errors[0]
+
+
+def _batched_chunks(chunks: Iterable[Dict[str, Any]], article_id: str,
+                    batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    batch = []
+    for c in chunks:
+        if c.get("articleId") not in (None, article_id):
+            raise ValueError(f"Chunk {c.get('chunkId')} belongs to {c.get('articleId')}, not {article_id}")
+        batch.append(c)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def ingest_stream(uri, user, password, database,
+                  chunks: Iterable[Dict[str, Any]],
+                  meta: Dict[str, Any],
+                  embedder,
+                  nlp,
+                  batch_size: int = DEFAULT_BATCH_SIZE,
+                  ner_batch_size: int = DEFAULT_NER_BATCH_SIZE,
+                  ner_processes: int = 1,
+                  embed_cache=None,
+                  driver=None,
+                  queue_size: int = STREAM_QUEUE_SIZE) -> int:
+    """
+    Streaming variant of ingest(..., bulk=True); same graph, returns the chunk count.
+
+    read -> embed -> mentions -> write run concurrently on batches of
+    `batch_size` chunks, joined by queues of `queue_size` batches, so encoding
+    batch k+1 overlaps the Neo4j write of batch k and memory is bounded by the
+    batch size, not the article. `chunks` may be a lazy iterator (iter_jsonl).
+    The NEXT chain is written at the end from the (seq, chunkId) pairs only.
+    """
+    article_id = meta["articleId"]
+    own_driver = driver is None
+    if own_driver:
+        driver = GraphDatabase.driver(uri, auth=(user, password))
+
+    pipe = _Pipeline()
+    q_read = queue.Queue(maxsize=queue_size)
+    q_embed = queue.Queue(maxsize=queue_size)
+    q_write = queue.Queue(maxsize=queue_size)
+
+    def read():
+        for batch in _batched_chunks(chunks, article_id, batch_size):
+            if not pipe.put(q_read, batch):
+                return
+        pipe.put(q_read, _END)
+
+    def embed(batch):
+        return batch, encode_chunks(embedder, batch, embed_cache, progress=False)
+
+    def mentions(item):
+        batch, embeddings = item
+        found = extract_mentions_batch(nlp, [c["text"] for c in batch],
+                                       batch_size=ner_batch_size, n_process=ner_processes,
+                                       progress=False)
+        return batch, embeddings, found
+
+    seq_ids: List[Dict[str, Any]] = []
+    try:
+        with driver.session(database=database) as session:
+            session.execute_write(_merge_article, meta)
+            authors = list(iter_authors(meta))
+            write_batched(session, CYPHER_BULK_MERGE_PERSON, authors, batch_size)
+            write_batched(session, CYPHER_BULK_REL_AUTHORED, authors, batch_size,
+                          articleId=article_id)
+
+            pipe.start("read", read)
+            pipe.stage("embed", embed, q_read, q_embed)
+            pipe.stage("mentions", mentions, q_embed, q_write)
+
+            with tqdm(desc=f"Streaming {article_id}", unit="chunk") as bar:
+                while True:
+                    item = pipe.get(q_write)
+                    if item is _END:
+                        break
+                    batch, embeddings, found = item
+                    _write_stream_batch(session, nlp, article_id, batch, embeddings, found, batch_size)
+                    seq_ids.extend({"seq": c["seq"], "chunkId": c["chunkId"]} for c in batch)
+                    bar.update(len(batch))
+
+            pipe.raise_error()
+            next_rows = [{"c1": c1, "c2": c2} for c1, c2 in build_next_pairs(seq_ids)]
+            write_batched(session, CYPHER_BULK_REL_NEXT, next_rows, batch_size)
+    except BaseException as e:
+        pipe.fail(e)
+        raise
+    finally:
+        pipe.stop.set()
+        pipe.join()
+        if own_driver:
+            driver.close()
+    return len(seq_ids)
+
+
+def _write_stream_batch(session, nlp, article_id, batch, embeddings, found, batch_size) -> None:
+    chunk_rows = [
+        {
+            "chunkId": c["chunkId"],
+            "seq": c["seq"],
+            "text": c["text"],
+            "embedding": [float(x) for x in emb],
+        }
+        for c, emb in zip(batch, embeddings)
+    ]
+    person_mentions = [{"chunkId": c["chunkId"], "name": n}
+                       for c, m in zip(batch, found) for n in m["persons"]]
+    concept_mentions = [{"chunkId": c["chunkId"], "name": n}
+                        for c, m in zip(batch, found) for n in m["concepts"]]
+    person_names = sorted({r["name"] for r in person_mentions})
+    concept_names = sorted({r["name"] for r in concept_mentions})
+
+    write_batched(session, CYPHER_BULK_MERGE_CHUNK, chunk_rows, batch_size,
+                  articleId=article_id)
+    write_batched(session, CYPHER_BULK_MERGE_PERSON,
+                  [mention_person_row(nlp, n) for n in person_names], batch_size)
+    write_batched(session, CYPHER_BULK_MERGE_CONCEPT,
+                  [{"name": n} for n in concept_names], batch_size)
+    write_batched(session, CYPHER_BULK_REL_MENTIONS_PERSON, person_mentions, batch_size)
+    write_batched(session, CYPHER_BULK_REL_MENTIONS_CONCEPT, concept_mentions, batch_size)
 
 
 # ---------- Iteration helpers ----------
@@ -276,8 +771,7 @@ def iter_articles_from_dir(jsonl_dir: Path, pattern: str) -> Iterable[tuple[Path
     Assumes each file contains exactly one articleId.
     """
     for jsonl_path in sorted(jsonl_dir.glob(pattern)):
-        chunks = read_jsonl(jsonl_path)
-        ids = {c.get("articleId") for c in chunks}
+        ids = {c.get("articleId") for c in iter_jsonl(jsonl_path)}
         ids.discard(None)
         if len(ids) != 1:
             print(f"[SKIP] {jsonl_path}: expected exactly 1 articleId, found {ids}")
@@ -306,21 +800,49 @@ def main():
 
     ap.add_argument("--embed-model", default=DEFAULT_EMBED_MODEL,
                     help="SentenceTransformer model name.")
+    ap.add_argument("--embed-backend", choices=EMBED_BACKENDS, default="torch",
+                    help="torch: fp32 SentenceTransformer; onnx-int8: quantized ONNX on CPU.")
+    ap.add_argument("--embed-threads", type=int, default=None,
+                    help="Intra-op CPU threads for the embedder (default: library default).")
+    ap.add_argument("--bulk", action="store_true",
+                    help="Write each entity type with batched UNWIND transactions "
+                         "instead of one statement per node/edge.")
+    ap.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                    help="Rows per UNWIND transaction in --bulk mode.")
+    ap.add_argument("--ner-batch-size", type=int, default=DEFAULT_NER_BATCH_SIZE,
+                    help="Texts per nlp.pipe batch for mention extraction (--bulk).")
+    ap.add_argument("--ner-processes", type=int, default=1,
+                    help="spaCy worker processes for mention extraction (--bulk, --streaming).")
+    ap.add_argument("--mentions", choices=["ner", "dictionary"], default="ner",
+                    help="ner: spaCy PERSON entities; dictionary: only known authors/aliases "
+                         "and CONCEPT_ALLOWLIST (no NER model, no throwaway Person nodes).")
+    ap.add_argument("--streaming", action="store_true",
+                    help="Pipelined read -> embed -> mentions -> write on batches of "
+                         "--batch-size chunks (bulk writes, bounded memory).")
+    ap.add_argument("--embed-cache", default=str(DEFAULT_EMBED_CACHE_DIR),
+                    help="Directory of the persistent embedding cache.")
+    ap.add_argument("--no-embed-cache", action="store_true",
+                    help="Encode every chunk, ignoring the embedding cache.")
 
     args = ap.parse_args()
 
-    print(f"Loading embedder: {args.embed_model}")
-    embedder = SentenceTransformer(args.embed_model)
+    with GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS)) as driver:
+        ensure_schema(driver, NEO4J_DATABASE)
 
-    try:
-        nlp = spacy.load("en_core_web_sm")
-    except OSError:
-        import subprocess, sys
-        subprocess.check_call([sys.executable, "-m", "spacy", "download", "en_core_web_sm"])
-        nlp = spacy.load("en_core_web_sm")
+    print(f"Loading embedder: {args.embed_model} ({args.embed_backend})")
+    embedder = load_embedder(args.embed_model, args.embed_backend, args.embed_threads)
+    embed_cache = None if args.no_embed_cache else EmbeddingCache(
+        args.embed_cache, embed_cache_key(args.embed_model, args.embed_backend))
 
     meta_dir = Path(args.meta_dir).expanduser().resolve()
 
+    if args.mentions == "ner":
+        nlp = load_nlp()
+    elif args.jsonl and args.meta:
+        nlp = build_dictionary_matcher([load_meta(Path(args.meta).expanduser().resolve())])
+    else:
+        nlp = build_dictionary_matcher(load_meta(p) for p in sorted(meta_dir.glob("*.meta.json")))
+
     # --- Single-article mode ---
     if args.jsonl and args.meta:
         jsonl_path = Path(args.jsonl).expanduser().resolve()
@@ -331,9 +853,21 @@ def main():
         if not meta_path.exists():
             raise SystemExit(f"Missing meta file:   {meta_path}")
 
-        chunks = read_jsonl(jsonl_path)
         meta = load_meta(meta_path)
 
+        if args.streaming:
+            # chunk articleIds are checked against the meta while streaming
+            print(f"Streaming {meta.get('articleId')} from {jsonl_path.name}")
+            ingest_stream(NEO4J_URI, NEO4J_USER, NEO4J_PASS, NEO4J_DATABASE,
+                          iter_jsonl(jsonl_path), meta, embedder, nlp,
+                          batch_size=args.batch_size, ner_batch_size=args.ner_batch_size,
+                          ner_processes=args.ner_processes, embed_cache=embed_cache)
+            if embed_cache is not None:
+                print(embed_cache.report())
+            print("Done (single article).")
+            return
+
+        chunks = read_jsonl(jsonl_path)
         ids = {c.get("articleId") for c in chunks}
         ids.discard(None)
         if len(ids) != 1:
@@ -354,7 +888,14 @@ def main():
             meta,
             embedder,
             nlp,
+            bulk=args.bulk,
+            batch_size=args.batch_size,
+            ner_batch_size=args.ner_batch_size,
+            ner_processes=args.ner_processes,
+            embed_cache=embed_cache,
         )
+        if embed_cache is not None:
+            print(embed_cache.report())
         print("Done (single article).")
         return
 
@@ -370,7 +911,6 @@ def main():
             print(f"[SKIP] {jsonl_path.name}: meta file not found: {meta_path.name}")
             continue
 
-        chunks = read_jsonl(jsonl_path)
         meta = load_meta(meta_path)
         if meta.get("articleId") != article_id:
             print(
@@ -380,6 +920,15 @@ def main():
             continue
 
         print(f"=== Ingesting {article_id} from {jsonl_path.name} ===")
+        if args.streaming:
+            ingest_stream(NEO4J_URI, NEO4J_USER, NEO4J_PASS, NEO4J_DATABASE,
+                          iter_jsonl(jsonl_path), meta, embedder, nlp,
+                          batch_size=args.batch_size, ner_batch_size=args.ner_batch_size,
+                          ner_processes=args.ner_processes, embed_cache=embed_cache)
+            print(f"=== Done {article_id} ===")
+            continue
+
+        chunks = read_jsonl(jsonl_path)
         ingest(
             NEO4J_URI,
             NEO4J_USER,
@@ -389,9 +938,16 @@ def main():
             meta,
             embedder,
             nlp,
+            bulk=args.bulk,
+            batch_size=args.batch_size,
+            ner_batch_size=args.ner_batch_size,
+            ner_processes=args.ner_processes,
+            embed_cache=embed_cache,
         )
         print(f"=== Done {article_id} ===")
 
+    if embed_cache is not None:
+        print(embed_cache.report())
     print("All done.")
 
 
@@ -1,12 +1,15 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import os, json, gzip, re
+import argparse, hashlib, os, json, gzip, re
+from collections import Counter
 from pathlib import Path
 from typing import Dict, Any, List, Optional, Tuple
 from neo4j import GraphDatabase
 import ijson
 
+from graph_schema import ensure_schema
+
 # ------------ Config via env ------------
 NEO4J_URI  = os.getenv("NEO4J_URI",  "bolt://localhost:7687")
 NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
@@ -19,6 +22,13 @@ PLEIADES_JSON = os.getenv(
     r"C:\Users\feder\Desktop\GraphRag\data\pleiades\pleiades-places-latest.json.gz"
 )
 
+# JSON decoding: auto | yajl2_c | python | orjson (see iter_pleiades_places)
+PLEIADES_JSON_BACKEND = os.getenv("PLEIADES_JSON_BACKEND", "auto")
+
+# Batched mode
+PLEIADES_BATCH = int(os.getenv("PLEIADES_BATCH", "2000"))
+PLEIADES_CHECKPOINT = os.getenv("PLEIADES_CHECKPOINT", "pleiades_ingest.checkpoint.json")
+
 # ------------ Cypher ------------
 CYPHER_UPSERT_PLACE = """
 MERGE (p:Place {pleiadesId:$pleiadesId})
@@ -30,6 +40,7 @@ SET p.uri         = $uri,
     p.altNames    = $altNames,
     p.languages   = $languages,
     p.review_state= $review_state,
+    p.contentHash = $contentHash,
     p.source      = 'Pleiades'
 """
 
@@ -48,99 +59,191 @@ ON CREATE SET r.connectionType = $connectionType,
               r.source = 'Pleiades'
 """
 
+CYPHER_UPSERT_PLACES_BULK = """
+UNWIND $rows AS row
+MERGE (p:Place {pleiadesId: row.pleiadesId})
+SET p.uri         = row.uri,
+    p.title       = row.title,
+    p.description = row.description,
+    p.placeTypes  = row.placeTypes,
+    p.subject     = row.subject,
+    p.altNames    = row.altNames,
+    p.languages   = row.languages,
+    p.review_state= row.review_state,
+    p.contentHash = row.contentHash,
+    p.source      = 'Pleiades'
+"""
+
+CYPHER_CONNECT_BULK = """
+UNWIND $rows AS row
+MERGE (b:Place {pleiadesId: row.to})
+ON CREATE SET b.uri = row.toUri, b.source = 'Pleiades'
+WITH row, b
+MATCH (a:Place {pleiadesId: row.from})
+MERGE (a)-[r:CONNECTED]->(b)
+ON CREATE SET r.connectionType = row.connectionType,
+              r.title = row.title,
+              r.associationCertainty = row.associationCertainty,
+              r.uri = row.uri,
+              r.source = 'Pleiades'
+"""
+
 # ------------ Helpers (streaming; handles @graph) ------------
-def iter_pleiades_places(path: Path):
-    """Yield place dicts from .json/.json.gz/NDJSON without loading the whole file."""
+def _open_text(path: Path):
+    return gzip.open(path, "rt", encoding="utf-8") if path.suffix.lower() == ".gz" else path.open("rt", encoding="utf-8")
 
-    def _open_text():
-        return gzip.open(path, "rt", encoding="utf-8") if path.suffix.lower() == ".gz" else path.open("rt", encoding="utf-8")
+def _ijson_module(backend: str):
+    """ijson backend module: 'auto' = ijson's default (yajl2_c when compiled), or a named backend."""
+    if backend in ("auto", "orjson"):
+        return ijson
+    return ijson.get_backend(backend)
 
-    # Peek a little to guess the container type
-    f = _open_text()
-    head = f.read(200).lstrip()
-    f.close()
+# Top-level keys that hold the list of places, in the order the old probing tried them
+_CONTAINER_KEYS = ("@graph", "places", "features")
 
-    # Case 1: top-level JSON array
-    if head.startswith("["):
-        f = _open_text()
-        try:
-            for place in ijson.items(f, "item"):
-                if isinstance(place, dict):
-                    yield place
-        finally:
-            f.close()
-        return
+# Longest first line parsed by the NDJSON probe; a longer one (e.g. a minified
+# single-line dump) is left to the streaming key scan
+_NDJSON_PROBE_LIMIT = 16 * 1024 * 1024
 
-    # Case 2: top-level JSON object (several variants)
-    if head.startswith("{"):
-        # 2a) JSON-LD with @graph: [...places...]
-        f = _open_text()
-        yielded = False
-        try:
-            for place in ijson.items(f, "@graph.item"):
-                yielded = True
-                if isinstance(place, dict):
-                    yield place
-        finally:
-            f.close()
-        if yielded:
-            return
+def _is_place_record(obj: dict) -> bool:
+    """A Pleiades place (not a container of places): has a title and an id or uri."""
+    return isinstance(obj.get("title"), str) and ("id" in obj or "uri" in obj)
 
-        # 2b) {"places":[...]}
-        f = _open_text()
-        yielded = False
+def _is_ndjson(path: Path) -> bool:
+    """
+    True when the first non-empty line is one complete JSON object and more
+    non-whitespace content follows it, or when that object is the only one in
+    the file and is itself a place record (a one-record NDJSON file).
+    Checked before the key scan, because Pleiades place records themselves
+    carry "type": "FeatureCollection" and a top-level "features" array.
+    """
+    loads = _loads_line()
+    with _open_text(path) as f:
+        line = ""
+        while not line.strip():
+            line = f.readline(_NDJSON_PROBE_LIMIT)
+            if not line:
+                return False
+            if not line.endswith("\n") and len(line) >= _NDJSON_PROBE_LIMIT:
+                return False
         try:
-            for place in ijson.items(f, "places.item"):
-                yielded = True
-                if isinstance(place, dict):
-                    yield place
-        finally:
-            f.close()
-        if yielded:
-            return
+            first = loads(line.strip())
+        except ValueError:
+            return False  # pretty-printed or single-line document continues past this line
+        if not isinstance(first, dict):
+            return False
+        while True:
+            rest = f.read(4096)
+            if not rest:
+                # the whole file is this one object: a place, or a container to scan
+                return _is_place_record(first)
+            if rest.strip():
+                return True
 
-        # 2c) GeoJSON FeatureCollection: {"features":[{"properties":{...}}, ...]}
-        f = _open_text()
-        yielded = False
-        try:
-            for feat in ijson.items(f, "features.item"):
-                props = (feat or {}).get("properties")
-                if isinstance(props, dict):
-                    yielded = True
-                    yield props
-        finally:
-            f.close()
-        if yielded:
-            return
+def detect_container(path: Path, backend: str = "auto") -> str:
+    """
+    Decide the file layout from its beginning, without a full pass:
+      'array'                       top-level JSON array of places
+      'ndjson'                      one JSON object per line (first line is a
+                                    complete object and more content follows, or
+                                    it is a single place record), even when each
+                                    record has a "features" list
+      '@graph' | 'places' | 'features'  object holding a list under that key
+      'dict'                        object of id -> place
+    Only the first line, then the events up to the first list-holding key, are parsed.
+    """
+    with _open_text(path) as f:
+        head = f.read(200).lstrip()
+    if head.startswith("["):
+        return "array"
+    if not head.startswith("{"):
+        return "ndjson"
+    if _is_ndjson(path):
+        return "ndjson"
 
-        # 2d) dict-of-id -> place
-        f = _open_text()
-        yielded = False
-        try:
-            for key, place in ijson.kvitems(f, ""):
-                if isinstance(place, dict):
-                    yielded = True
-                    yield place
-        finally:
-            f.close()
-        if yielded:
-            return
+    js = _ijson_module(backend)
+    with _open_text(path) as f:
+        events = js.parse(f, multiple_values=True)
+        key = None
+        for prefix, event, value in events:
+            if prefix == "" and event == "map_key":
+                key = value
+                continue
+            if prefix == "" and event == "end_map":
+                # end of the first top-level value: another value means NDJSON
+                return "ndjson" if next(events, None) is not None else "dict"
+            if key is not None and prefix == key and event in ("start_array", "start_map"):
+                if key in _CONTAINER_KEYS and event == "start_array":
+                    return key
+                if event == "start_map" and str(key).isdigit():
+                    return "dict"  # {"<pleiadesId>": {...}, ...}
+                key = None  # some other value (@context, metadata): keep scanning
+    return "dict"
 
-    # Case 3: NDJSON fallback (one JSON object per line)
-    f = _open_text()
+def _loads_line():
     try:
-        for line in f:
-            s = line.strip()
-            if not s or s[0] != "{":
-                continue
-            try:
-                obj = json.loads(s)
-            except json.JSONDecodeError:
-                continue
-            if isinstance(obj, dict):
-                yield obj
+        import orjson
+        return orjson.loads
+    except ImportError:
+        return json.loads
+
+def iter_pleiades_places(path: Path, backend: str = None):
+    """
+    Yield place dicts from .json/.json.gz/NDJSON without loading the whole file.
+    The layout is detected once, then the file is read in a single streaming pass.
+
+    backend: 'auto' (default ijson backend, C when available), an ijson backend
+    name ('yajl2_c', 'python', ...), or 'orjson' to decode the whole document
+    in memory (fastest, needs RAM for the full dump).
+    """
+    backend = backend or PLEIADES_JSON_BACKEND
+    kind = detect_container(path, backend)
+
+    if kind == "ndjson":
+        loads = _loads_line()
+        with _open_text(path) as f:
+            for line in f:
+                s = line.strip()
+                if not s or s[0] != "{":
+                    continue
+                try:
+                    obj = loads(s)
+                except ValueError:
+                    continue
+                if isinstance(obj, dict):
+                    yield obj
+        return
+
+    if backend == "orjson":
+        import orjson
+        with _open_text(path) as f:
+            doc = orjson.loads(f.read())
+        if kind == "array":
+            items = doc
+        elif kind == "dict":
+            items = doc.values()
+        else:
+            items = doc.get(kind) or []
+    else:
+        js = _ijson_module(backend)
+        f = _open_text(path)
+        if kind == "array":
+            items = js.items(f, "item", use_float=True)
+        elif kind == "dict":
+            items = (v for _, v in js.kvitems(f, "", use_float=True))
+        else:
+            items = js.items(f, f"{kind}.item", use_float=True)
+
+    try:
+        for item in items:
+            if kind == "features":
+                # GeoJSON FeatureCollection: {"features":[{"properties":{...}}, ...]}
+                item = (item or {}).get("properties")
+            if isinstance(item, dict):
+                yield item
     finally:
-        f.close()
+        if backend != "orjson":
+            f.close()
 
 def _pid_from_uri(uri: str) -> Optional[str]:
     if not isinstance(uri, str):
@@ -175,71 +278,251 @@ def _collect_names(place: Dict[str, Any]) -> Tuple[List[str], List[str]]:
 def _safe_list(x):
     return x if isinstance(x, list) else []
 
+def place_row(place: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Normalized Place properties, or None if the record has no usable id."""
+    pid = str(place.get("id")) if place.get("id") is not None else _pid_from_uri(place.get("uri",""))
+    if not pid:
+        return None
+
+    altNames, languages = _collect_names(place)
+    row = {
+        "pleiadesId": pid,
+        "uri": place.get("uri") or f"https://pleiades.stoa.org/places/{pid}",
+        "title": place.get("title") or place.get("name") or place.get("label"),
+        "description": place.get("description"),
+        "placeTypes": _safe_list(place.get("placeTypes") or place.get("placeType") or place.get("place_type") or place.get("placeTypeURIs")),
+        "subject": _safe_list(place.get("subject")),
+        "altNames": altNames,
+        "languages": languages,
+        "review_state": place.get("review_state"),
+    }
+    row["contentHash"] = content_hash(row, connection_rows(pid, place))
+    return row
+
+def connection_rows(pid: str, place: Dict[str, Any]) -> List[Dict[str, Any]]:
+    rows = []
+    # connectsWith: plain list of related URIs
+    for uri2 in _safe_list(place.get("connectsWith")):
+        to_pid = _pid_from_uri(uri2)
+        if not to_pid:
+            continue
+        rows.append({"from": pid, "to": to_pid, "toUri": uri2,
+                     "connectionType": "related", "title": None,
+                     "associationCertainty": None, "uri": None})
+
+    # connections: richer typed edges
+    for c in _safe_list(place.get("connections")):
+        to_uri = c.get("connectsTo")
+        to_pid = _pid_from_uri(to_uri) if to_uri else None
+        if not to_pid:
+            continue
+        rows.append({"from": pid, "to": to_pid, "toUri": to_uri,
+                     "connectionType": c.get("connectionType"),
+                     "title": c.get("title"),
+                     "associationCertainty": c.get("associationCertainty"),
+                     "uri": c.get("uri")})
+    return rows
+
+def content_hash(row: Dict[str, Any], connections: List[Dict[str, Any]]) -> str:
+    """Hash of the normalized place fields + its connections (stored as Place.contentHash)."""
+    payload = {k: v for k, v in row.items() if k != "contentHash"}
+    payload["connections"] = connections
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+# ------------ Delta mode ------------
+def fetch_content_hashes(sess) -> Dict[str, Optional[str]]:
+    q = "MATCH (p:Place) RETURN p.pleiadesId AS pid, p.contentHash AS h"
+    return {rec["pid"]: rec["h"] for rec in sess.run(q)}
+
+class DeltaFilter:
+    """Skips places whose contentHash matches the one already stored in Neo4j."""
+
+    def __init__(self, known: Dict[str, Optional[str]]):
+        self.known = known
+        self.counts = Counter()
+
+    def keep(self, row: Dict[str, Any], count: bool = True) -> bool:
+        pid = row["pleiadesId"]
+        if pid not in self.known:
+            status = "new"
+        elif self.known[pid] != row["contentHash"]:
+            status = "changed"
+        else:
+            status = "unchanged"
+        if count:
+            self.counts[status] += 1
+        return status != "unchanged"
+
+    def report(self) -> str:
+        c = self.counts
+        return f"new: {c['new']}, changed: {c['changed']}, unchanged (skipped): {c['unchanged']}"
+
+# ------------ Checkpoint (batched mode) ------------
+def _source_signature(src: Path) -> Dict[str, Any]:
+    st = src.stat()
+    return {"source": str(src.resolve()), "size": st.st_size, "mtime": int(st.st_mtime)}
+
+def load_checkpoint(path: Path, src: Path) -> Dict[str, Any]:
+    """Checkpoint for this exact dump file, or a fresh one (phase 1, offset 0)."""
+    fresh = {**_source_signature(src), "phase": 1, "offset": 0}
+    if not path.exists():
+        return fresh
+    try:
+        ck = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"[WARN] Ignoring unreadable checkpoint {path}: {e}")
+        return fresh
+    if any(ck.get(k) != v for k, v in _source_signature(src).items()):
+        print(f"[WARN] Checkpoint {path} belongs to a different dump; starting over.")
+        return fresh
+    return ck
+
+def save_checkpoint(path: Path, ck: Dict[str, Any]) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(ck), encoding="utf-8")
+    os.replace(tmp, path)
+
+def _write_rows(tx, cypher: str, rows: List[Dict[str, Any]]) -> None:
+    tx.run(cypher, rows=rows).consume()
+
 # ------------ Main ------------
+def ingest_per_row(sess, src: Path, delta: Optional[DeltaFilter] = None) -> Tuple[int, int]:
+    n_places, n_edges = 0, 0
+    for place in iter_pleiades_places(src):
+        row = place_row(place)
+        if not row:
+            continue
+        if delta and not delta.keep(row):
+            continue
+        sess.run(CYPHER_UPSERT_PLACE, **row)
+        n_places += 1
+
+        for c in connection_rows(row["pleiadesId"], place):
+            sess.run(CYPHER_UPSERT_STUB, pleiadesId=c["to"], uri=c["toUri"])
+            sess.run(CYPHER_CONNECT,
+                     **{"from": c["from"], "to": c["to"]},
+                     connectionType=c["connectionType"],
+                     title=c["title"],
+                     associationCertainty=c["associationCertainty"],
+                     uri=c["uri"])
+            n_edges += 1
+    return n_places, n_edges
+
+def ingest_batched(sess, src: Path, batch_size: int, checkpoint: Path,
+                   delta: bool = False) -> Tuple[int, int, Optional[DeltaFilter]]:
+    """
+    Phase 1: UNWIND-upsert all places. Phase 2: UNWIND-create stubs + CONNECTED.
+    After every committed batch the checkpoint records (phase, stream offset),
+    so a rerun skips everything already written. Offsets count stream records.
+
+    With delta=True both phases compare against the contentHash snapshot taken
+    when the run started (kept next to the checkpoint), so a resumed phase 2
+    still writes the connections of places that phase 1 just updated.
+    """
+    ck = load_checkpoint(checkpoint, src)
+    resuming = ck["phase"] > 1 or ck["offset"]
+    if resuming:
+        print(f"Resuming from checkpoint: phase {ck['phase']}, offset {ck['offset']}")
+
+    delta_filter = None
+    if delta:
+        snapshot = checkpoint.with_name(checkpoint.name + ".hashes.json")
+        if resuming and snapshot.exists():
+            known = json.loads(snapshot.read_text(encoding="utf-8"))
+        else:
+            known = fetch_content_hashes(sess)
+            snapshot.write_text(json.dumps(known), encoding="utf-8")
+        delta_filter = DeltaFilter(known)
+
+    n_places, n_edges = 0, 0
+
+    if ck["phase"] == 1:
+        batch, offset = [], 0
+        for place in iter_pleiades_places(src):
+            offset += 1
+            if offset <= ck["offset"]:
+                continue
+            row = place_row(place)
+            if row and (delta_filter is None or delta_filter.keep(row)):
+                batch.append(row)
+            if len(batch) >= batch_size:
+                sess.execute_write(_write_rows, CYPHER_UPSERT_PLACES_BULK, batch)
+                n_places += len(batch)
+                batch = []
+                save_checkpoint(checkpoint, {**ck, "offset": offset})
+                print(f"[phase 1] places written: {n_places} (offset {offset})")
+        if batch:
+            sess.execute_write(_write_rows, CYPHER_UPSERT_PLACES_BULK, batch)
+            n_places += len(batch)
+        ck = {**ck, "phase": 2, "offset": 0}
+        save_checkpoint(checkpoint, ck)
+        print(f"[phase 1] done: {n_places} places")
+
+    batch, offset = [], 0
+    for place in iter_pleiades_places(src):
+        offset += 1
+        if offset <= ck["offset"]:
+            continue
+        row = place_row(place)
+        if row and (delta_filter is None or delta_filter.keep(row, count=False)):
+            batch.extend(connection_rows(row["pleiadesId"], place))
+        if len(batch) >= batch_size:
+            sess.execute_write(_write_rows, CYPHER_CONNECT_BULK, batch)
+            n_edges += len(batch)
+            batch = []
+            save_checkpoint(checkpoint, {**ck, "offset": offset})
+            print(f"[phase 2] connections written: {n_edges} (offset {offset})")
+    if batch:
+        sess.execute_write(_write_rows, CYPHER_CONNECT_BULK, batch)
+        n_edges += len(batch)
+    print(f"[phase 2] done: {n_edges} connections")
+
+    checkpoint.unlink(missing_ok=True)
+    if delta:
+        checkpoint.with_name(checkpoint.name + ".hashes.json").unlink(missing_ok=True)
+    return n_places, n_edges, delta_filter
+
 def main():
+    ap = argparse.ArgumentParser(description="Ingest Pleiades places into Neo4j.")
+    ap.add_argument("--batched", action="store_true",
+                    help="Two-phase UNWIND ingest (places, then connections) with a resumable checkpoint.")
+    ap.add_argument("--batch-size", type=int, default=PLEIADES_BATCH,
+                    help="Rows per UNWIND transaction in --batched mode.")
+    ap.add_argument("--checkpoint", default=PLEIADES_CHECKPOINT,
+                    help="Checkpoint file for --batched mode (removed after a complete run).")
+    ap.add_argument("--restart", action="store_true",
+                    help="Ignore an existing checkpoint and start from the beginning.")
+    ap.add_argument("--delta", action="store_true",
+                    help="Skip places whose content hash is unchanged since the last ingest.")
+    args = ap.parse_args()
+
     if not NEO4J_PASS:
         raise SystemExit("Set NEO4J_PASSWORD (or NEO4J_PASS) before running.")
     src = Path(PLEIADES_JSON)
     if not src.exists():
         raise SystemExit(f"Not found: {src}")
 
-    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS))
-
-    n_places, n_edges = 0, 0
-    with driver.session(database=NEO4J_DB) as sess:
-        for place in iter_pleiades_places(src):
-            # Identify the place
-            pid = str(place.get("id")) if place.get("id") is not None else _pid_from_uri(place.get("uri",""))
-            if not pid:
-                continue
+    checkpoint = Path(args.checkpoint)
+    if args.restart:
+        checkpoint.unlink(missing_ok=True)
+        checkpoint.with_name(checkpoint.name + ".hashes.json").unlink(missing_ok=True)
 
-            uri   = place.get("uri") or f"https://pleiades.stoa.org/places/{pid}"
-            title = place.get("title") or place.get("name") or place.get("label")
-            desc  = place.get("description")
-            ptypes = _safe_list(place.get("placeTypes") or place.get("placeType") or place.get("place_type") or place.get("placeTypeURIs"))
-            subject = _safe_list(place.get("subject"))
-            review = place.get("review_state")
-            altNames, languages = _collect_names(place)
-
-            sess.run(
-                CYPHER_UPSERT_PLACE,
-                pleiadesId=pid, uri=uri, title=title, description=desc,
-                placeTypes=ptypes, subject=subject,
-                altNames=altNames, languages=languages, review_state=review
-            )
-            n_places += 1
-
-            # connectsWith: plain list of related URIs
-            for uri2 in _safe_list(place.get("connectsWith")):
-                to_pid = _pid_from_uri(uri2)
-                if not to_pid:
-                    continue
-                sess.run(CYPHER_UPSERT_STUB, pleiadesId=to_pid, uri=uri2)
-                sess.run(CYPHER_CONNECT,
-                         **{"from": pid, "to": to_pid},
-                         connectionType="related",
-                         title=None,
-                         associationCertainty=None,
-                         uri=None)
-                n_edges += 1
-
-            # connections: richer typed edges
-            for c in _safe_list(place.get("connections")):
-                to_uri = c.get("connectsTo")
-                to_pid = _pid_from_uri(to_uri) if to_uri else None
-                if not to_pid:
-                    continue
-                sess.run(CYPHER_UPSERT_STUB, pleiadesId=to_pid, uri=to_uri)
-                sess.run(CYPHER_CONNECT,
-                         **{"from": pid, "to": to_pid},
-                         connectionType=c.get("connectionType"),
-                         title=c.get("title"),
-                         associationCertainty=c.get("associationCertainty"),
-                         uri=c.get("uri"))
-                n_edges += 1
-
-    driver.close()
+    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS))
+    try:
+        ensure_schema(driver, NEO4J_DB)
+        with driver.session(database=NEO4J_DB) as sess:
+            if args.batched:
+                n_places, n_edges, delta = ingest_batched(
+                    sess, src, args.batch_size, checkpoint, delta=args.delta)
+            else:
+                delta = DeltaFilter(fetch_content_hashes(sess)) if args.delta else None
+                n_places, n_edges = ingest_per_row(sess, src, delta)
+    finally:
+        driver.close()
     print(f"Ingested places: {n_places}, connections: {n_edges}")
+    if delta:
+        print(f"Delta: {delta.report()}")
 
 if __name__ == "__main__":
     main()
@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import os, re, sys
+import argparse, functools, hashlib, json, os, re, sys
+import multiprocessing as mp
 from pathlib import Path
 
 try:
@@ -12,11 +13,19 @@ except Exception:
 
 from neo4j import GraphDatabase
 
+from chunk_index import ChunkTokenIndex
+from graph_schema import ensure_schema
+from name_matcher import NameMatcher, load_matcher, save_matcher
+
 NEO4J_URI  = os.getenv("NEO4J_URI", "bolt://localhost:7687")
 NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
 NEO4J_PASS = os.getenv("NEO4J_PASSWORD") or os.getenv("NEO4J_PASS")
 NEO4J_DB   = os.getenv("NEO4J_DATABASE", "graphrag")
 
+DEFAULT_MATCHER_CACHE = Path(".cache") / "place_matcher.pkl"
+DEFAULT_CHUNK_INDEX = Path(".cache") / "chunk_token_index.pkl"
+WRITE_BATCH = 5000  # MENTIONS rows per UNWIND write transaction
+
 BOUNDARY = r"(^|[^A-Za-z0-9_])"
 BOUNDARY_END = r"([^A-Za-z0-9_]|$)"
 
@@ -24,18 +33,20 @@ def compile_pattern(name: str) -> re.Pattern:
     # escape regex specials, wrap with crude word boundaries, ignore case
     return re.compile(rf"(?i){BOUNDARY}{re.escape(name)}{BOUNDARY_END}")
 
-def fetch_places(session):
+def fetch_place_rows(session):
     q = """
     MATCH (p:Place)
     RETURN p.pleiadesId AS pid, p.title AS title, coalesce(p.altNames, []) AS alts
     """
-    pairs = []  # list of (pid, name, compiled_regex)
-    for rec in session.run(q):
-        pid = rec["pid"]
+    return [(rec["pid"], rec["title"], rec["alts"]) for rec in session.run(q)]
+
+def place_names_from_rows(rows):
+    pairs = []  # list of (pid, name)
+    for pid, title, alts in rows:
         names = []
-        if rec["title"]:
-            names.append(rec["title"])
-        for a in rec["alts"]:
+        if title:
+            names.append(title)
+        for a in alts:
             if isinstance(a, str):
                 names.append(a)
         # clean and dedupe
@@ -44,9 +55,71 @@ def fetch_places(session):
             n2 = n.strip()
             if len(n2) >= 3 and n2.lower() not in seen:
                 seen.add(n2.lower())
-                pairs.append((pid, n2, compile_pattern(n2)))
+                pairs.append((pid, n2))
     return pairs
 
+def fetch_place_names(session):
+    return place_names_from_rows(fetch_place_rows(session))
+
+def fingerprint_place_rows(rows) -> str:
+    # count + checksum of pleiadesId/title/altNames, computed client-side
+    h = hashlib.sha1()
+    for row in sorted(rows, key=lambda r: str(r[0])):
+        h.update(json.dumps(row, ensure_ascii=False).encode("utf-8"))
+        h.update(b"\n")
+    return f"local:{len(rows)}:{h.hexdigest()}"
+
+def fetch_places_fingerprint(session):
+    """
+    Fingerprint of the Place set computed inside Neo4j (needs APOC), so an
+    up-to-date cache can be used without downloading the places at all.
+    Returns None when APOC is not available.
+    """
+    q = """
+    MATCH (p:Place)
+    WITH p ORDER BY p.pleiadesId
+    WITH collect([p.pleiadesId, p.title, coalesce(p.altNames, [])]) AS rows
+    RETURN size(rows) AS n, apoc.hashing.fingerprint(rows) AS checksum
+    """
+    try:
+        rec = session.run(q).single()
+    except Exception:
+        return None
+    return f"apoc:{rec['n']}:{rec['checksum']}"
+
+def load_place_matcher(session, cache_path, rebuild: bool = False):
+    """
+    Return a NameMatcher over all place names, reusing the on-disk cache
+    when the Place fingerprint is unchanged (cache_path=None disables it).
+    """
+    rows = None
+    fingerprint = fetch_places_fingerprint(session)
+    if fingerprint is None:
+        rows = fetch_place_rows(session)
+        fingerprint = fingerprint_place_rows(rows)
+
+    if cache_path and not rebuild:
+        matcher = load_matcher(cache_path, fingerprint)
+        if matcher is not None:
+            print(f"Using cached place matcher {cache_path} ({fingerprint})")
+            return matcher
+
+    if rows is None:
+        rows = fetch_place_rows(session)
+    matcher = NameMatcher(place_names_from_rows(rows))
+    if cache_path:
+        save_matcher(cache_path, matcher, fingerprint)
+        print(f"Saved place matcher cache {cache_path} ({fingerprint})")
+    return matcher
+
+def fetch_places(session):
+    # list of (pid, name, compiled_regex)
+    return [(pid, name, compile_pattern(name)) for pid, name in fetch_place_names(session)]
+
+def find_hits_regex(place_entries, text: str):
+    # naive O(N*M) scan, kept as the reference implementation for --matcher regex
+    return [(pid, name) for pid, name, pat in place_entries if pat.search(text)]
+
 def fetch_all_article_ids(session):
     q = """
     MATCH (a:Article)
@@ -64,57 +137,258 @@ def fetch_chunks(session, article_id: str):
     """
     return list(session.run(q, aid=article_id))
 
-def link_one_chunk(tx, cid: str, hits):
-    # hits = [(pid, matchedName), ...]
-    for pid, matched in hits:
-        tx.run(
-            """
-            MATCH (c:Chunk {chunkId:$cid})
-            MATCH (p:Place {pleiadesId:$pid})
-            MERGE (c)-[r:MENTIONS]->(p)
-            ON CREATE SET r.matched = $matched, r.source = 'name-exact-boundary'
-            """,
-            cid=cid, pid=pid, matched=matched
-        )
+CYPHER_LINK_MENTIONS = """
+UNWIND $rows AS row
+MATCH (c:Chunk {chunkId: row.cid})
+MATCH (p:Place {pleiadesId: row.pid})
+MERGE (c)-[r:MENTIONS]->(p)
+ON CREATE SET r.matched = row.matched, r.source = 'name-exact-boundary'
+"""
+
+def link_mentions_batch(tx, rows):
+    # rows = [{"cid", "pid", "matched"}, ...]; UNWIND keeps row order, so for a
+    # (chunk, place) pair the first matched name still wins, as before
+    tx.run(CYPHER_LINK_MENTIONS, rows=rows).consume()
+
+class MentionWriter:
+    """Single writer: buffers (cid, pid, matched) rows and flushes them in large UNWIND batches."""
+
+    def __init__(self, session, batch_size: int = WRITE_BATCH):
+        self.session = session
+        self.batch_size = batch_size
+        self.rows = []
+        self.written = 0
+
+    def add(self, cid: str, hits):
+        for pid, matched in hits:
+            self.rows.append({"cid": cid, "pid": pid, "matched": matched})
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        while self.rows:
+            batch, self.rows = self.rows[:self.batch_size], self.rows[self.batch_size:]
+            self.session.execute_write(link_mentions_batch, batch)
+            self.written += len(batch)
+
+# ---------- incremental relinking ----------
+
+def fetch_all_chunks(session):
+    q = """
+    MATCH (:Article)-[:HAS_CHUNK]->(c:Chunk)
+    RETURN DISTINCT c.chunkId AS cid, c.text AS text
+    """
+    # same chunk set the full scan covers (chunks reachable from an Article)
+    return [(rec["cid"], rec["text"] or "") for rec in session.run(q)]
+
+def fetch_existing_links(session, pids=(), cids=()):
+    """(cid, pid) pairs of linker-created MENTIONS touching the given places or chunks."""
+    q = """
+    UNWIND $pids AS pid
+    MATCH (c:Chunk)-[:MENTIONS {source: 'name-exact-boundary'}]->(:Place {pleiadesId: pid})
+    RETURN c.chunkId AS cid, pid
+    UNION
+    UNWIND $cids AS cid
+    MATCH (:Chunk {chunkId: cid})-[:MENTIONS {source: 'name-exact-boundary'}]->(p:Place)
+    RETURN cid, p.pleiadesId AS pid
+    """
+    return {(rec["cid"], rec["pid"]) for rec in session.run(q, pids=list(pids), cids=list(cids))}
+
+CYPHER_UNLINK_MENTIONS = """
+UNWIND $rows AS row
+MATCH (:Chunk {chunkId: row.cid})-[r:MENTIONS {source: 'name-exact-boundary'}]->(:Place {pleiadesId: row.pid})
+DELETE r
+"""
+
+CYPHER_RELINK_MENTIONS = """
+UNWIND $rows AS row
+MATCH (c:Chunk {chunkId: row.cid})
+MATCH (p:Place {pleiadesId: row.pid})
+MERGE (c)-[r:MENTIONS]->(p)
+ON CREATE SET r.matched = row.matched, r.source = 'name-exact-boundary'
+ON MATCH SET r.matched = CASE WHEN r.matched IN row.names THEN r.matched ELSE row.matched END
+"""
+
+def _write_rows(tx, cypher, rows):
+    tx.run(cypher, rows=rows).consume()
+
+def relink_incremental(sess, index: ChunkTokenIndex, pairs, full_matcher_fn, write_batch: int):
+    """
+    Update MENTIONS only where something changed since the last indexed run:
+      - new/changed chunks are scanned against every place name;
+      - added/changed places are matched only against the chunks that contain
+        the key token of one of their names (plus chunks they were linked to);
+      - linker edges that no longer match are removed.
+    """
+    texts = dict(fetch_all_chunks(sess))
+    changed_cids, removed_cids = index.update_chunks(texts.items())
+    added, changed, removed = index.diff_places(pairs)
+    print(f"Chunks: {len(changed_cids)} new/changed, {len(removed_cids)} removed (of {len(texts)})")
+    print(f"Places: {len(added)} added, {len(changed)} changed, {len(removed)} removed")
+
+    names_by_pid = {}
+    for pid, name in pairs:
+        names_by_pid.setdefault(pid, []).append(name)
+
+    desired = {}  # (cid, pid) -> first matched name
+
+    # 1) new/changed chunks: full dictionary scan
+    if changed_cids:
+        matcher = full_matcher_fn()
+        for cid in changed_cids:
+            for pid, name in matcher.find(texts[cid]):
+                desired.setdefault((cid, pid), name)
+
+    # 2) added/changed places: candidate chunks from the inverted index
+    dirty_pids = set(added) | set(changed)
+    existing = fetch_existing_links(sess, pids=dirty_pids | set(removed), cids=changed_cids)
+    if dirty_pids:
+        small = NameMatcher([(pid, name) for pid, name in pairs if pid in dirty_pids])
+        candidates = {cid for cid, pid in existing if pid in dirty_pids and cid in texts}
+        for pid in dirty_pids:
+            for name in names_by_pid[pid]:
+                candidates |= index.candidates(name)
+        print(f"Scanning {len(candidates)} candidate chunks for {len(dirty_pids)} places")
+        for cid in candidates:
+            for pid, name in small.find(texts[cid]):
+                desired.setdefault((cid, pid), name)
+
+    stale = [{"cid": cid, "pid": pid} for cid, pid in existing if (cid, pid) not in desired]
+    rows = [
+        {"cid": cid, "pid": pid, "matched": name, "names": names_by_pid.get(pid, [])}
+        for (cid, pid), name in desired.items()
+    ]
+    for i in range(0, len(stale), write_batch):
+        sess.execute_write(_write_rows, CYPHER_UNLINK_MENTIONS, stale[i:i + write_batch])
+    for i in range(0, len(rows), write_batch):
+        sess.execute_write(_write_rows, CYPHER_RELINK_MENTIONS, rows[i:i + write_batch])
+
+    new_links = sum(1 for cid, pid in desired if (cid, pid) not in existing)
+    print(f"Incremental relink done: +{new_links} links, -{len(stale)} stale links.")
+
+    index.set_places(pairs)
+
+# ---------- parallel matching ----------
+
+_worker_find_hits = None
+
+def _init_worker(find_hits):
+    # with the fork start method initargs are inherited, not pickled, so the
+    # read-only place dictionary is shared copy-on-write with the parent
+    global _worker_find_hits
+    _worker_find_hits = find_hits
+
+def _match_chunk(item):
+    cid, text = item
+    return cid, _worker_find_hits(text or "")
+
+def make_pool(workers: int, find_hits):
+    methods = mp.get_all_start_methods()
+    ctx = mp.get_context("fork" if "fork" in methods else "spawn")
+    return ctx.Pool(workers, initializer=_init_worker, initargs=(find_hits,))
 
 def main():
+    ap = argparse.ArgumentParser(description="Link Chunk -> Place (MENTIONS) by exact name match.")
+    ap.add_argument("--matcher", choices=["aho", "regex"], default="aho",
+                    help="aho: one Aho-Corasick pass per chunk (default); "
+                         "regex: one compiled regex per name (slow reference).")
+    ap.add_argument("--cache", default=str(DEFAULT_MATCHER_CACHE),
+                    help="Place matcher cache file, rebuilt when the Place data changes.")
+    ap.add_argument("--no-cache", action="store_true", help="Do not read or write the matcher cache.")
+    ap.add_argument("--rebuild-cache", action="store_true", help="Ignore and overwrite an existing cache.")
+    ap.add_argument("--workers", type=int, default=1,
+                    help="Processes used for chunk matching (writes stay in the main process).")
+    ap.add_argument("--write-batch", type=int, default=WRITE_BATCH,
+                    help="MENTIONS rows per UNWIND write transaction.")
+    ap.add_argument("--index", default=str(DEFAULT_CHUNK_INDEX),
+                    help="Token -> chunk inverted index used by --incremental (refreshed by every run).")
+    ap.add_argument("--no-index", action="store_true", help="Do not read or write the chunk index.")
+    ap.add_argument("--incremental", action="store_true",
+                    help="Only relink places/chunks that changed since the last indexed run.")
+    args = ap.parse_args()
+
     if not NEO4J_PASS:
         print("Set NEO4J_PASSWORD (or .env).")
         sys.exit(1)
+    if args.incremental and (args.no_index or args.matcher != "aho"):
+        print("--incremental needs the chunk index and the aho matcher.")
+        sys.exit(1)
+    index_path = None if args.no_index else Path(args.index)
 
     driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS))
     total_links = 0
     total_chunks = 0
 
     try:
+        ensure_schema(driver, NEO4J_DB)
         with driver.session(database=NEO4J_DB) as sess:
+            if args.incremental:
+                index = ChunkTokenIndex.load(index_path)
+                if index is None:
+                    print(f"No usable chunk index at {index_path}; run a full link first.")
+                    sys.exit(1)
+                cache_path = None if args.no_cache else Path(args.cache)
+                pairs = fetch_place_names(sess)
+                relink_incremental(
+                    sess, index, pairs,
+                    lambda: load_place_matcher(sess, cache_path, rebuild=args.rebuild_cache),
+                    args.write_batch,
+                )
+                index.save(index_path)
+                return
+
             # load dictionary once
-            place_entries = fetch_places(sess)
+            if args.matcher == "regex":
+                place_entries = fetch_places(sess)
+                find_hits = functools.partial(find_hits_regex, place_entries)
+            else:
+                cache_path = None if args.no_cache else Path(args.cache)
+                place_entries = load_place_matcher(sess, cache_path, rebuild=args.rebuild_cache)
+                find_hits = place_entries.find
             print(f"Loaded {len(place_entries)} place names.")
 
             # get all articleIds
             article_ids = fetch_all_article_ids(sess)
             print(f"Found {len(article_ids)} articles to scan.")
 
+            # read every article's chunks up front, so the workers get one
+            # continuous stream instead of idling at each article boundary
+            items = []
             for idx, article_id in enumerate(article_ids, start=1):
-                print(f"\n[{idx}/{len(article_ids)}] Scanning article {article_id}...")
                 chunk_records = fetch_chunks(sess, article_id)
-                print(f"  Chunks: {len(chunk_records)}")
-
-                for rec in chunk_records:
-                    cid = rec["cid"]
-                    text = rec["text"] or ""
-                    hits = []
-                    # naive O(N*M) scan
-                    for pid, name, pat in place_entries:
-                        if pat.search(text):
-                            hits.append((pid, name))
+                print(f"[{idx}/{len(article_ids)}] {article_id}: {len(chunk_records)} chunks")
+                items.extend((rec["cid"], rec["text"]) for rec in chunk_records)
+            print(f"\nScanning {len(items)} chunks with {max(args.workers, 1)} worker(s)...")
+
+            writer = MentionWriter(sess, args.write_batch)
+            pool = make_pool(args.workers, find_hits) if args.workers > 1 else None
+            try:
+                if pool is not None:
+                    results = pool.imap(_match_chunk, items, chunksize=4)
+                else:
+                    results = ((cid, find_hits(text or "")) for cid, text in items)
+
+                for cid, hits in results:
                     if hits:
-                        with sess.begin_transaction() as tx:
-                            link_one_chunk(tx, cid, hits)
+                        writer.add(cid, hits)
                         total_links += len(hits)
                         total_chunks += 1
                         print(f"    {cid}: {len(hits)} links")
+                writer.flush()
+            finally:
+                if pool is not None:
+                    pool.close()
+                    pool.join()
+
+            if index_path:
+                index = ChunkTokenIndex.load(index_path) or ChunkTokenIndex()
+                index.update_chunks((cid, text or "") for cid, text in items)
+                if args.matcher == "regex":
+                    index.set_places((pid, name) for pid, name, _ in place_entries)
+                else:
+                    index.set_places(place_entries.entries)
+                index.save(index_path)
+                print(f"Updated chunk index {index_path}")
 
             print(f"\nDone. Linked {total_links} (in {total_chunks} chunks) across {len(article_ids)} articles.")
     finally:
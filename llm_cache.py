@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Record/replay cache for the LLM calls made by the eval scripts
+(Cypher generation, answering and grading).
+
+Calls are keyed by (model, temperature, sha256 of the prompt plus any other
+request parameters such as max_tokens), and the response text is stored in a
+ResponseCache SQLite file that never expires. Calls to another endpoint
+(OPENAI_BASE_URL, e.g. a local fake server) also carry its URL in the key, so
+they never replay, or overwrite, answers recorded from the OpenAI API. Modes (LLM_CACHE_MODE):
+
+- off:          always call the model, store nothing
+- read-write:   serve cached responses, call and store on a miss (default)
+- replay-only:  never call the model; a miss raises OfflineMiss
+- record:       always call the model and overwrite what is stored
+
+Only real calls go through the optional rate limiter, so a cached re-run of a
+stage does not wait for API tokens.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Callable
+
+from langchain_core.messages import AIMessage
+
+from response_cache import MISS, OfflineMiss, ResponseCache, normalize_key
+
+LLM_CACHE_MODES = ("off", "read-write", "replay-only", "record")
+DEFAULT_LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "read-write")
+DEFAULT_LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", str(Path(".cache") / "llm_calls.sqlite"))
+# the OpenAI client honours OPENAI_BASE_URL too; None = the OpenAI API
+DEFAULT_LLM_ENDPOINT = os.getenv("OPENAI_BASE_URL") or None
+
+CACHE_NS = "llm"
+
+
+def call_key(model: str, temperature: float, prompt: Any, endpoint: str = None,
+             **params: Any) -> str:
+    payload = json.dumps([prompt, params], ensure_ascii=False, sort_keys=True, default=str)
+    digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    if endpoint:
+        return normalize_key(endpoint.rstrip("/"), model, float(temperature or 0.0), digest)
+    return normalize_key(model, float(temperature or 0.0), digest)
+
+
+class LLMCache:
+    def __init__(self, path=DEFAULT_LLM_CACHE_PATH, mode: str = DEFAULT_LLM_CACHE_MODE,
+                 limiter=None, endpoint: str = DEFAULT_LLM_ENDPOINT):
+        if mode not in LLM_CACHE_MODES:
+            raise ValueError(f"LLM cache mode must be one of {LLM_CACHE_MODES}, got {mode!r}")
+        self.mode = mode
+        self.limiter = limiter
+        self.endpoint = endpoint
+        self.calls = 0
+        self.store = None if mode == "off" else ResponseCache(path, ttl=0, offline=True)
+
+    def cached(self, key: str, call: Callable[[], str]) -> str:
+        """Response text for `key`, calling `call()` only when the mode requires it."""
+        if self.store is not None and self.mode != "record":
+            value = self.store.get(CACHE_NS, key)
+            if value is not MISS:
+                return value
+            if self.mode == "replay-only":
+                raise OfflineMiss(f"LLM call not in cache (replay-only): {key}")
+        if self.limiter is not None:
+            self.limiter.acquire()
+        text = call()
+        self.calls += 1
+        if self.store is not None:
+            self.store.put(CACHE_NS, key, text)
+        return text
+
+    def invoke(self, llm, prompt: Any) -> AIMessage:
+        """llm.invoke(prompt) for a LangChain chat model, returning an AIMessage."""
+        key = call_key(getattr(llm, "model_name", None) or getattr(llm, "model", ""),
+                       getattr(llm, "temperature", 0.0), prompt, endpoint=self.endpoint)
+        return AIMessage(content=self.cached(key, lambda: llm.invoke(prompt).content))
+
+    def chat_completion(self, client, model: str, messages, temperature: float = 0.0,
+                        **params: Any) -> str:
+        """Content of client.chat.completions.create(...) for an OpenAI client."""
+        key = call_key(model, temperature, messages, endpoint=self.endpoint, **params)
+
+        def call() -> str:
+            response = client.chat.completions.create(
+                model=model, messages=messages, temperature=temperature, **params
+            )
+            return response.choices[0].message.content or ""
+
+        return self.cached(key, call)
+
+    def report(self) -> str:
+        if self.store is None:
+            return f"[llm-cache] off: calls={self.calls}"
+        return (f"[llm-cache] {self.mode}: hits={self.store.hits} misses={self.store.misses} "
+                f"calls={self.calls} ({self.store.path})")
+
+    def close(self) -> None:
+        if self.store is not None:
+            self.store.close()
+
+
+class CachedChatModel:
+    """Stands in for a LangChain chat model; .invoke() goes through the cache."""
+
+    def __init__(self, llm, cache: LLMCache):
+        self.llm = llm
+        self.cache = cache
+
+    def invoke(self, prompt: Any) -> AIMessage:
+        return self.cache.invoke(self.llm, prompt)
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Multi-pattern name matcher (Aho-Corasick) for the chunk -> place linker.
+
+Finds every (key, name) entry whose name occurs in a text with the same
+semantics as link_chunks_to_places.compile_pattern():
+
+    (?i)(^|[^A-Za-z0-9_])<name>([^A-Za-z0-9_]|$)
+
+i.e. case-insensitive (Python `re` rules), with crude ASCII word boundaries
+on both sides. The automaton is built once from all names, so each text is
+scanned in a single pass instead of once per name.
+
+Uses pyahocorasick when installed, otherwise a pure-Python automaton.
+A built matcher can be pickled to disk with save_matcher()/load_matcher(),
+keyed by a caller-supplied fingerprint of the source data.
+"""
+
+import os
+import pickle
+import string
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import ahocorasick  # optional C implementation (pip install pyahocorasick)
+except ImportError:
+    ahocorasick = None
+
+# Characters matched by [A-Za-z0-9_] after folding (also covers the non-ASCII
+# chars `re` treats as equal under IGNORECASE: U+0130, U+0131, U+017F, U+212A).
+WORD_CHARS = frozenset(string.ascii_lowercase + string.digits + "_")
+
+_FOLD_CACHE: Dict[str, str] = {}
+
+
+def fold_char(ch: str) -> str:
+    """
+    Map a character to a canonical form such that fold_char(a) == fold_char(b)
+    exactly when `re` with IGNORECASE considers a and b equal.
+    Always returns a single character, so folded offsets match the original text.
+    """
+    f = _FOLD_CACHE.get(ch)
+    if f is not None:
+        return f
+    lo = ch.lower()
+    if len(lo) != 1:
+        lo = lo[0]  # U+0130 -> "i" + combining dot
+    f = lo
+    up = lo.upper()
+    if len(up) == 1:
+        lo2 = up.lower()
+        if len(lo2) == 1:
+            f = lo2  # e.g. final sigma -> sigma, long s -> s, Kelvin sign -> k
+    _FOLD_CACHE[ch] = f
+    return f
+
+
+def fold(text: str) -> str:
+    return "".join([fold_char(ch) for ch in text])
+
+
+class NameMatcher:
+    """
+    Aho-Corasick automaton over a list of (key, name) entries.
+
+    find(text) returns the matching entries as (key, name) in entry order,
+    which is exactly what the per-name regex loop produces.
+    """
+
+    def __init__(self, entries: Sequence[Tuple[Any, str]], backend: str = "auto"):
+        self.entries: List[Tuple[Any, str]] = list(entries)
+
+        # distinct folded names -> entry indices
+        pattern_index: Dict[str, int] = {}
+        self._pattern_entries: List[List[int]] = []
+        self._pattern_len: List[int] = []
+        for idx, (_, name) in enumerate(self.entries):
+            if not name:
+                continue
+            folded = fold(name)
+            pid = pattern_index.get(folded)
+            if pid is None:
+                pid = len(self._pattern_entries)
+                pattern_index[folded] = pid
+                self._pattern_entries.append([])
+                self._pattern_len.append(len(folded))
+            self._pattern_entries[pid].append(idx)
+
+        if backend == "auto":
+            backend = "pyahocorasick" if ahocorasick is not None else "python"
+        if backend == "pyahocorasick" and ahocorasick is None:
+            raise RuntimeError("pyahocorasick is not installed (pip install pyahocorasick).")
+        if backend not in ("pyahocorasick", "python"):
+            raise ValueError(f"Unknown matcher backend: {backend!r}")
+        self.backend = backend
+
+        if backend == "pyahocorasick":
+            self._automaton = ahocorasick.Automaton()
+            for folded, pid in pattern_index.items():
+                self._automaton.add_word(folded, pid)
+            self._automaton.make_automaton()
+        else:
+            self._build_python(pattern_index)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    # ---------- pure-Python automaton ----------
+
+    def _build_python(self, pattern_index: Dict[str, int]) -> None:
+        goto: List[Dict[str, int]] = [{}]
+        term: List[int] = [-1]
+        for folded, pid in pattern_index.items():
+            node = 0
+            for ch in folded:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    term.append(-1)
+                node = nxt
+            term[node] = pid
+
+        # BFS for failure links and dictionary-suffix links
+        fail = [0] * len(goto)
+        dict_link = [0] * len(goto)
+        queue = list(goto[0].values())
+        head = 0
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            for ch, child in goto[node].items():
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                f = goto[f].get(ch, 0)
+                fail[child] = f
+                dict_link[child] = f if term[f] >= 0 else dict_link[f]
+                queue.append(child)
+
+        # leaves share one empty dict to keep the automaton small
+        empty: Dict[str, int] = {}
+        self._goto = [g if g else empty for g in goto]
+        self._term = term
+        self._fail = fail
+        self._dict_link = dict_link
+
+    def _iter_raw_python(self, folded: str) -> Iterator[Tuple[int, int]]:
+        goto, term, fail, dict_link = self._goto, self._term, self._fail, self._dict_link
+        node = 0
+        for i, ch in enumerate(folded):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            n = node if term[node] >= 0 else dict_link[node]
+            while n:
+                yield term[n], i + 1
+                n = dict_link[n]
+
+    def _iter_raw(self, folded: str) -> Iterator[Tuple[int, int]]:
+        """Yield (pattern_id, end_offset) for every raw occurrence."""
+        if self.backend == "pyahocorasick":
+            for end_idx, pid in self._automaton.iter(folded):
+                yield pid, end_idx + 1
+        else:
+            yield from self._iter_raw_python(folded)
+
+    # ---------- public API ----------
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """
+        Yield (pattern_id, start, end) for every boundary-respecting occurrence.
+        Entries sharing a pattern: self.pattern_entries(pattern_id).
+        """
+        folded = fold(text)
+        n = len(folded)
+        for pid, end in self._iter_raw(folded):
+            start = end - self._pattern_len[pid]
+            if start > 0 and folded[start - 1] in WORD_CHARS:
+                continue
+            if end < n and folded[end] in WORD_CHARS:
+                continue
+            yield pid, start, end
+
+    def pattern_entries(self, pattern_id: int) -> List[int]:
+        return self._pattern_entries[pattern_id]
+
+    def find(self, text: str) -> List[Tuple[Any, str]]:
+        """Return matching (key, name) entries in entry order, each at most once."""
+        hit_idx = set()
+        for pid, _, _ in self.iter_matches(text):
+            hit_idx.update(self._pattern_entries[pid])
+        return [self.entries[i] for i in sorted(hit_idx)]
+
+
+# ---------- persisted cache ----------
+
+# Bump when the pickled layout or the matching rules change.
+CACHE_VERSION = 1
+
+
+def save_matcher(path: Path, matcher: NameMatcher, fingerprint: str) -> None:
+    """Pickle the matcher with a header; written atomically (tmp file + rename)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("wb") as f:
+        pickle.dump({"version": CACHE_VERSION, "fingerprint": fingerprint}, f,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(matcher, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def load_matcher(path: Path, fingerprint: str) -> Optional[NameMatcher]:
+    """
+    Return the cached matcher if `path` holds one built for `fingerprint`
+    with the current CACHE_VERSION, else None. Only the small header is
+    read when the cache is stale.
+    """
+    if not path.exists():
+        return None
+    try:
+        with path.open("rb") as f:
+            header = pickle.load(f)
+            if (not isinstance(header, dict)
+                    or header.get("version") != CACHE_VERSION
+                    or header.get("fingerprint") != fingerprint):
+                return None
+            matcher = pickle.load(f)
+    except Exception as e:
+        # truncated file, missing optional backend, ...: just rebuild
+        print(f"[WARN] Ignoring unreadable matcher cache {path}: {e}")
+        return None
+    return matcher if isinstance(matcher, NameMatcher) else None
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Vector retrieval straight from Neo4j over Chunk.textEmbedding.
+
+Chunks already carry a normalized all-MiniLM-L6-v2 embedding from ingest, so
+the question is embedded locally with the same model and matched with
+db.index.vector.queryNodes on the 'chunk_embedding' vector index (created on
+first use). The same query expands each hit through the graph: its Article
+title, the Place/Person/Concept nodes it MENTIONS and, optionally, its
+NEXT-chain neighbours, so there is one round trip and no second datastore or
+paid embedding call on the query path.
+
+Used by graphrag_eval.py / graphrag_eval_csv.py when VECTOR_RETRIEVER=neo4j.
+"""
+
+from typing import Any, Dict, List
+
+from graph_schema import ensure_indexes
+
+DEFAULT_EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"  # same as ingest_articles
+VECTOR_INDEX_NAME = "chunk_embedding"
+VECTOR_DIMENSIONS = 384
+
+CHUNK_VECTOR_INDEX = (
+    VECTOR_INDEX_NAME,
+    f"CREATE VECTOR INDEX {VECTOR_INDEX_NAME} IF NOT EXISTS "
+    "FOR (c:Chunk) ON (c.textEmbedding) "
+    "OPTIONS {indexConfig: {`vector.dimensions`: %d, "
+    "`vector.similarity_function`: 'cosine'}}" % VECTOR_DIMENSIONS,
+)
+
+CYPHER_VECTOR_SEARCH = """
+CALL db.index.vector.queryNodes($index, $k, $embedding) YIELD node AS c, score
+OPTIONAL MATCH (a:Article)-[:HAS_CHUNK]->(c)
+OPTIONAL MATCH (c)-[:MENTIONS]->(e)
+WITH c, score, a, collect(DISTINCT coalesce(e.title, e.name))[..$max_mentions] AS mentions
+OPTIONAL MATCH (prev:Chunk)-[:NEXT]->(c)
+OPTIONAL MATCH (c)-[:NEXT]->(next:Chunk)
+RETURN c.chunkId AS chunkId, c.text AS text, score,
+       a.title AS article_title, mentions,
+       CASE WHEN $neighbours THEN prev.text END AS prev_text,
+       CASE WHEN $neighbours THEN next.text END AS next_text
+ORDER BY score DESC
+"""
+
+
+class Neo4jVectorRetriever:
+    def __init__(self, driver, database: str, embedder=None,
+                 model_name: str = DEFAULT_EMBED_MODEL, k: int = 8,
+                 neighbours: bool = False, max_mentions: int = 10, limiter=None):
+        if embedder is None:
+            from sentence_transformers import SentenceTransformer
+            embedder = SentenceTransformer(model_name)
+        self.driver = driver
+        self.database = database
+        self.embedder = embedder
+        self.k = k
+        self.neighbours = neighbours
+        self.max_mentions = max_mentions
+        self.limiter = limiter  # optional TokenBucket shared with other Neo4j reads
+        # read-only eval: create just the vector index, never the ingest schema
+        ensure_indexes(driver, database, [CHUNK_VECTOR_INDEX])
+
+    def embed(self, text: str) -> List[float]:
+        vec = self.embedder.encode([text], normalize_embeddings=True)[0]
+        return [float(x) for x in vec]
+
+    def search(self, question: str, k: int = None) -> List[Dict[str, Any]]:
+        embedding = self.embed(question)
+        if self.limiter is not None:
+            self.limiter.acquire()
+        with self.driver.session(database=self.database) as session:
+            result = session.run(
+                CYPHER_VECTOR_SEARCH,
+                index=VECTOR_INDEX_NAME,
+                k=k or self.k,
+                embedding=embedding,
+                max_mentions=self.max_mentions,
+                neighbours=self.neighbours,
+            )
+            return [r.data() for r in result]
+
+    def get_context(self, question: str, max_docs: int = None) -> str:
+        """Context block in the same shape as the graph context: '[Article title]\\ntext'."""
+        texts = []
+        for row in self.search(question, max_docs):
+            text = "\n".join(t.strip() for t in (row.get("prev_text"), row.get("text"),
+                                                 row.get("next_text")) if t and t.strip())
+            if not text:
+                continue
+            header = []
+            if row.get("article_title"):
+                header.append(f"[{row['article_title'].strip()}]")
+            if row.get("mentions"):
+                header.append("Mentions: " + ", ".join(m for m in row["mentions"] if m))
+            texts.append("\n".join(header + [text]))
+        return "\n\n".join(texts)
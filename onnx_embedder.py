@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+CPU embedder backed by a dynamically quantized (int8) ONNX export of a
+sentence-transformers model (--embed-backend onnx-int8).
+
+- First use exports the Hugging Face encoder with torch.onnx, quantizes the
+  weights to int8 with onnxruntime.quantization.quantize_dynamic and stores
+  both under <cache-dir>/<model>/ next to the tokenizer.
+- The int8 model is compared with the fp32 SentenceTransformer on a few
+  sample sentences; if the minimum cosine similarity is below
+  AGREEMENT_THRESHOLD the export is rejected. The result is stored in
+  agreement.json with the int8 file's sha256, and an existing int8 file is
+  only used unchecked when that record is present, passing and matches it
+  (an export interrupted before the check is verified on the next start).
+- encode() mirrors SentenceTransformer.encode(): mean pooling over the
+  attention mask, optional L2 normalization, float32 numpy output.
+
+Needs onnxruntime (pip install onnxruntime); torch and transformers are only
+needed for the one-time export.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+try:
+    import onnxruntime as ort  # optional (pip install onnxruntime)
+except ImportError:
+    ort = None
+
+DEFAULT_ONNX_DIR = Path(".cache") / "onnx"
+MAX_SEQ_LENGTH = 256  # all-MiniLM-L6-v2 max_seq_length in sentence-transformers
+AGREEMENT_THRESHOLD = 0.99  # min cosine(int8, fp32) accepted at export time
+
+SAMPLE_SENTENCES = [
+    "The sanctuary of Apollo at Delphi was consulted by cities across the Greek world.",
+    "Ptolemy's Tetrabiblos assigns terms, exaltations and triplicities to the planets.",
+    "Excavations at Dura-Europos uncovered a synagogue, a church and a Mithraeum.",
+    "Papyri from Oxyrhynchus preserve contracts, letters and horoscopes.",
+    "The road from Antioch to Palmyra crossed the desert steppe.",
+    "Alexander Jones discusses the astronomical cuneiform texts of the Seleucid period.",
+]
+
+
+def cosine_rows(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Row-wise cosine similarity of two equally shaped matrices."""
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    num = (a * b).sum(axis=1)
+    den = np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1)
+    return num / np.maximum(den, 1e-12)
+
+
+def _model_dir(model_name: str, cache_dir: Path) -> Path:
+    return Path(cache_dir) / model_name.replace("/", "__")
+
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _agreement_ok(info_path: Path, int8_path: Path) -> bool:
+    """True when agreement.json records a passing check of this exact int8 file."""
+    try:
+        info = json.loads(info_path.read_text())
+        return (float(info["min_cosine"]) >= AGREEMENT_THRESHOLD
+                and info.get("sha256") == _sha256(int8_path))
+    except (OSError, ValueError, KeyError, TypeError):
+        return False
+
+
+def export_int8(model_name: str, out_dir: Path) -> Path:
+    """Export `model_name` to ONNX, quantize it dynamically to int8 and return the int8 path."""
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoTokenizer
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    fp32_path = out_dir / "model.onnx"
+    int8_path = out_dir / "model.int8.onnx"
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+    tokenizer.save_pretrained(str(out_dir))
+
+    sample = tokenizer(SAMPLE_SENTENCES[:2], padding=True, truncation=True,
+                       max_length=MAX_SEQ_LENGTH, return_tensors="pt")
+    input_names = [k for k in ("input_ids", "attention_mask", "token_type_ids") if k in sample]
+    dynamic = {k: {0: "batch", 1: "seq"} for k in input_names}
+    dynamic["last_hidden_state"] = {0: "batch", 1: "seq"}
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[k] for k in input_names),
+            str(fp32_path),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic,
+            opset_version=14,
+        )
+    quantize_dynamic(str(fp32_path), str(int8_path), weight_type=QuantType.QInt8)
+    return int8_path
+
+
+class OnnxEmbedder:
+    def __init__(self, model_name: str, cache_dir=DEFAULT_ONNX_DIR,
+                 threads: Optional[int] = None, max_seq_length: int = MAX_SEQ_LENGTH):
+        if ort is None:
+            raise RuntimeError("onnxruntime is not installed (pip install onnxruntime).")
+        from transformers import AutoTokenizer
+
+        self.model_name = model_name
+        self.max_seq_length = max_seq_length
+        out_dir = _model_dir(model_name, cache_dir)
+        int8_path = out_dir / "model.int8.onnx"
+        info_path = out_dir / "agreement.json"
+        if not int8_path.exists():
+            info_path.unlink(missing_ok=True)
+            print(f"Exporting {model_name} to int8 ONNX in {out_dir} ...")
+            export_int8(model_name, out_dir)
+        verified = _agreement_ok(info_path, int8_path)
+
+        opts = ort.SessionOptions()
+        if threads:
+            opts.intra_op_num_threads = threads
+        opts.inter_op_num_threads = 1
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(str(int8_path), opts, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(str(out_dir))
+
+        if not verified:
+            min_cos = self.check_agreement()
+            if min_cos < AGREEMENT_THRESHOLD:
+                int8_path.unlink()
+                info_path.unlink(missing_ok=True)
+                raise RuntimeError(
+                    f"int8 ONNX model disagrees with fp32 (min cosine {min_cos:.4f} "
+                    f"< {AGREEMENT_THRESHOLD}); export removed."
+                )
+            # written only after a passing check, atomically
+            tmp = info_path.with_name(info_path.name + ".tmp")
+            tmp.write_text(json.dumps({"min_cosine": min_cos, "threshold": AGREEMENT_THRESHOLD,
+                                       "sha256": _sha256(int8_path)}))
+            os.replace(tmp, info_path)
+            print(f"int8 ONNX agreement with fp32: min cosine {min_cos:.4f}")
+
+    def check_agreement(self, texts: Sequence[str] = SAMPLE_SENTENCES) -> float:
+        """Minimum cosine similarity between this model and the fp32 SentenceTransformer."""
+        from sentence_transformers import SentenceTransformer
+
+        ref = SentenceTransformer(self.model_name).encode(list(texts), normalize_embeddings=True)
+        return float(cosine_rows(self.encode(list(texts)), ref).min())
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        enc = self.tokenizer(texts, padding=True, truncation=True,
+                             max_length=self.max_seq_length, return_tensors="np")
+        feeds = {k: v.astype(np.int64) for k, v in enc.items() if k in self.input_names}
+        hidden = self.session.run(None, feeds)[0]
+        mask = enc["attention_mask"][..., None].astype(np.float32)
+        return (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+    def encode(self, sentences, batch_size: int = 32, show_progress_bar: bool = False,
+               normalize_embeddings: bool = False, **_) -> np.ndarray:
+        """Same call shape as SentenceTransformer.encode() for a list of texts."""
+        texts = list(sentences)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        # length-sorted batches pad less; results are put back in input order
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        starts = range(0, len(texts), batch_size)
+        if show_progress_bar:
+            from tqdm import tqdm
+            starts = tqdm(starts, desc="Batches")
+        parts = []
+        for start in starts:
+            idx = order[start:start + batch_size]
+            parts.append(self._embed_batch([texts[i] for i in idx]))
+        emb = np.vstack(parts).astype(np.float32)
+        if normalize_embeddings:
+            emb /= np.maximum(np.linalg.norm(emb, axis=1, keepdims=True), 1e-12)
+        out = np.empty_like(emb)
+        out[order] = emb
+        return out
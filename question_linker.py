@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+LLM-free graph retrieval for eval questions.
+
+The question is scanned with one NameMatcher (the Aho-Corasick matcher of the
+chunk -> place linker) over the graph's entity dictionaries:
+
+- Place: title + altNames (same cleaning as link_chunks_to_places)
+- Person: name + aliases
+- Concept: name, except stopword-only phrases ("the one", "it") and
+  Concepts mentioned by more than CONCEPT_MAX_CHUNK_SHARE of all chunks
+- Article: title
+
+Recognized entities fill fixed, parameterized Cypher templates (chunks of
+article Y, chunks by author Z, chunks mentioning person/place/concept X).
+Chunks hit by several entities rank first. get_graph_context() in the eval
+scripts only asks the LLM for Cypher when nothing is recognized or the
+templates return no rows. A Concept alone is too weak for that
+(preempts_llm): the LLM goes first and the Concept rows are only a fallback.
+PathStats reports hit rate and latency per path.
+
+The matcher is cached on disk (save_matcher/load_matcher), keyed by a
+checksum of the dictionary rows.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from link_chunks_to_places import place_names_from_rows
+from name_matcher import NameMatcher, load_matcher, save_matcher
+
+DEFAULT_QUESTION_MATCHER_CACHE = Path(".cache") / "question_matcher.pkl"
+MIN_NAME_LEN = 3
+# Concepts found in more than this share of all chunks ("city", "time") say
+# nothing about which chunks a question wants
+CONCEPT_MAX_CHUNK_SHARE = float(os.getenv("CONCEPT_MAX_CHUNK_SHARE", "0.02"))
+CONCEPT_STOPWORDS = frozenset("""
+a about after all also an and any are as at be been before but by can could did do does
+each for from had has have he her his how i if in into is it its may more most much my
+no not of on one only or other our own same she so some such than that the their them
+then there these they this those through to too two under up very was we were what when
+where which while who whom why will with would you your
+""".split())
+
+CYPHER_PLACE_NAMES = """
+MATCH (p:Place)
+RETURN p.pleiadesId AS pid, p.title AS title, coalesce(p.altNames, []) AS alts
+"""
+CYPHER_PERSON_NAMES = """
+MATCH (p:Person) WHERE p.name IS NOT NULL
+RETURN p.name AS name, coalesce(p.aliases, []) AS aliases
+"""
+CYPHER_CONCEPT_NAMES = """
+MATCH (k:Concept) WHERE k.name IS NOT NULL
+OPTIONAL MATCH (c:Chunk)-[:MENTIONS]->(k)
+RETURN k.name AS name, count(c) AS chunks
+"""
+CYPHER_CHUNK_COUNT = "MATCH (c:Chunk) RETURN count(c) AS n"
+CYPHER_ARTICLE_TITLES = """
+MATCH (a:Article) WHERE a.title IS NOT NULL
+RETURN a.articleId AS aid, a.title AS title
+"""
+
+# label -> [(template name, Cypher)]; every template takes $ids and $limit and
+# returns article_title / text_chunk like the LLM-generated Cypher
+TEMPLATES: Dict[str, List[Tuple[str, str]]] = {
+    "Article": [("article-chunks", """
+        MATCH (a:Article)-[:HAS_CHUNK]->(c:Chunk)
+        WHERE a.articleId IN $ids
+        RETURN a.title AS article_title, c.text AS text_chunk
+        ORDER BY a.articleId, c.seq
+        LIMIT $limit
+    """)],
+    "Person": [("author-chunks", """
+        MATCH (p:Person)-[:AUTHORED]->(a:Article)-[:HAS_CHUNK]->(c:Chunk)
+        WHERE p.name IN $ids
+        RETURN a.title AS article_title, c.text AS text_chunk
+        ORDER BY a.articleId, c.seq
+        LIMIT $limit
+    """), ("person-mentions", """
+        MATCH (c:Chunk)-[:MENTIONS]->(p:Person)
+        WHERE p.name IN $ids
+        OPTIONAL MATCH (a:Article)-[:HAS_CHUNK]->(c)
+        RETURN a.title AS article_title, c.text AS text_chunk
+        LIMIT $limit
+    """)],
+    "Place": [("place-mentions", """
+        MATCH (c:Chunk)-[:MENTIONS]->(p:Place)
+        WHERE p.pleiadesId IN $ids
+        OPTIONAL MATCH (a:Article)-[:HAS_CHUNK]->(c)
+        RETURN a.title AS article_title, c.text AS text_chunk
+        LIMIT $limit
+    """)],
+    "Concept": [("concept-mentions", """
+        MATCH (c:Chunk)-[:MENTIONS]->(k:Concept)
+        WHERE k.name IN $ids
+        OPTIONAL MATCH (a:Article)-[:HAS_CHUNK]->(c)
+        RETURN a.title AS article_title, c.text AS text_chunk
+        LIMIT $limit
+    """)],
+}
+
+# Proper-noun dictionaries only match capitalized text in the question, so
+# Pleiades names that are also English words ("Bath", "Nice") stay quiet
+CAPITALIZED_LABELS = {"Place", "Person"}
+# Labels whose matches alone don't skip LLM-generated Cypher
+WEAK_LABELS = {"Concept"}
+
+
+def is_stopword_phrase(name: str) -> bool:
+    return all(w in CONCEPT_STOPWORDS for w in name.lower().split())
+
+
+def fetch_entity_entries(query: Callable[..., List[Dict[str, Any]]]) -> List[Tuple[Tuple[str, Any], str]]:
+    """((label, id), name) entries for the question matcher; `query` is e.g. Neo4jGraph.query."""
+    entries: List[Tuple[Tuple[str, Any], str]] = []
+    place_rows = [(r["pid"], r["title"], r["alts"]) for r in query(CYPHER_PLACE_NAMES)]
+    entries += [(("Place", pid), name) for pid, name in place_names_from_rows(place_rows)]
+    for r in query(CYPHER_PERSON_NAMES):
+        names = {r["name"]} | {a for a in r["aliases"] if isinstance(a, str)}
+        entries += [(("Person", r["name"]), n.strip()) for n in sorted(names)]
+    max_chunks = CONCEPT_MAX_CHUNK_SHARE * query(CYPHER_CHUNK_COUNT)[0]["n"]
+    entries += [(("Concept", r["name"]), r["name"].strip()) for r in query(CYPHER_CONCEPT_NAMES)
+                if r["chunks"] <= max_chunks and not is_stopword_phrase(r["name"])]
+    entries += [(("Article", r["aid"]), r["title"].strip()) for r in query(CYPHER_ARTICLE_TITLES)]
+    return [(key, name) for key, name in entries if len(name) >= MIN_NAME_LEN]
+
+
+def fingerprint_entries(entries: Sequence[Tuple[Tuple[str, Any], str]]) -> str:
+    h = hashlib.sha1()
+    for entry in sorted(json.dumps(e, ensure_ascii=False, default=str) for e in entries):
+        h.update(entry.encode("utf-8"))
+        h.update(b"\n")
+    return f"entities:{len(entries)}:{h.hexdigest()}"
+
+
+def load_question_matcher(query, cache_path=DEFAULT_QUESTION_MATCHER_CACHE) -> NameMatcher:
+    entries = fetch_entity_entries(query)
+    fingerprint = fingerprint_entries(entries)
+    if cache_path:
+        matcher = load_matcher(Path(cache_path), fingerprint)
+        if matcher is not None:
+            return matcher
+    matcher = NameMatcher(entries)
+    if cache_path:
+        save_matcher(Path(cache_path), matcher, fingerprint)
+    return matcher
+
+
+class PathStats:
+    """Thread-safe count and latency per retrieval path ('linked', 'llm', ...)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {}
+        self.seconds: Dict[str, float] = {}
+
+    def record(self, path: str, seconds: float) -> None:
+        with self._lock:
+            self.counts[path] = self.counts.get(path, 0) + 1
+            self.seconds[path] = self.seconds.get(path, 0.0) + seconds
+
+    def report(self) -> str:
+        total = sum(self.counts.values())
+        parts = []
+        for path in sorted(self.counts):
+            n = self.counts[path]
+            parts.append(f"{path}={n}/{total} ({n / total:.1%}, mean {self.seconds[path] / n:.2f}s)")
+        return "[graph-path] " + ("; ".join(parts) if parts else "no questions")
+
+
+class QuestionLinker:
+    def __init__(self, matcher: NameMatcher, query: Callable[..., List[Dict[str, Any]]]):
+        self.matcher = matcher
+        self.query = query
+
+    @classmethod
+    def from_graph(cls, query, cache_path=DEFAULT_QUESTION_MATCHER_CACHE) -> "QuestionLinker":
+        return cls(load_question_matcher(query, cache_path), query)
+
+    def link(self, question: str) -> Dict[str, List[Any]]:
+        """{label: [ids]} recognized in the question, longest matches only."""
+        spans = []
+        for pid, start, end in self.matcher.iter_matches(question):
+            spans.append((start, end, pid))
+        # drop matches inside a longer one ("Alexandria" within "Alexandria Troas")
+        spans.sort(key=lambda s: (s[0], -(s[1] - s[0])))
+        kept, last_end = [], -1
+        for start, end, pid in spans:
+            if end <= last_end:
+                continue
+            kept.append((start, pid))
+            last_end = end
+
+        linked: Dict[str, List[Any]] = {}
+        for start, pid in kept:
+            for idx in self.matcher.pattern_entries(pid):
+                (label, key), _ = self.matcher.entries[idx]
+                if label in CAPITALIZED_LABELS and not question[start].isupper():
+                    continue
+                ids = linked.setdefault(label, [])
+                if key not in ids:
+                    ids.append(key)
+        return linked
+
+    @staticmethod
+    def preempts_llm(linked: Dict[str, List[Any]]) -> bool:
+        """True when `linked` holds more than weak (Concept-only) matches."""
+        return any(ids for label, ids in linked.items() if label not in WEAK_LABELS)
+
+    def fetch_rows(self, linked: Dict[str, List[Any]], limit: int = 20) -> List[Dict[str, Any]]:
+        """Template rows for the linked entities; chunks hit by more templates come first."""
+        hits: Dict[str, int] = {}
+        rows: Dict[str, Dict[str, Any]] = {}
+        for label, templates in TEMPLATES.items():
+            ids = linked.get(label)
+            if not ids:
+                continue
+            for _, cypher in templates:
+                for row in self.query(cypher, {"ids": ids, "limit": limit}):
+                    text = row.get("text_chunk")
+                    if not text:
+                        continue
+                    hits[text] = hits.get(text, 0) + 1
+                    rows.setdefault(text, row)
+        ranked = sorted(rows, key=lambda t: -hits[t])  # stable: template order breaks ties
+        return [rows[t] for t in ranked[:limit]]
@@ -20,6 +20,8 @@ from dotenv import load_dotenv
 from neo4j import GraphDatabase
 import spacy
 
+from graph_schema import ensure_schema
+
 # -----------------------------
 # Config
 # -----------------------------
@@ -145,6 +147,7 @@ def main():
         raise SystemExit("Neo4j password missing (NEO4J_PASSWORD or NEO4J_PASS).")
 
     driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS))
+    ensure_schema(driver, NEO4J_DB)
     with driver.session(database=NEO4J_DB) as session:
         print(f"Connected to Neo4j DB='{NEO4J_DB}' at {NEO4J_URI} as user='{NEO4J_USER}'")
 
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Persistent HTTP response cache shared by the Wikidata jobs
+(wd_enrich_places.py, wd_link_label_entities.py).
+
+- One SQLite file, one row per (namespace, normalized request key).
+- Values are stored as JSON, including empty results, so identifiers that
+  had no match are not asked again on the next run (negative caching).
+- Entries older than `ttl` seconds are treated as misses (ttl <= 0: never expire).
+- offline=True: never touch the network; stale entries are still served and
+  callers skip (or raise OfflineMiss for) anything not in the cache.
+- Safe to share between threads (one connection guarded by a lock).
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Tuple
+
+DEFAULT_CACHE_PATH = os.getenv("WD_CACHE_PATH", str(Path(".cache") / "wikidata_http.sqlite"))
+DEFAULT_TTL_DAYS = float(os.getenv("WD_CACHE_TTL_DAYS", "30"))
+
+MISS = object()
+
+
+class OfflineMiss(LookupError):
+    """Raised when a request is not cached and the cache is in offline mode."""
+
+
+def normalize_key(*parts: Any) -> str:
+    """Stable text key for a request: strings are stripped and whitespace-collapsed."""
+    norm = [" ".join(p.split()) if isinstance(p, str) else p for p in parts]
+    return json.dumps(norm, ensure_ascii=False, separators=(",", ":"))
+
+
+class ResponseCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl: float = DEFAULT_TTL_DAYS * 86400,
+                 offline: bool = False):
+        self.path = Path(path)
+        self.ttl = float(ttl)
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                ns TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (ns, key)
+            ) WITHOUT ROWID
+        """)
+        self._conn.commit()
+
+    def _fresh(self, fetched_at: float) -> bool:
+        return self.offline or self.ttl <= 0 or time.time() - fetched_at < self.ttl
+
+    def get(self, ns: str, key: str) -> Any:
+        """Cached value, or MISS."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, fetched_at FROM responses WHERE ns = ? AND key = ?", (ns, key)
+            ).fetchone()
+            if row is None or not self._fresh(row[1]):
+                self.misses += 1
+                return MISS
+            self.hits += 1
+        return json.loads(row[0])
+
+    def get_many(self, ns: str, keys: Iterable[str]) -> Dict[str, Any]:
+        """{key: value} for the keys that are cached and fresh."""
+        found: Dict[str, Any] = {}
+        for key in keys:
+            value = self.get(ns, key)
+            if value is not MISS:
+                found[key] = value
+        return found
+
+    def put(self, ns: str, key: str, value: Any) -> None:
+        self.put_many(ns, [(key, value)])
+
+    def put_many(self, ns: str, items: Iterable[Tuple[str, Any]]) -> None:
+        now = time.time()
+        rows = [(ns, key, json.dumps(value, ensure_ascii=False), now) for key, value in items]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO responses (ns, key, value, fetched_at) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def report(self) -> str:
+        total = self.hits + self.misses
+        ratio = self.hits / total if total else 0.0
+        mode = "offline" if self.offline else "online"
+        return f"[cache] {self.path} ({mode}): hits={self.hits} misses={self.misses} hit_ratio={ratio:.1%}"
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Cached graph schema for the eval scripts and graph_schema_check.py.
+
+Neo4jGraph.refresh_schema() introspects every label and relationship type,
+which is slow on the full graph and was run at every start. Instead:
+
+- fingerprint: per-label node counts and per-type relationship counts (count
+  store lookups), the property key list and SHOW CONSTRAINTS, hashed
+- snapshot: .cache/graph_schema.json holding the fingerprint, kg.schema,
+  kg.structured_schema and a compact schema; refresh_schema() only runs when
+  the fingerprint differs from the stored one
+- compact: one line per label / relationship pattern, without embedding
+  properties (textEmbedding), for the Cypher-generation prompt
+
+Create the graph with Neo4jGraph(..., refresh_schema=False) and call
+load_schema_snapshot(kg) to fill kg.schema / kg.structured_schema.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List
+
+DEFAULT_SCHEMA_SNAPSHOT = Path(os.getenv("GRAPH_SCHEMA_SNAPSHOT", str(Path(".cache") / "graph_schema.json")))
+
+# properties never shown in the compact schema (vectors are useless in a prompt)
+EXCLUDED_PROPERTIES = {"textEmbedding"}
+
+
+def _quote(name: str) -> str:
+    return "`" + name.replace("`", "``") + "`"
+
+
+def graph_fingerprint(kg) -> str:
+    """Hash of label/relationship-type counts, property keys and constraints."""
+    labels = sorted(r["label"] for r in kg.query("CALL db.labels() YIELD label RETURN label"))
+    rel_types = sorted(r["relationshipType"] for r in kg.query(
+        "CALL db.relationshipTypes() YIELD relationshipType RETURN relationshipType"))
+    state = {
+        "labels": {
+            label: kg.query(f"MATCH (n:{_quote(label)}) RETURN count(n) AS n")[0]["n"]
+            for label in labels
+        },
+        "relationships": {
+            rel: kg.query(f"MATCH ()-[r:{_quote(rel)}]->() RETURN count(r) AS n")[0]["n"]
+            for rel in rel_types
+        },
+        "propertyKeys": sorted(r["propertyKey"] for r in kg.query(
+            "CALL db.propertyKeys() YIELD propertyKey RETURN propertyKey")),
+        "constraints": sorted(
+            json.dumps(r, sort_keys=True, default=str) for r in kg.query(
+                "SHOW CONSTRAINTS YIELD name, type, labelsOrTypes, properties "
+                "RETURN name, type, labelsOrTypes, properties")
+        ),
+    }
+    digest = hashlib.sha1(json.dumps(state, sort_keys=True).encode("utf-8")).hexdigest()
+    return f"{sum(state['labels'].values())}n:{sum(state['relationships'].values())}r:{digest}"
+
+
+def _props(props: List[Dict[str, Any]]) -> str:
+    names = [p["property"] for p in props if p.get("property") not in EXCLUDED_PROPERTIES]
+    return ", ".join(sorted(names))
+
+
+def compact_schema(structured: Dict[str, Any]) -> str:
+    """Short schema text from Neo4jGraph.structured_schema, embeddings left out."""
+    lines = ["Node labels and properties:"]
+    for label, props in sorted(structured.get("node_props", {}).items()):
+        lines.append(f"  {label}({_props(props)})")
+    rel_props = structured.get("rel_props", {})
+    lines.append("Relationships:")
+    patterns = sorted({(r["start"], r["type"], r["end"]) for r in structured.get("relationships", [])})
+    for start, rel, end in patterns:
+        props = _props(rel_props.get(rel, []))
+        rel_txt = f"{rel} {{{props}}}" if props else rel
+        lines.append(f"  (:{start})-[:{rel_txt}]->(:{end})")
+    return "\n".join(lines)
+
+
+def load_schema_snapshot(kg, path=DEFAULT_SCHEMA_SNAPSHOT, refresh: bool = False) -> Dict[str, Any]:
+    """
+    Set kg.schema / kg.structured_schema from the snapshot at `path`, running
+    kg.refresh_schema() (and rewriting the snapshot) only when the graph
+    fingerprint changed or refresh=True. Returns the snapshot dict.
+    """
+    path = Path(path)
+    fingerprint = graph_fingerprint(kg)
+    snapshot = None
+    if path.exists() and not refresh:
+        try:
+            snapshot = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            print(f"[WARN] Ignoring unreadable schema snapshot {path}: {e}")
+        if snapshot and snapshot.get("fingerprint") != fingerprint:
+            snapshot = None
+
+    if snapshot is None:
+        print(f"Refreshing graph schema ({fingerprint})")
+        kg.refresh_schema()
+        snapshot = {
+            "fingerprint": fingerprint,
+            "schema": kg.schema,
+            "structured_schema": kg.structured_schema,
+            "compact": compact_schema(kg.structured_schema),
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(json.dumps(snapshot, ensure_ascii=False, indent=2, default=str), encoding="utf-8")
+        os.replace(tmp, path)
+    else:
+        print(f"Using cached graph schema {path} ({fingerprint})")
+        kg.schema = snapshot["schema"]
+        kg.structured_schema = snapshot["structured_schema"]
+    return snapshot
@@ -0,0 +1,77 @@
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+# the scripts are top-level modules in the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+class StubRequest:
+    def __init__(self, method, path, query, body):
+        self.method = method
+        self.path = path
+        self.query = query  # {name: value}, first value of each parameter
+        self.body = body    # raw request body (str)
+
+    def json(self):
+        return json.loads(self.body)
+
+    def form(self):
+        return {k: v[0] for k, v in parse_qs(self.body).items()}
+
+
+@pytest.fixture
+def stub_server():
+    """
+    start(handler) runs a local HTTP server in a thread and returns its base URL.
+    handler(StubRequest) returns (status, body) or (status, body, headers); a
+    dict/list body is sent as JSON. server.requests lists every StubRequest.
+    """
+    servers = []
+
+    def start(handler):
+        requests = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def _handle(self):
+                url = urlsplit(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length).decode("utf-8") if length else ""
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                request = StubRequest(self.command, url.path, query, body)
+                requests.append(request)
+                status, payload, *rest = handler(request)
+                headers = rest[0] if rest else {}
+                if not isinstance(payload, (str, bytes)):
+                    payload = json.dumps(payload)
+                    headers = {"Content-Type": "application/json", **headers}
+                data = payload.encode("utf-8") if isinstance(payload, str) else payload
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = _handle
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        server.daemon_threads = True
+        server.requests = requests
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        start.server = server
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,99 @@
+import json
+import time
+
+import pytest
+
+import graphrag_eval
+from llm_cache import LLMCache
+
+QUESTIONS = [{"instruction": f"Question {i}?", "output": f"Reference {i}"} for i in range(4)]
+
+
+def chat_completion(content, model="gpt-4"):
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": 0,
+        "model": model,
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": content}}],
+        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+    }
+
+
+def fake_openai(request):
+    """Chat-completions stub: grading prompts score 8, others answer the question asked."""
+    assert request.path.endswith("/chat/completions")
+    prompt = request.json()["messages"][-1]["content"]
+    if "Score (1-10):" in prompt:
+        return 200, chat_completion("8", "gpt-4-turbo")
+    asked = next(q["instruction"] for q in QUESTIONS if f"Question: {q['instruction']}" in prompt)
+    if asked == "Question 0?":
+        time.sleep(0.3)  # finishes after the questions submitted behind it
+    return 200, chat_completion(f"Answer to {asked}")
+
+
+@pytest.fixture
+def evaluator(stub_server, tmp_path):
+    base_url = stub_server(fake_openai) + "/v1"
+    evaluator = graphrag_eval.HybridEvaluator(
+        LLMCache(tmp_path / "llm.sqlite", mode="off"),
+        graph_context=lambda q: f"[Article]\ngraph chunk for {q}",
+        vector_context=lambda q: "",
+        concurrency=3,
+        api_key="test",
+        base_url=base_url,
+    )
+    yield evaluator
+    evaluator.close()
+
+
+def asked_questions(requests):
+    return sorted(q["instruction"] for q in QUESTIONS
+                  for r in requests if f"Question: {q['instruction']}" in r.body
+                  and "Score (1-10)" not in r.body)
+
+
+def test_results_saved_in_index_order_and_resumed(evaluator, stub_server, tmp_path):
+    results_json = tmp_path / "results.json"
+    results_csv = tmp_path / "results.csv"
+    done = {"index": 1, "question": "Question 1?", "correct_answer": "Reference 1",
+            "hybrid_answer": "from an earlier run", "score_hybrid": 3}
+    results_json.write_text(json.dumps([done]), encoding="utf-8")
+
+    records = graphrag_eval.run_eval(evaluator, QUESTIONS, batch_size=2, concurrency=3,
+                                     results_json=str(results_json), results_csv=str(results_csv))
+
+    assert [r["index"] for r in records] == [0, 2]
+    assert records[0]["hybrid_answer"] == "Answer to Question 0?"
+    assert records[0]["score_hybrid"] == 8
+    saved = json.loads(results_json.read_text(encoding="utf-8"))
+    assert [r["index"] for r in saved] == [0, 1, 2]
+    assert saved[1] == done
+    assert asked_questions(stub_server.server.requests) == ["Question 0?", "Question 2?"]
+
+    stub_server.server.requests.clear()
+    records = graphrag_eval.run_eval(evaluator, QUESTIONS, batch_size=2, concurrency=3,
+                                     results_json=str(results_json), results_csv=str(results_csv))
+    assert [r["index"] for r in records] == [3]
+    assert asked_questions(stub_server.server.requests) == ["Question 3?"]
+    saved = json.loads(results_json.read_text(encoding="utf-8"))
+    assert [r["index"] for r in saved] == [0, 1, 2, 3]
+    assert results_csv.read_text(encoding="utf-8").count("\n") == 5  # header + 4 rows
+
+    stub_server.server.requests.clear()
+    assert graphrag_eval.run_eval(evaluator, QUESTIONS, results_json=str(results_json),
+                                  results_csv=str(results_csv)) == []
+    assert stub_server.server.requests == []
+
+
+def test_no_context_answers_without_a_call(stub_server, tmp_path):
+    base_url = stub_server(fake_openai) + "/v1"
+    evaluator = graphrag_eval.HybridEvaluator(
+        LLMCache(tmp_path / "llm.sqlite", mode="off"), graph_context=lambda q: "",
+        vector_context=lambda q: "", api_key="test", base_url=base_url)
+    try:
+        assert evaluator.answer_with_hybrid("Question 0?").startswith("I don't have enough information")
+    finally:
+        evaluator.close()
+    assert stub_server.server.requests == []
@@ -0,0 +1,63 @@
+import gzip
+import json
+
+import pytest
+
+from ingest_pleiades import detect_container, iter_pleiades_places
+
+
+def place(pid):
+    """Pleiades place record, with its own FeatureCollection-style "features" list."""
+    return {
+        "id": str(pid),
+        "uri": f"https://pleiades.stoa.org/places/{pid}",
+        "type": "FeatureCollection",
+        "title": f"Place {pid}",
+        "features": [{"type": "Feature", "properties": {"title": f"Location of {pid}"}}],
+        "names": [{"romanized": f"Place {pid}"}],
+    }
+
+
+def write(path, text):
+    if path.suffix == ".gz":
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        path.write_text(text, encoding="utf-8")
+    return path
+
+
+def titles(path):
+    return [p["title"] for p in iter_pleiades_places(path, backend="auto")]
+
+
+@pytest.mark.parametrize("name", ["places.ndjson", "places.ndjson.gz"])
+def test_single_record_ndjson_yields_the_place(tmp_path, name):
+    path = write(tmp_path / name, json.dumps(place(1)) + "\n")
+    assert detect_container(path) == "ndjson"
+    assert titles(path) == ["Place 1"]
+
+
+def test_ndjson_records_with_features(tmp_path):
+    path = write(tmp_path / "places.ndjson", "\n".join(json.dumps(place(i)) for i in range(3)) + "\n")
+    assert detect_container(path) == "ndjson"
+    assert titles(path) == ["Place 0", "Place 1", "Place 2"]
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_feature_collection_container(tmp_path, indent):
+    doc = {"type": "FeatureCollection",
+           "features": [{"type": "Feature", "properties": place(i)} for i in range(2)]}
+    path = write(tmp_path / "places.json", json.dumps(doc, indent=indent))
+    assert detect_container(path) == "features"
+    assert titles(path) == ["Place 0", "Place 1"]
+
+
+def test_graph_container_and_array(tmp_path):
+    graph = write(tmp_path / "graph.json", json.dumps({"@context": {}, "@graph": [place(5)]}))
+    assert detect_container(graph) == "@graph"
+    assert titles(graph) == ["Place 5"]
+
+    array = write(tmp_path / "array.json", json.dumps([place(6), place(7)], indent=2))
+    assert detect_container(array) == "array"
+    assert titles(array) == ["Place 6", "Place 7"]
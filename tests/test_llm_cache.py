@@ -0,0 +1,120 @@
+from types import SimpleNamespace
+
+import pytest
+
+from llm_cache import LLMCache, call_key
+from response_cache import OfflineMiss
+
+
+class CountingLimiter:
+    def __init__(self):
+        self.tokens = 0
+
+    def acquire(self):
+        self.tokens += 1
+
+
+class StubClient:
+    """client.chat.completions.create(...) answering 'reply <n>' for the n-th call."""
+
+    def __init__(self):
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **request):
+        self.requests.append(request)
+        message = SimpleNamespace(content=f"reply {len(self.requests)}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+MESSAGES = [{"role": "user", "content": "Where is Ostia?"}]
+
+
+def make_cache(tmp_path, mode, limiter=None, endpoint=None):
+    return LLMCache(tmp_path / "llm.sqlite", mode=mode, limiter=limiter, endpoint=endpoint)
+
+
+def test_off_always_calls(tmp_path):
+    cache, client = make_cache(tmp_path, "off"), StubClient()
+    assert cache.chat_completion(client, "gpt-4", MESSAGES) == "reply 1"
+    assert cache.chat_completion(client, "gpt-4", MESSAGES) == "reply 2"
+    assert cache.calls == 2
+    assert not (tmp_path / "llm.sqlite").exists()
+
+
+def test_read_write_replays_stored_response(tmp_path):
+    cache, client = make_cache(tmp_path, "read-write"), StubClient()
+    assert cache.chat_completion(client, "gpt-4", MESSAGES) == "reply 1"
+    assert cache.chat_completion(client, "gpt-4", MESSAGES) == "reply 1"
+    assert len(client.requests) == 1
+    cache.close()
+
+    reopened = make_cache(tmp_path, "read-write")
+    assert reopened.chat_completion(client, "gpt-4", MESSAGES) == "reply 1"
+    assert len(client.requests) == 1
+
+
+def test_replay_only_serves_hits_and_raises_on_miss(tmp_path):
+    recorder = make_cache(tmp_path, "read-write")
+    recorder.cached("known", lambda: "stored")
+    recorder.close()
+
+    cache = make_cache(tmp_path, "replay-only")
+    assert cache.cached("known", lambda: pytest.fail("replay-only must not call")) == "stored"
+    with pytest.raises(OfflineMiss):
+        cache.cached("unknown", lambda: pytest.fail("replay-only must not call"))
+    assert cache.calls == 0
+
+
+def test_record_overwrites(tmp_path):
+    make_cache(tmp_path, "read-write").cached("k", lambda: "old")
+
+    recorder = make_cache(tmp_path, "record")
+    assert recorder.cached("k", lambda: "new") == "new"
+    assert recorder.calls == 1
+    recorder.close()
+
+    assert make_cache(tmp_path, "read-write").cached("k", lambda: "unused") == "new"
+
+
+def test_unknown_mode_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        make_cache(tmp_path, "sometimes")
+
+
+def test_keys_do_not_collide():
+    base = call_key("gpt-4", 0.0, MESSAGES)
+    assert base == call_key("gpt-4", 0, MESSAGES)
+    assert base != call_key("gpt-4", 0.2, MESSAGES)
+    assert base != call_key("gpt-4o", 0.0, MESSAGES)
+    assert base != call_key("gpt-4", 0.0, [{"role": "user", "content": "Where is Rome?"}])
+    assert base != call_key("gpt-4", 0.0, MESSAGES, max_tokens=5)
+    assert base != call_key("gpt-4", 0.0, MESSAGES, endpoint="http://127.0.0.1:8000/v1")
+    assert (call_key("gpt-4", 0.0, MESSAGES, endpoint="http://127.0.0.1:8000/v1")
+            == call_key("gpt-4", 0.0, MESSAGES, endpoint="http://127.0.0.1:8000/v1/"))
+
+
+def test_endpoints_are_cached_separately(tmp_path):
+    client = StubClient()
+    make_cache(tmp_path, "read-write").chat_completion(client, "gpt-4", MESSAGES)
+    fake = make_cache(tmp_path, "read-write", endpoint="http://127.0.0.1:8000/v1")
+    assert fake.chat_completion(client, "gpt-4", MESSAGES) == "reply 2"
+    assert fake.chat_completion(client, "gpt-4", MESSAGES, temperature=0.5) == "reply 3"
+
+
+def test_hits_take_no_limiter_token(tmp_path):
+    limiter, client = CountingLimiter(), StubClient()
+    cache = make_cache(tmp_path, "read-write", limiter=limiter)
+    for _ in range(3):
+        cache.chat_completion(client, "gpt-4", MESSAGES)
+    assert limiter.tokens == 1
+    assert cache.store.hits == 2
+
+
+def test_invoke_wraps_chat_model(tmp_path):
+    llm = SimpleNamespace(model_name="gpt-4", temperature=0.0, calls=[])
+    llm.invoke = lambda prompt: (llm.calls.append(prompt), SimpleNamespace(content="MATCH (n) RETURN n"))[1]
+    cache = make_cache(tmp_path, "read-write")
+    assert cache.invoke(llm, "question").content == "MATCH (n) RETURN n"
+    assert cache.invoke(llm, "question").content == "MATCH (n) RETURN n"
+    assert llm.calls == ["question"]
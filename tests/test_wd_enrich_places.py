@@ -0,0 +1,110 @@
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+import pytest
+
+import wd_enrich_places as wd
+from response_cache import ResponseCache
+
+SPARQL_JSON = {"Content-Type": "application/sparql-results+json"}
+
+
+def binding(pid):
+    return {
+        "item": {"type": "uri", "value": f"http://www.wikidata.org/entity/Q{pid}"},
+        "pleiadesId": {"type": "literal", "value": pid},
+        "itemLabel": {"type": "literal", "value": f"Place {pid}"},
+        "coord": {"type": "literal", "value": "Point(12.5 41.9)"},
+    }
+
+
+def queried_pids(request):
+    values = re.search(r"VALUES \?pleiadesId \{([^}]*)\}", request.form()["query"]).group(1)
+    return re.findall(r'"([^"]+)"', values)
+
+
+@pytest.fixture
+def wdqs(stub_server, monkeypatch):
+    """Stub SPARQL endpoint: even Pleiades ids have a Wikidata item; the first request is throttled."""
+    throttled = []
+
+    def handler(request):
+        assert request.method == "POST"
+        if not throttled:
+            throttled.append(request)
+            return 429, "busy", {"Retry-After": "0"}
+        bindings = [binding(pid) for pid in queried_pids(request) if int(pid) % 2 == 0]
+        return 200, {"head": {"vars": []}, "results": {"bindings": bindings}}, SPARQL_JSON
+
+    monkeypatch.setattr(wd, "WDQS_URL", stub_server(handler) + "/sparql")
+    monkeypatch.setattr(wd, "POLITE_PAUSE", 0.0)
+    server = stub_server.server
+    server.sparql_requests = lambda: [r for r in server.requests if r is not throttled[0]]
+    return server
+
+
+def pids(bindings):
+    return sorted(b["pleiadesId"]["value"] for b in bindings)
+
+
+def test_cache_is_per_pid(wdqs, tmp_path):
+    cache = ResponseCache(tmp_path / "wd.sqlite", ttl=0)
+    ids = [str(i) for i in range(1, 7)]
+    assert pids(wd.wdqs_for_batch(ids, cache=cache)) == ["2", "4", "6"]
+    assert [queried_pids(r) for r in wdqs.sparql_requests()] == [ids]
+
+    # cached ids, including those without an item, are not asked again
+    more = [str(i) for i in range(1, 9)]
+    assert pids(wd.wdqs_for_batch(more, cache=cache)) == ["2", "4", "6", "8"]
+    assert queried_pids(wdqs.sparql_requests()[-1]) == ["7", "8"]
+
+    before = len(wdqs.requests)
+    assert pids(wd.wdqs_for_batch(more, cache=cache)) == ["2", "4", "6", "8"]
+    assert len(wdqs.requests) == before
+
+    offline = ResponseCache(tmp_path / "wd.sqlite", ttl=0, offline=True)
+    assert pids(wd.wdqs_for_batch(["2", "9", "10"], cache=offline)) == ["2"]
+    assert len(wdqs.requests) == before
+
+
+class SlowDriver:
+    """neo4j Driver stand-in whose writes are slower than the fetches."""
+
+    def __init__(self, write_seconds=0.02):
+        self.write_seconds = write_seconds
+        self.written = []
+        self.writer_threads = set()
+
+    @contextmanager
+    def session(self, database=None):
+        yield self
+
+    def execute_write(self, fn, rows):
+        assert fn is wd.upsert_rows_bulk
+        self.writer_threads.add(threading.current_thread().name)
+        time.sleep(self.write_seconds)
+        self.written.append(rows)
+
+
+def test_run_pipelined_drains_writer_queue(wdqs, monkeypatch, tmp_path):
+    monkeypatch.setattr(wd, "BATCH", 10)
+    driver = SlowDriver()
+    ids = [str(i) for i in range(1, 101)]  # 10 batches, 50 ids with an item
+
+    hits = wd.run_pipelined(driver, ids, concurrency=3, rate=1000, queue_size=1,
+                            cache=ResponseCache(tmp_path / "wd.sqlite", ttl=0))
+
+    assert hits == 50
+    assert len(driver.written) == 10  # every queued batch was written before returning
+    assert sorted(r["pid"] for rows in driver.written for r in rows) == sorted(ids[1::2])
+    assert driver.writer_threads == {"neo4j-writer"}
+    assert len(wdqs.sparql_requests()) == 10
+
+    # second run: every id answered from the cache, same rows written
+    rerun = SlowDriver(write_seconds=0)
+    before = len(wdqs.requests)
+    assert wd.run_pipelined(rerun, ids, concurrency=3, rate=1000, queue_size=1,
+                            cache=ResponseCache(tmp_path / "wd.sqlite", ttl=0)) == 50
+    assert len(wdqs.requests) == before
@@ -0,0 +1,102 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import wd_link_label_entities as wd
+from http_utils import TokenBucket, make_session
+from response_cache import ResponseCache
+
+TERMS = [f"Term {i}" for i in range(120)]
+
+
+def qid_of(term):
+    return f"Q{1000 + int(term.split()[-1])}"
+
+
+class RecordingSession:
+    """Stands in for a neo4j Session; records execute_write calls."""
+
+    def __init__(self):
+        self.writes = []
+
+    def execute_write(self, fn, *args):
+        self.writes.append((fn, args))
+
+
+@pytest.fixture
+def wikidata_api(stub_server, monkeypatch):
+    """Stub wbsearchentities / wbgetentities; the first search for 'Term 7' is throttled."""
+    throttled = []
+
+    def handler(request):
+        params = request.query
+        if params["action"] == "wbsearchentities":
+            term = params["search"]
+            if term == "Term 7" and not throttled:
+                throttled.append(term)
+                return 429, {"error": "slow down"}, {"Retry-After": "0"}
+            return 200, {"search": [{"id": qid_of(term), "label": term.upper(), "aliases": []}]}
+        if params["action"] == "wbgetentities":
+            entities = {
+                qid: {"labels": {"en": {"value": f"Term {int(qid[1:]) - 1000}"}}, "aliases": {}}
+                for qid in params["ids"].split("|")
+            }
+            return 200, {"entities": entities}
+        return 400, {"error": "unknown action"}
+
+    monkeypatch.setattr(wd, "SEARCH_URL", stub_server(handler) + "/w/api.php")
+    return stub_server.server
+
+
+def run_batched(session, terms, cache=None, batch_size=wd.TERM_BATCH):
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        http = make_session(wd.HEADERS, pool_size=4)
+        try:
+            wd.link_label_batched(session, "Concept", "name", "label-exact", terms, pool, http,
+                                  TokenBucket(1000, capacity=4), cache=cache, batch_size=batch_size)
+        finally:
+            http.close()
+
+
+def calls(server, action):
+    return [r.query for r in server.requests if r.query.get("action") == action]
+
+
+def test_retry_after_is_honoured(wikidata_api):
+    hits = wd.api_get({"action": "wbsearchentities", "search": "Term 7"})
+    assert hits["search"][0]["id"] == "Q1007"
+    assert [q["search"] for q in calls(wikidata_api, "wbsearchentities")] == ["Term 7", "Term 7"]
+
+
+def test_get_entities_chunks_at_50_ids(wikidata_api):
+    session = RecordingSession()
+    run_batched(session, TERMS)
+
+    id_counts = sorted(len(q["ids"].split("|")) for q in calls(wikidata_api, "wbgetentities"))
+    assert id_counts == [20, 50, 50]
+    # one search per term, plus the throttled retry
+    assert len(calls(wikidata_api, "wbsearchentities")) == len(TERMS) + 1
+
+
+def test_one_unwind_upsert_per_batch(wikidata_api):
+    session = RecordingSession()
+    run_batched(session, TERMS + ["Term 3", "  "], batch_size=50)
+
+    assert [fn for fn, _ in session.writes] == [wd.upsert_same_as_bulk] * 3
+    rows = [row for _, args in session.writes for row in args[2]]
+    assert [len(args[2]) for _, args in session.writes] == [50, 50, 20]
+    assert {r["term"] for r in rows} == set(TERMS)
+    assert all(r["qid"] == qid_of(r["term"]) and r["wd_label"] == r["term"] for r in rows)
+    assert all(args[:2] == ("Concept", "name") and args[3] == "label-exact"
+               for _, args in session.writes)
+
+
+def test_cached_terms_make_no_requests(wikidata_api, tmp_path):
+    cache = ResponseCache(tmp_path / "wd.sqlite", ttl=0)
+    run_batched(RecordingSession(), TERMS[:60], cache=cache)
+    wikidata_api.requests.clear()
+
+    session = RecordingSession()
+    run_batched(session, TERMS[:60], cache=cache)
+    assert wikidata_api.requests == []
+    assert sum(len(args[2]) for _, args in session.writes) == 60
@@ -5,15 +5,33 @@ Enrich :Place (Pleiades) with Wikidata via P1584.
 - Uses POST + proper Accept header + format=json
 - Retries/backoff
 - Skips already-linked places
+- --pipelined: pooled HTTP session, token-bucket rate limit (honours Retry-After),
+  a few SPARQL requests in flight and a separate Neo4j writer thread fed
+  through a bounded queue, so network and DB time overlap
+- --wikidata-dump: offline alternative to WDQS; one streaming pass over a local
+  Wikidata entity dump (.json.bz2 / .json.gz), same nodes/edges as the SPARQL path
+- WDQS answers are cached per Pleiades id on disk (response_cache.py, TTL),
+  including ids with no Wikidata item; --offline answers from the cache only
 """
 
+import argparse
+import bz2
+import gzip
+import json
 import os
+import queue
+import threading
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import requests
 from textwrap import dedent
 from dotenv import load_dotenv
 from neo4j import GraphDatabase
 
+from graph_schema import ensure_schema
+from http_utils import TokenBucket, make_session, parse_retry_after
+from response_cache import DEFAULT_CACHE_PATH, DEFAULT_TTL_DAYS, ResponseCache, normalize_key
+
 load_dotenv()
 
 NEO4J_URI  = os.getenv("NEO4J_URI", "bolt://localhost:7687")
@@ -21,7 +39,7 @@ NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
 NEO4J_PASS = os.getenv("NEO4J_PASSWORD") or os.getenv("NEO4J_PASS")
 DB         = os.getenv("NEO4J_DATABASE", "graphrag")
 
-WDQS_URL = "https://query.wikidata.org/sparql"
+WDQS_URL = os.getenv("WDQS_URL", "https://query.wikidata.org/sparql")  # override for a local stub
 HEADERS = {
     # Correct type for SPARQL JSON results:
     "Accept": "application/sparql-results+json",
@@ -34,6 +52,14 @@ MAX_RETRIES = 4
 RETRY_SLEEP = 6.0
 POLITE_PAUSE = 0.6
 
+# --pipelined defaults (WDQS allows only a handful of parallel queries per client)
+WDQS_CONCURRENCY = int(os.getenv("WDQS_CONCURRENCY", "2"))
+WDQS_RATE = float(os.getenv("WDQS_RATE", "1.5"))  # requests per second
+WRITE_QUEUE_SIZE = 8
+
+# --wikidata-dump: rows per UNWIND transaction
+DUMP_WRITE_BATCH = 1000
+
 def sanity_counts(session):
     total_place = session.run("MATCH (p:Place) RETURN count(p) AS c").single()["c"]
     with_pid = session.run(
@@ -56,7 +82,12 @@ def get_pleiades_ids_needing_link(session):
     """
     return [r["pid"] for r in session.run(q)]
 
-def wdqs_for_batch(ids):
+def wdqs_query(ids, http=None, limiter=None):
+    """
+    Run the P1584 query for one batch of Pleiades ids and return the bindings.
+    With http/limiter (pipelined mode) requests go through the pooled session and
+    the shared token bucket; Retry-After pauses every worker, not just this one.
+    """
     values = " ".join(f'"{i}"' for i in ids)
     sparql = dedent(f"""
     SELECT ?item ?pleiadesId ?itemLabel ?coord ?inst WHERE {{
@@ -71,17 +102,22 @@ def wdqs_for_batch(ids):
     tries = 0
     while True:
         tries += 1
-        r = requests.post(
+        if limiter is not None:
+            limiter.acquire()
+        r = (http or requests).post(
             WDQS_URL,
             data={"query": sparql, "format": "json"},  # force JSON
             headers=HEADERS,
             timeout=120,
         )
         if r.status_code in (429, 502, 503, 504):
-            ra = r.headers.get("Retry-After")
-            sleep_for = float(ra) if ra else RETRY_SLEEP * tries
+            ra = parse_retry_after(r.headers.get("Retry-After"))
+            sleep_for = ra if ra is not None else RETRY_SLEEP * tries
             print(f"[wdqs] {r.status_code}; retrying in {sleep_for:.1f}s …")
-            time.sleep(sleep_for)
+            if limiter is not None:
+                limiter.pause(sleep_for)
+            else:
+                time.sleep(sleep_for)
             if tries <= MAX_RETRIES:
                 continue
             raise RuntimeError(f"WDQS throttled/errored {tries} times; aborting.")
@@ -106,7 +142,35 @@ def wdqs_for_batch(ids):
                 continue
             raise
         finally:
-            time.sleep(POLITE_PAUSE)
+            if limiter is None:
+                time.sleep(POLITE_PAUSE)
+
+CACHE_NS = "wdqs-p1584"
+
+def wdqs_for_batch(ids, http=None, limiter=None, cache=None):
+    """
+    wdqs_query() with a per-id response cache: only ids that are not cached are
+    sent to WDQS, and every queried id is stored (an empty list when Wikidata has
+    no item for it). In offline mode uncached ids are skipped.
+    """
+    if cache is None:
+        return wdqs_query(ids, http=http, limiter=limiter)
+
+    keys = {pid: normalize_key(pid) for pid in ids}
+    cached = cache.get_many(CACHE_NS, keys.values())
+    bindings = [b for pid in ids if keys[pid] in cached for b in cached[keys[pid]]]
+    missing = [pid for pid in ids if keys[pid] not in cached]
+    if not missing or cache.offline:
+        return bindings
+
+    fetched = wdqs_query(missing, http=http, limiter=limiter)
+    by_pid = {pid: [] for pid in missing}
+    for b in fetched:
+        pid = b.get("pleiadesId", {}).get("value")
+        if pid in by_pid:
+            by_pid[pid].append(b)
+    cache.put_many(CACHE_NS, ((keys[pid], bs) for pid, bs in by_pid.items()))
+    return bindings + fetched
 
 def parse_coord(coord_bind):
     if not coord_bind:
@@ -145,12 +209,208 @@ def upsert_batch(tx, rows):
             qid=qid, pid=pid, label=label, inst_qid=inst_qid, lat=lat, lon=lon
         )
 
+CYPHER_UPSERT_SAME_AS_BULK = """
+UNWIND $rows AS row
+MERGE (w:WikidataEntity {qid: row.qid})
+  ON CREATE SET w.uri = 'https://www.wikidata.org/entity/' + row.qid
+SET w.label = coalesce(row.label, w.label),
+    w.instanceOf = CASE WHEN row.inst_qid IS NULL THEN w.instanceOf ELSE row.inst_qid END,
+    w.lat = CASE WHEN row.lat IS NULL THEN w.lat ELSE row.lat END,
+    w.lon = CASE WHEN row.lon IS NULL THEN w.lon ELSE row.lon END
+
+WITH w, row
+MATCH (p:Place {pleiadesId: row.pid})
+MERGE (p)-[r:SAME_AS {source:'wikidata', property:'P1584'}]->(w)
+SET r.matchedBy = 'pleiadesId'
+"""
+
+def bindings_to_rows(bindings):
+    rows = []
+    for b in bindings:
+        inst = b.get("inst", {}).get("value")
+        lat, lon = parse_coord(b.get("coord"))
+        rows.append({
+            "qid": b["item"]["value"].rsplit("/", 1)[-1],
+            "pid": b["pleiadesId"]["value"],
+            "label": b.get("itemLabel", {}).get("value"),
+            "inst_qid": inst.rsplit("/", 1)[-1] if inst else None,
+            "lat": lat,
+            "lon": lon,
+        })
+    return rows
+
+def upsert_rows_bulk(tx, rows):
+    # same writes as upsert_batch, one UNWIND statement per batch
+    tx.run(CYPHER_UPSERT_SAME_AS_BULK, rows=rows).consume()
+
 def chunker(seq, size):
     for i in range(0, len(seq), size):
         yield seq[i:i+size], i
 
+def run_pipelined(driver, ids, concurrency, rate, queue_size=WRITE_QUEUE_SIZE, cache=None):
+    """
+    Fetch batches with up to `concurrency` SPARQL requests in flight (rate-limited),
+    while a writer thread drains a bounded queue into Neo4j.
+    """
+    http = make_session(HEADERS, pool_size=concurrency)
+    limiter = TokenBucket(rate, capacity=concurrency)
+    q = queue.Queue(maxsize=queue_size)
+    stats = {"hits": 0}
+
+    def writer():
+        with driver.session(database=DB) as wsess:
+            while True:
+                item = q.get()
+                if item is None:
+                    return
+                start_idx, n, rows = item
+                label = f"[batch {start_idx}-{start_idx+n-1}]"
+                try:
+                    if rows:
+                        wsess.execute_write(upsert_rows_bulk, bindings_to_rows(rows))
+                        stats["hits"] += len(rows)
+                    print(f"{label} rows={len(rows)}  total_hits={stats['hits']}")
+                except Exception as e:
+                    print(f"{label} Neo4j error: {e}")
+
+    wt = threading.Thread(target=writer, name="neo4j-writer", daemon=True)
+    wt.start()
+
+    def fetch(batch, start_idx):
+        return start_idx, len(batch), wdqs_for_batch(batch, http=http, limiter=limiter, cache=cache)
+
+    def handle(fut, batch_info):
+        start_idx, n = batch_info
+        try:
+            q.put(fut.result())  # blocks when the writer falls behind
+        except Exception as e:
+            print(f"[batch {start_idx}-{start_idx+n-1}] WDQS error: {e}")
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            pending = {}
+            for batch, start_idx in chunker(ids, BATCH):
+                if len(pending) >= concurrency:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        handle(fut, pending.pop(fut))
+                fut = pool.submit(fetch, batch, start_idx)
+                pending[fut] = (start_idx, len(batch))
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    handle(fut, pending.pop(fut))
+    finally:
+        q.put(None)
+        wt.join()
+        http.close()
+    return stats["hits"]
+
+# ---------- offline: local Wikidata entity dump ----------
+
+def _json_loads():
+    try:
+        import orjson
+        return orjson.loads
+    except ImportError:
+        return json.loads
+
+def iter_dump_entities(path):
+    """
+    Yield entities that carry a P1584 claim from a Wikidata JSON dump
+    (one entity per line inside a top-level array; .bz2, .gz or plain).
+    """
+    if path.endswith(".bz2"):
+        f = bz2.open(path, "rt", encoding="utf-8")
+    elif path.endswith(".gz"):
+        f = gzip.open(path, "rt", encoding="utf-8")
+    else:
+        f = open(path, "rt", encoding="utf-8")
+    loads = _json_loads()
+    with f:
+        for line in f:
+            # cheap substring test first: almost no entity has a Pleiades ID
+            if '"P1584"' not in line:
+                continue
+            line = line.strip().rstrip(",")
+            if not line.startswith("{"):
+                continue
+            try:
+                yield loads(line)
+            except ValueError:
+                continue
+
+def _claim_values(entity, prop):
+    """Main-snak values of a property, preferred rank first, deprecated ones dropped."""
+    claims = [c for c in entity.get("claims", {}).get(prop, [])
+              if c.get("rank") != "deprecated"]
+    claims.sort(key=lambda c: c.get("rank") != "preferred")
+    values = []
+    for c in claims:
+        snak = c.get("mainsnak", {})
+        if snak.get("snaktype") == "value":
+            values.append(snak.get("datavalue", {}).get("value"))
+    return values
+
+def entity_to_rows(entity, wanted):
+    """Rows in the bindings_to_rows() shape for each wanted Pleiades ID of the entity."""
+    qid = entity.get("id")
+    pids = [v for v in _claim_values(entity, "P1584") if isinstance(v, str) and v in wanted]
+    if not qid or not pids:
+        return []
+    # WDQS label service falls back to the QID when there is no English label
+    label = entity.get("labels", {}).get("en", {}).get("value") or qid
+    inst = next((v.get("id") for v in _claim_values(entity, "P31") if isinstance(v, dict)), None)
+    coord = next((v for v in _claim_values(entity, "P625") if isinstance(v, dict)), None)
+    lat = coord.get("latitude") if coord else None
+    lon = coord.get("longitude") if coord else None
+    return [{"qid": qid, "pid": pid, "label": label, "inst_qid": inst, "lat": lat, "lon": lon}
+            for pid in pids]
+
+def run_from_dump(session, ids, dump_path, batch_size=DUMP_WRITE_BATCH):
+    wanted = set(ids)
+    rows, total, scanned = [], 0, 0
+    for entity in iter_dump_entities(dump_path):
+        scanned += 1
+        rows.extend(entity_to_rows(entity, wanted))
+        if len(rows) >= batch_size:
+            session.execute_write(upsert_rows_bulk, rows)
+            total += len(rows)
+            rows = []
+            print(f"[dump] P1584 entities scanned={scanned}  total_hits={total}")
+    if rows:
+        session.execute_write(upsert_rows_bulk, rows)
+        total += len(rows)
+    print(f"[dump] done. P1584 entities scanned={scanned}  total_hits={total}")
+    return total
+
 def main():
+    ap = argparse.ArgumentParser(description="Link :Place to Wikidata via P1584 (Pleiades ID).")
+    ap.add_argument("--pipelined", action="store_true",
+                    help="Concurrent, rate-limited WDQS requests with a separate Neo4j writer.")
+    ap.add_argument("--concurrency", type=int, default=WDQS_CONCURRENCY,
+                    help="Max SPARQL requests in flight (--pipelined).")
+    ap.add_argument("--rate", type=float, default=WDQS_RATE,
+                    help="Max SPARQL requests per second (--pipelined).")
+    ap.add_argument("--wikidata-dump", metavar="PATH",
+                    help="Resolve P1584 from a local Wikidata JSON dump instead of WDQS.")
+    ap.add_argument("--cache", default=DEFAULT_CACHE_PATH,
+                    help="SQLite response cache (default: %(default)s).")
+    ap.add_argument("--cache-ttl-days", type=float, default=DEFAULT_TTL_DAYS,
+                    help="Re-query cached answers older than this (<= 0: never).")
+    ap.add_argument("--no-cache", action="store_true", help="Always query WDQS.")
+    ap.add_argument("--offline", action="store_true",
+                    help="Answer from the response cache only; never contact WDQS.")
+    args = ap.parse_args()
+    if args.offline and args.no_cache:
+        ap.error("--offline needs the response cache (drop --no-cache).")
+
+    cache = None
+    if not args.no_cache and not args.wikidata_dump:
+        cache = ResponseCache(args.cache, ttl=args.cache_ttl_days * 86400, offline=args.offline)
+
     driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS))
+    ensure_schema(driver, DB)
     with driver.session(database=DB) as session:
         sanity_counts(session)
 
@@ -159,18 +419,27 @@ def main():
         if not ids:
             return
 
-        total_hits = 0
-        for batch, start_idx in chunker(ids, BATCH):
-            try:
-                rows = wdqs_for_batch(batch)
-            except Exception as e:
-                print(f"[batch {start_idx}-{start_idx+len(batch)-1}] WDQS error: {e}")
-                continue
-            if rows:
-                session.execute_write(upsert_batch, rows)
-                total_hits += len(rows)
-            print(f"[batch {start_idx}-{start_idx+len(batch)-1}] rows={len(rows)}  total_hits={total_hits}")
+        if args.wikidata_dump:
+            run_from_dump(session, ids, args.wikidata_dump)
+        elif args.pipelined:
+            total_hits = run_pipelined(driver, ids, args.concurrency, args.rate, cache=cache)
+            print(f"Done. total_hits={total_hits}")
+        else:
+            total_hits = 0
+            for batch, start_idx in chunker(ids, BATCH):
+                try:
+                    rows = wdqs_for_batch(batch, cache=cache)
+                except Exception as e:
+                    print(f"[batch {start_idx}-{start_idx+len(batch)-1}] WDQS error: {e}")
+                    continue
+                if rows:
+                    session.execute_write(upsert_batch, rows)
+                    total_hits += len(rows)
+                print(f"[batch {start_idx}-{start_idx+len(batch)-1}] rows={len(rows)}  total_hits={total_hits}")
 
+    if cache is not None:
+        print(cache.report())
+        cache.close()
     driver.close()
 
 if __name__ == "__main__":
@@ -22,14 +22,29 @@ Notes
 -----
 - This is intentionally conservative: no fuzzy matching, no disambiguation heuristics.
 - Safe to re-run: MERGE makes it idempotent.
+- Search responses are cached on disk per normalized term (response_cache.py),
+  including terms with no exact match, so re-runs only query new terms.
+  --offline links from the cache only.
+- --batched: searches run concurrently under one token-bucket rate limit,
+  candidates are confirmed with wbgetentities (up to 50 ids per call) and
+  each batch of terms is written in a single UNWIND transaction.
+  WD_API_URL points the job at a local stub API.
 """
 
+import argparse
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 import requests
 from neo4j import GraphDatabase
 from dotenv import load_dotenv
 
+from graph_schema import ensure_schema
+from http_utils import TokenBucket, make_session, parse_retry_after
+from response_cache import (
+    DEFAULT_CACHE_PATH, DEFAULT_TTL_DAYS, MISS, OfflineMiss, ResponseCache, normalize_key,
+)
+
 # --- config / env -----------------------------------------------------------
 
 load_dotenv()
@@ -39,25 +54,65 @@ NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
 NEO4J_PASS = os.getenv("NEO4J_PASSWORD") or os.getenv("NEO4J_PASS")
 DB         = os.getenv("NEO4J_DATABASE", "graphrag")
 
-SEARCH_URL = "https://www.wikidata.org/w/api.php"
+SEARCH_URL = os.getenv("WD_API_URL", "https://www.wikidata.org/w/api.php")
 HEADERS = {
     "User-Agent": "GraphRAG-ISAW-label-linker/1.0 (contact: fed.dipasqua@stud.uniroma3.it)",
     "Accept": "application/json",
 }
 SLEEP_BETWEEN_CALLS = float(os.getenv("WD_SEARCH_SLEEP", "0.25"))
 SEARCH_LIMIT = int(os.getenv("WD_SEARCH_LIMIT", "10"))
+CACHE_NS = "wbsearchentities"
+ENTITIES_CACHE_NS = "wbgetentities"
+MAX_RETRIES = 4
+RETRY_SLEEP = 5.0
+
+# --batched defaults
+WBGET_MAX_IDS = 50  # wbgetentities limit for anonymous clients
+WD_CONCURRENCY = int(os.getenv("WD_SEARCH_CONCURRENCY", "4"))
+WD_RATE = float(os.getenv("WD_SEARCH_RATE", "4"))  # requests per second
+TERM_BATCH = int(os.getenv("WD_TERM_BATCH", "200"))
 
 
 # --- helper: wikidata search -----------------------------------------------
 
-def wd_search_exact(term: str, language: str = "en", limit: int = SEARCH_LIMIT):
+def api_get(params, http=None, limiter=None):
     """
-    Query Wikidata search API for an item that has an exact label or alias
-    matching `term` (case-insensitive). Returns (qid, label) or (None, None).
+    GET the Wikidata action API; throttling responses (429/5xx) are retried,
+    honouring Retry-After (through the shared limiter when there is one).
+    """
+    tries = 0
+    while True:
+        tries += 1
+        if limiter is not None:
+            limiter.acquire()
+        r = (http or requests).get(SEARCH_URL, params=params, headers=HEADERS, timeout=30)
+        if r.status_code in (429, 502, 503, 504) and tries <= MAX_RETRIES:
+            ra = parse_retry_after(r.headers.get("Retry-After"))
+            sleep_for = ra if ra is not None else RETRY_SLEEP * tries
+            print(f"[wd-api] {r.status_code}; retrying in {sleep_for:.1f}s …")
+            if limiter is not None:
+                limiter.pause(sleep_for)
+            else:
+                time.sleep(sleep_for)
+            continue
+        r.raise_for_status()
+        return r.json()
+
+
+def wd_search_hits(term: str, language: str = "en", limit: int = SEARCH_LIMIT, cache=None,
+                   http=None, limiter=None):
+    """
+    Raw wbsearchentities hits for `term`, plus whether they came from the cache.
+    Raises OfflineMiss if the cache is offline and has no entry for the term.
     """
     t = (term or "").strip()
-    if not t:
-        return None, None
+    key = normalize_key(language, limit, t)
+    if cache is not None:
+        hits = cache.get(CACHE_NS, key)
+        if hits is not MISS:
+            return hits, True
+        if cache.offline:
+            raise OfflineMiss(t)
 
     params = {
         "action": "wbsearchentities",
@@ -68,11 +123,16 @@ def wd_search_exact(term: str, language: str = "en", limit: int = SEARCH_LIMIT):
         "limit": limit,
     }
 
-    r = requests.get(SEARCH_URL, params=params, headers=HEADERS, timeout=30)
-    r.raise_for_status()
-    data = r.json()
+    data = api_get(params, http=http, limiter=limiter)
     hits = data.get("search", []) or []
+    if cache is not None:
+        cache.put(CACHE_NS, key, hits)
+    return hits, False
+
 
+def match_exact(term: str, hits):
+    """(qid, label) of the first hit whose label or alias equals `term` (case-insensitive)."""
+    t = (term or "").strip()
     t_lower = t.lower()
     for h in hits:
         label = (h.get("label") or "").strip()
@@ -86,6 +146,82 @@ def wd_search_exact(term: str, language: str = "en", limit: int = SEARCH_LIMIT):
     return None, None
 
 
+def wd_search_exact(term: str, language: str = "en", limit: int = SEARCH_LIMIT, cache=None):
+    """
+    Query Wikidata search API for an item that has an exact label or alias
+    matching `term` (case-insensitive). Returns (qid, label) or (None, None).
+    """
+    t = (term or "").strip()
+    if not t:
+        return None, None
+    hits, _ = wd_search_hits(t, language, limit, cache=cache)
+    return match_exact(t, hits)
+
+
+def _same_term(name, t_lower: str) -> bool:
+    return (name or "").strip().lower() == t_lower
+
+
+def exact_candidates(term: str, hits):
+    """QIDs of every search hit whose label, alias or matched text equals `term`."""
+    t_lower = (term or "").strip().lower()
+    out = []
+    for h in hits:
+        names = [h.get("label"), (h.get("match") or {}).get("text")] + list(h.get("aliases") or [])
+        if any(_same_term(n, t_lower) for n in names):
+            out.append(h["id"])
+    return out
+
+
+def wd_get_entities(qids, language: str = "en", cache=None, http=None, limiter=None):
+    """
+    {qid: {"label": str|None, "aliases": [str]}} for up to WBGET_MAX_IDS ids,
+    via one wbgetentities call (cached per qid; offline: uncached ids are dropped).
+    """
+    keys = {qid: normalize_key(language, qid) for qid in qids}
+    found = {}
+    if cache is not None:
+        cached = cache.get_many(ENTITIES_CACHE_NS, keys.values())
+        found = {qid: cached[k] for qid, k in keys.items() if k in cached}
+        if cache.offline:
+            return found
+    missing = [qid for qid in qids if qid not in found]
+    if not missing:
+        return found
+
+    params = {
+        "action": "wbgetentities",
+        "ids": "|".join(missing),
+        "props": "labels|aliases",
+        "languages": language,
+        "format": "json",
+    }
+    data = api_get(params, http=http, limiter=limiter)
+    entities = data.get("entities", {}) or {}
+    fetched = {}
+    for qid in missing:
+        e = entities.get(qid) or {}
+        label = (e.get("labels", {}).get(language) or {}).get("value")
+        aliases = [a.get("value") for a in e.get("aliases", {}).get(language, []) if a.get("value")]
+        fetched[qid] = {"label": label, "aliases": aliases}
+    if cache is not None:
+        cache.put_many(ENTITIES_CACHE_NS, ((keys[q], v) for q, v in fetched.items()))
+    found.update(fetched)
+    return found
+
+
+def confirm_exact(term: str, candidates, entities):
+    """(qid, label) of the first candidate whose entity label or alias equals `term`."""
+    t_lower = (term or "").strip().lower()
+    for qid in candidates:
+        e = entities.get(qid)
+        if not e:
+            continue
+        if any(_same_term(n, t_lower) for n in [e["label"]] + e["aliases"]):
+            return qid, e["label"] or term
+    return None, None
+
+
 # --- helper: generic upsert -------------------------------------------------
 
 def upsert_same_as(tx, label_name: str, prop: str, term: str, qid: str,
@@ -114,6 +250,27 @@ def upsert_same_as(tx, label_name: str, prop: str, term: str, qid: str,
     )
 
 
+def upsert_same_as_bulk(tx, label_name: str, prop: str, rows, method: str):
+    """
+    Same writes as upsert_same_as(), one UNWIND statement for many
+    {term, qid, wd_label} rows.
+    """
+    cypher = f"""
+    UNWIND $rows AS row
+    MERGE (w:WikidataEntity {{qid: row.qid}})
+      ON CREATE SET w.uri = 'https://www.wikidata.org/entity/' + row.qid
+    SET w.label = coalesce(row.wd_label, w.label)
+
+    WITH w, row
+    MATCH (n:{label_name} {{{prop}: row.term}})
+    MERGE (n)-[:SAME_AS {{
+        source:'wikidata',
+        method:$method
+    }}]->(w)
+    """
+    tx.run(cypher, rows=rows, method=method)
+
+
 # --- Neo4j fetchers ---------------------------------------------------------
 
 def concept_terms_needing_link(session):
@@ -151,13 +308,15 @@ def article_terms_needing_link(session):
 
 # --- main worker per label --------------------------------------------------
 
-def link_label_batch(session, label_name: str, prop: str, method: str, terms):
+def link_label_batch(session, label_name: str, prop: str, method: str, terms, cache=None):
     """
     For a given label/property, try to link each term via exact Wikidata search.
+    Cached terms are answered without a request (and without the polite sleep).
     """
     total = len(terms)
     linked = 0
     skipped = 0
+    uncached = 0
 
     print(f"[{label_name}] attempting to link {total} terms via method='{method}'")
 
@@ -168,17 +327,23 @@ def link_label_batch(session, label_name: str, prop: str, method: str, terms):
             continue
 
         try:
-            qid, wd_label = wd_search_exact(t_clean)
+            hits, from_cache = wd_search_hits(t_clean, cache=cache)
+        except OfflineMiss:
+            uncached += 1
+            skipped += 1
+            continue
         except Exception as e:
             print(f"[{label_name} #{i}/{total}] term={t_clean!r} search error: {e}")
             skipped += 1
             time.sleep(SLEEP_BETWEEN_CALLS)
             continue
 
+        qid, wd_label = match_exact(t_clean, hits)
         if not qid:
             print(f"[{label_name} #{i}/{total}] term={t_clean!r} -> no exact match")
             skipped += 1
-            time.sleep(SLEEP_BETWEEN_CALLS)
+            if not from_cache:
+                time.sleep(SLEEP_BETWEEN_CALLS)
             continue
 
         # Upsert into Neo4j
@@ -194,11 +359,78 @@ def link_label_batch(session, label_name: str, prop: str, method: str, terms):
         linked += 1
         print(f"[{label_name} #{i}/{total}] term={t_clean!r} -> {qid} ({wd_label})")
 
-        time.sleep(SLEEP_BETWEEN_CALLS)
+        if not from_cache:
+            time.sleep(SLEEP_BETWEEN_CALLS)
 
+    if uncached:
+        print(f"[{label_name}] offline: {uncached} terms not in the response cache")
     print(f"[{label_name}] done. linked={linked}, skipped/failed={skipped}, total={total}")
 
 
+def link_label_batched(session, label_name: str, prop: str, method: str, terms,
+                       pool, http, limiter, cache=None, batch_size: int = TERM_BATCH):
+    """
+    Batched variant of link_label_batch(): per batch of terms, concurrent searches,
+    wbgetentities confirmation of the exact candidates, one write transaction.
+    """
+    terms = list(dict.fromkeys(t.strip() for t in terms if t and t.strip()))
+    total = len(terms)
+    linked = 0
+    failed = 0
+    uncached = 0
+
+    print(f"[{label_name}] attempting to link {total} terms via method='{method}' (batched)")
+
+    def search(term):
+        try:
+            hits, _ = wd_search_hits(term, cache=cache, http=http, limiter=limiter)
+            return term, exact_candidates(term, hits), None
+        except Exception as e:
+            return term, None, e
+
+    def get_entities(qids):
+        try:
+            return wd_get_entities(qids, cache=cache, http=http, limiter=limiter)
+        except Exception as e:
+            print(f"[{label_name}] wbgetentities error ({len(qids)} ids): {e}")
+            return {}
+
+    for start in range(0, total, batch_size):
+        batch = terms[start:start + batch_size]
+        label = f"[{label_name} {start}-{start + len(batch) - 1}/{total}]"
+
+        candidates = {}
+        for term, cands, err in pool.map(search, batch):
+            if isinstance(err, OfflineMiss):
+                uncached += 1
+            elif err is not None:
+                print(f"{label} term={term!r} search error: {err}")
+                failed += 1
+            elif cands:
+                candidates[term] = cands
+
+        qids = sorted({q for cands in candidates.values() for q in cands})
+        entities = {}
+        for found in pool.map(get_entities, [qids[i:i + WBGET_MAX_IDS]
+                                             for i in range(0, len(qids), WBGET_MAX_IDS)]):
+            entities.update(found)
+
+        rows = []
+        for term, cands in candidates.items():
+            qid, wd_label = confirm_exact(term, cands, entities)
+            if qid:
+                rows.append({"term": term, "qid": qid, "wd_label": wd_label or term})
+
+        if rows:
+            session.execute_write(upsert_same_as_bulk, label_name, prop, rows, method)
+        linked += len(rows)
+        print(f"{label} candidates={len(candidates)}  linked={len(rows)}  total_linked={linked}")
+
+    if uncached:
+        print(f"[{label_name}] offline: {uncached} terms not in the response cache")
+    print(f"[{label_name}] done. linked={linked}, errors={failed}, total={total}")
+
+
 def sanity_counts(session):
     q = """
     MATCH (c:Concept) RETURN 'Concept' AS label, count(c) AS total
@@ -214,10 +446,49 @@ def sanity_counts(session):
 
 
 def main():
+    ap = argparse.ArgumentParser(description="Link Concept/Person/Article nodes to Wikidata by exact label.")
+    ap.add_argument("--cache", default=DEFAULT_CACHE_PATH,
+                    help="SQLite response cache (default: %(default)s).")
+    ap.add_argument("--cache-ttl-days", type=float, default=DEFAULT_TTL_DAYS,
+                    help="Re-query cached answers older than this (<= 0: never).")
+    ap.add_argument("--no-cache", action="store_true", help="Always query the search API.")
+    ap.add_argument("--offline", action="store_true",
+                    help="Answer from the response cache only; never contact Wikidata.")
+    ap.add_argument("--batched", action="store_true",
+                    help="Concurrent searches, wbgetentities confirmation, one write per batch.")
+    ap.add_argument("--concurrency", type=int, default=WD_CONCURRENCY,
+                    help="Max API requests in flight (--batched).")
+    ap.add_argument("--rate", type=float, default=WD_RATE,
+                    help="Max API requests per second (--batched).")
+    ap.add_argument("--batch-size", type=int, default=TERM_BATCH,
+                    help="Terms per write transaction (--batched).")
+    args = ap.parse_args()
+    if args.offline and args.no_cache:
+        ap.error("--offline needs the response cache (drop --no-cache).")
+
     if not NEO4J_PASS:
         raise RuntimeError("No Neo4j password set (NEO4J_PASSWORD or NEO4J_PASS)")
 
+    cache = None
+    if not args.no_cache:
+        cache = ResponseCache(args.cache, ttl=args.cache_ttl_days * 86400, offline=args.offline)
+
+    pool = http = limiter = None
+
+    def link(session, label_name, prop, method, terms, cache=None):
+        if pool is None:
+            link_label_batch(session, label_name, prop, method, terms, cache=cache)
+        else:
+            link_label_batched(session, label_name, prop, method, terms, pool, http, limiter,
+                               cache=cache, batch_size=args.batch_size)
+
+    if args.batched:
+        pool = ThreadPoolExecutor(max_workers=args.concurrency)
+        http = make_session(HEADERS, pool_size=args.concurrency)
+        limiter = TokenBucket(args.rate, capacity=args.concurrency)
+
     driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS))
+    ensure_schema(driver, DB)
     with driver.session(database=DB) as session:
         print(f"Connected to Neo4j DB='{DB}' at {NEO4J_URI} as user='{NEO4J_USER}'")
         sanity_counts(session)
@@ -231,12 +502,18 @@ def main():
         print(f"Article titles needing link: {len(articles)}")
 
         if concepts:
-            link_label_batch(session, "Concept", "name", "label-exact", concepts)
+            link(session, "Concept", "name", "label-exact", concepts, cache=cache)
         if persons:
-            link_label_batch(session, "Person", "name", "label-exact", persons)
+            link(session, "Person", "name", "label-exact", persons, cache=cache)
         if articles:
-            link_label_batch(session, "Article", "title", "title-exact", articles)
-
+            link(session, "Article", "title", "title-exact", articles, cache=cache)
+
+    if pool is not None:
+        pool.shutdown()
+        http.close()
+    if cache is not None:
+        print(cache.report())
+        cache.close()
     driver.close()
     print("Done.")
 